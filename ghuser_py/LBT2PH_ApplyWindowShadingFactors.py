@@ -29,6 +29,7 @@ EM December 9, 2020
         _windowNames: (List) The window names in the HB Model being analyzed. The order of this list should match the order of the Shading Factors input.
         _winter_shading_factors: (List) The winter shading factors (0=fully shaded, 1=fully unshaded). The length and order of this list should match the "_windowNames" input.
         _summer_shading_factors: (List) The summer shading factors (0=fully shaded, 1=fully unshaded). The length and order of this list should match the "_windowNames" input.
+        monthly_shading_factors_: (Tree) Optional. The shading factors for each month (or any other analysis period), one branch per window in the same order as the "_windowNames" input. Connect to the 'Seasonal Radiation from LBT' component's 'period_shading_factors_' output.
     Returns:
         HBZones_: The updated Honeybee Zone objects to pass along to the next step.
 """
@@ -54,9 +55,15 @@ if len(_window_names) != len(_winter_shading_factors) or len(_window_names) != l
     "Check the HB Model / shading factor values. For now I'll use 0.75 for all the missing ones."
     ghenv.Component.AddRuntimeMessage(ghK.GH_RuntimeMessageLevel.Warning, warning)
 
+monthly_branch_count = monthly_shading_factors_.BranchCount if monthly_shading_factors_ is not None else 0
+if monthly_branch_count and monthly_branch_count != len(_window_names):
+    warning = "The number of windows in the HB Model doesn't match the number of branches\n"\
+    "in the monthly_shading_factors_ input? No monthly factors will be set for the missing ones."
+    ghenv.Component.AddRuntimeMessage(ghK.GH_RuntimeMessageLevel.Warning, warning)
+
 # ------------------------------------------------------------------------------
 # Build the window param dict
-Params = namedtuple('Params', ['winter', 'summer'])
+Params = namedtuple('Params', ['winter', 'summer', 'monthly'])
 param_dict = {}
 for i, window_name in enumerate(_window_names):
 
@@ -74,7 +81,12 @@ for i, window_name in enumerate(_window_names):
     except SystemError as e:
         summer_factor = 0.75
     
-    param_dict[window_name] = Params(winter_factor, summer_factor)
+    if i < monthly_branch_count:
+        monthly_factors = list(monthly_shading_factors_.Branches[i])
+    else:
+        monthly_factors = None
+    
+    param_dict[window_name] = Params(winter_factor, summer_factor, monthly_factors)
 
 
 # ------------------------------------------------------------------------------
@@ -105,6 +117,7 @@ for room in _HB_rooms:
             
             phpp_window.shading_factor_winter = window_factors.winter
             phpp_window.shading_factor_summer = window_factors.summer
+            phpp_window.shading_factors_monthly = window_factors.monthly
             phpp_window.shading_dimensions = None
             
             # ------------------------------------------------------------------
@@ -118,7 +131,7 @@ for room in _HB_rooms:
 # ------------------------------------------------------------------------------
 # Warnings
 for k, v in param_dict.items():
-    if 0 in v:
+    if 0 in v[:2]:
         warn = "Warning. One or more windows have a calculated shading factor of 0?\n"\
         "Thats probably not right. Double check window: {}. It might have its surface normal\n"\
         "backwards or something else funny is happening with your shading surfaces? Double check.".format(k)
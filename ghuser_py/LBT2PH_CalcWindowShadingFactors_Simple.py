@@ -35,6 +35,7 @@ EM November 25, 2020
         _windowSurrounds: (Tree) Each branch of the tree should represent one window. Each branch should have a list of 4 surfaces corresponding to the Bottom, Left, Top and Right window 'reveals' for windows which are inset into the wall or surface. Use the IDF2PH 'Create Window Reveals' component to automatically create this geometry.
         _bldgEnvelopeSrfcs: (list) The building (HB Zone) surfaces with the windows 'punched' out. Use the IDF2PH 'Create Window Reveals' component to automatically create this geometry.
         _shadingSrfcs: (list) <Optional> Any additional shading geometry (overhangs, neighbors, trees, etc...) you'd like to take into account when generating shading factors. Note that the more elements included, the slower this will run. 
+        analytic_reveals_: (bool) <Optional> Set to 'True' to take each window's reveal dimensions straight from its install depth and frame widths, instead of searching the geometry. The full search is still used for any window with other shading objects sticking out in front of its reveals. Default=False
     Returns:
         HBZones_: The updated Honeybee Zone objects to pass along to the next step.
         checklines_: Preview geometry showing the search lines used to find shading geometry.
@@ -111,13 +112,17 @@ for window_surround_branch in _window_surrounds.Branches:
 shading_srfcs += _envelope_surfaces
 shading_srfcs += _shading_surfaces
 
+# Spatial index of the shading surfaces, so each window only tests the ones nearby
+shading_index = LBT2PH.shading.ShadingIndex( shading_srfcs )
+
 # ------------------------------------------------------------------------------
 new_hb_rooms_ = []
+window_jobs = []
 for room in _HB_rooms:
     new_room = room.duplicate()
+    new_hb_rooms_.append(new_room)
     
     if not runIt_:
-        new_hb_rooms_.append(new_room)
         break
     
     for face in new_room.faces:
@@ -135,22 +140,37 @@ for room in _HB_rooms:
                 print('No "phpp" data found on the aperture.user_data for {}?'.format(name), e)
                 continue
             
-            new_shading_dims_obj = LBT2PH.shading.calc_shading_dims_simple( phpp_window, shading_srfcs, limit )
-            phpp_window.shading_dimensions = new_shading_dims_obj
-            
-            checklines_.append(phpp_window.shading_dimensions.horizon.checkline)
-            checklines_.append(phpp_window.shading_dimensions.overhang.checkline)
-            checklines_.append(phpp_window.shading_dimensions.reveal.checkline1)
-            checklines_.append(phpp_window.shading_dimensions.reveal.checkline2)
-            
-            # ------------------------------------------------------------------
-            # Add the new data back to the aperture
-            new_user_data = {'phpp': {} }
-            
-            new_user_data['phpp'] = phpp_window.to_dict()
-            
-            aperture.user_data = new_user_data
-            
-    new_hb_rooms_.append(new_room)
+            window_jobs.append( (aperture, phpp_window) )
+
+# ------------------------------------------------------------------------------
+# Find the shading dimensions for every window. Each window's time (seconds) is printed to 'out'
+phpp_windows = [phpp_window for aperture, phpp_window in window_jobs]
+results = LBT2PH.shading.calc_shading_dims_simple_batch(phpp_windows, shading_srfcs,
+                                                        limit, shading_index, analytic_reveals_)
+
+# ------------------------------------------------------------------------------
+# Add the new data back to the apertures, in room / face / aperture order
+for (aperture, phpp_window), (new_shading_dims_obj, seconds, error) in zip(window_jobs, results):
+    name = aperture.display_name
+    if error is not None:
+        msg = 'Could not calculate the shading dimensions for window "{}":\n{}'.format(name, error)
+        ghenv.Component.AddRuntimeMessage(ghk.GH_RuntimeMessageLevel.Warning, msg)
+        continue
+    print('{}: {:.3f}s'.format(name, seconds))
+    
+    phpp_window.shading_dimensions = new_shading_dims_obj
+    
+    checklines_.append(phpp_window.shading_dimensions.horizon.checkline)
+    checklines_.append(phpp_window.shading_dimensions.overhang.checkline)
+    checklines_.append(phpp_window.shading_dimensions.reveal.checkline1)
+    checklines_.append(phpp_window.shading_dimensions.reveal.checkline2)
+    
+    # --------------------------------------------------------------------------
+    # Add the new data back to the aperture
+    new_user_data = {'phpp': {} }
+    
+    new_user_data['phpp'] = phpp_window.to_dict()
+    
+    aperture.user_data = new_user_data
 
 HB_rooms_ = new_hb_rooms_
\ No newline at end of file
@@ -47,9 +47,11 @@ EM December 23, 2020
         estimated_tfa_: <bool> Set True to have this component try and estimate the TFA based on the gross floor area of the Honeybee Zones/ surfaces. Leave False or blank to have it try and read TFA info from the PHPP Rooms / Rhino Scene.
         variants_: Input for the 'Variants' component. Used to configure the Variants worksheet if you are using that functionality. 
         ud_custom_: Input one or more 'UD XL Obj' items here to write custom values anywhere in the workbook. Be careful with this as you can break the PHPP by accident. For experienced users only.
+        aggregate_windows_: <Optional :bool> Set True to write identical windows (same host surface, frame, glazing, install conditions, and the same size, orientation and shading within a small tolerance) to a single row of the 'Windows' worksheet, with their total quantity. Useful for large, repetitive facades. Default=False (one row per window).
     Returns:
         footprint_: Preview of the 'footprint' found based on the input geometry. This is used for PER evaluation in the PHPP.
         excel_objects_: Excel obejcts which are ready to wrtite out to the PHPP file. Connect these tothe 'Wrtie XL Workbook' component.
+        window_groups_: If 'aggregate_windows_' is True, shows which 'Windows' worksheet row each of the original windows was written to.
 """
 
 ghenv.Component.Name = "LBT2PH_ConvertLBT2PHPPObjs"
@@ -73,6 +75,7 @@ reload(LBT2PH.lbt_to_phpp)
 reload( LBT2PH.to_excel )
 
 excel_objects_ = DataTree[Object]() 
+window_groups_ = []
 
 #-------------------------------------------------------------------------------
 # Get all the info from the LBT Model
@@ -118,6 +121,10 @@ if _HB_model:
     winComponentsList                = LBT2PH.to_excel.build_components( surfaces_windows )
     areasList, surfacesIncluded      = LBT2PH.to_excel.build_areas( surfaces_opaque, hb_room_names, uValueUID_Names )
     tb_List                          = LBT2PH.to_excel.build_thermal_bridges( thermal_bridges, start_row_dict)
+    if aggregate_windows_:
+        surfaces_windows, window_groups_ = LBT2PH.to_excel.aggregate_windows( surfaces_windows, surfacesIncluded )
+        msg = 'Collapsed {} windows down to {} rows of the Windows worksheet.'.format(len(window_groups_), len(surfaces_windows))
+        ghenv.Component.AddRuntimeMessage(ghK.GH_RuntimeMessageLevel.Remark, msg)
     winSurfacesList                  = LBT2PH.to_excel.build_windows( surfaces_windows, surfacesIncluded, surfaces_opaque )   
     shadingList                      = LBT2PH.to_excel.build_shading( surfaces_windows, surfacesIncluded )
     tfa                              = LBT2PH.to_excel.build_TFA (phpp_spaces, hb_room_names, estimated_tfa_, _HB_model)
@@ -42,6 +42,7 @@ ghenv.Component.SubCategory = "01 | Model"
 from itertools import izip
 
 import System
+import Grasshopper.Kernel as ghK
 import LBT2PH
 import LBT2PH.windows
 import LBT2PH.helpers
@@ -115,6 +116,7 @@ rh_doc_frame_and_glass_objs = LBT2PH.windows.build_frame_and_glass_objs_from_RH_
 #-------------------------------------------------------------------------------
 apertures_ = []
 window_guids = []
+window_objs = []
 
 if apertures:
     window_guids = window_rh_Guids()
@@ -162,7 +164,6 @@ for aperture, window_guid, gh_input in izip(apertures, window_guids, gh_inputs):
     
     #---------------------------------------------------------------------------
     # Create a new 'Window' Object based on the aperture, Frame, Glass, Installs
-    # Create EP Constructions for each window (based on frame / glass)
     
     window_obj = LBT2PH.windows.PHPP_Window()
     
@@ -173,6 +174,22 @@ for aperture, window_guid, gh_input in izip(apertures, window_guids, gh_inputs):
     window_obj.install_depth = aperture_params.get('InstallDepth', 0.1)
     window_obj.variant_type = aperture_params.get('VariantType','a')
     
+    window_objs.append( (aperture, aperture_params, window_obj) )
+
+
+# Work out the U-W-Installed of all the windows in one go
+#-------------------------------------------------------------------------------
+LBT2PH.windows.calc_window_metrics( window_obj for _, _, window_obj in window_objs )
+
+for aperture, aperture_params, window_obj in window_objs:
+    if window_obj.u_w_installed is None:
+        # No area, so no U-W-Installed. Pass the aperture through as it is.
+        msg = "Aperture '{}' has no area? It is passed through without any PHPP data.".format(aperture.display_name)
+        ghenv.Component.AddRuntimeMessage(ghK.GH_RuntimeMessageLevel.Warning, msg)
+        apertures_.append(aperture)
+        continue
+    
+    # Create EP Constructions for each window (based on frame / glass)
     window_EP_material = LBT2PH.windows.create_EP_window_mat( window_obj )
     window_EP_const = LBT2PH.windows.create_EP_const( window_EP_material )
     
@@ -47,6 +47,7 @@ ghenv.Component.SubCategory = "01 | Model"
 import ghpythonlib.components as ghc
 import Grasshopper.Kernel as ghK
 from copy import deepcopy
+from itertools import izip
 
 import LBT2PH
 import LBT2PH.helpers
@@ -118,10 +119,11 @@ rhino_tfa_objects = LBT2PH.spaces.find_all_tfa_surfaces(_TFA_surfaces, ghenv, gh
 HB_rooms_ = []
 tfa_objs = {}
 if _HB_rooms:
-    for tfa_srfc_geom, tfa_srfc_params in rhino_tfa_objects:
+    # Find all the TFA's host Room/Zones in one go
+    tfa_hosts = LBT2PH.spaces.find_tfa_host_rooms([geom for geom, _ in rhino_tfa_objects], _HB_rooms)
+    
+    for (tfa_srfc_geom, tfa_srfc_params), (centroid, host_room) in izip(rhino_tfa_objects, tfa_hosts):
         # ----------------------------------------------------------------------
-        # Find the TFA's host Room/Zone
-        centroid, host_room = LBT2PH.spaces.find_tfa_host_room(tfa_srfc_geom, _HB_rooms)
         tfa_obj = LBT2PH.spaces.TFA_Surface(tfa_srfc_geom, host_room, tfa_srfc_params)
         if host_room is None: LBT2PH.spaces.display_host_error(tfa_obj, ghenv)
         
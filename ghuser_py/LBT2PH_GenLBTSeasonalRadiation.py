@@ -83,6 +83,41 @@ EM December 9, 2020
             dramatically decrease calculation time but can interfere with
             other computational processes that might be running on your
             machine. (Default: False).
+        solver_: (str) Optional. The ray intersection solver to use:
+            "Rhino" (Default) uses the Rhino mesh / ray intersection.
+            "BVH" uses the LBT2PH bounding-volume-hierarchy solver, which does not need
+            Rhino and is usually much faster for large or detailed context geometry.
+        search_radius_: (float) Optional. For each window, ignore any shading geometry
+            further away than this distance (Rhino model units). Geometry behind the window,
+            or below it, is always ignored since it can never shade the window.
+            Default is no limit.
+        batch_: (bool) Optional. Set to "True" to ray-cast all of the windows together in
+            a single intersection call (per season) against the full shading geometry,
+            instead of one call per window. This is usually faster for models with many
+            small windows, especially with parallel_ set to True. search_radius_ is
+            ignored in batch mode. (Default: False).
+        adaptive_tolerance_: (float) Optional. If set, each window's analysis grid is
+            refined adaptively instead of using a fixed grid: it starts at grid_size_ and
+            splits the cells only where the shading changes (ie: at the edge of a shadow),
+            until the estimated error of the window's seasonal shading factor (0-1) is under
+            this tolerance. ie: 0.02 for +/-2%. Usually gives the same accuracy with far
+            fewer rays. When used, set grid_size_ to a coarse value (ie: 1.0).
+        cache_folder_: (str) Optional. The folder to keep previously calculated window results in.
+            Windows whose geometry, nearby shading geometry, grid size and skies have not
+            changed since the last run are read from here instead of being recalculated.
+            Default is an 'LBT2PH/shading_cache' folder in the system's temp folder.
+        clear_cache_: (bool) Set to "True" to delete all the previously cached results
+            (and the decoded skies and context meshes) and recalculate every window.
+        stream_file_: (str) Optional. A CSV file path to write each window's detailed (per-face)
+            results to, as each window is done, instead of keeping them all in memory.
+            Useful for large, detailed studies. The shaded / unshaded outputs still give
+            each window's average, and the meshes / legend are built from the file.
+            Note that in batch_ mode all the windows are still ray-cast together, so the
+            intersection results for every window are in memory at once.
+        period_sky_mtxs_: (list) Optional. Any number of extra Sky Matrices (ie: one for each
+            month) to find each window's shading factor for. These re-use each window's stored
+            sky-patch visibility, so there is no extra ray-casting. They must use the same
+            sky density and north as the _winter_sky_mtx. Not used with an adaptive_tolerance_.
         _run: (bool) Set to "True" to run the component and perform incident radiation
             analysis.
    Returns:
@@ -109,6 +144,15 @@ EM December 9, 2020
             surface in the same order they were passed into the component. In order to calculate
             the 'shading factor' for each window, simply divide this 'unshaded' radiation
             by the shaded radiation for the same window.
+        analysis_point_count_: The number of analysis points ray-cast for each window.
+        estimated_error_: The estimated error of each window's seasonal shading factors,
+            when using an adaptive_tolerance_. None otherwise.
+        visibility_: Each window's stored sky-patch visibility (which patches each analysis
+            point can see). One per branch, in window order.
+        period_shading_factors_: The shading factor (0=fully shaded, 1=fully unshaded) of
+            each window for each of the period_sky_mtxs_. One branch per window, with one
+            value per sky in the same order as the period_sky_mtxs_ input. Connect to the
+            'Apply Win. Shading Factors' component's 'monthly_shading_factors_' input.
         -----
         winter_radiation_shaded_mesh_: A colored mesh of the test _geometry representing the cumulative
             incident radiation (kWh) received by the input _geometry over the WINTER period.
@@ -133,9 +177,15 @@ import Rhino
 
 import LBT2PH
 import LBT2PH.shading_lbt
+import LBT2PH.shading_cache
+import LBT2PH.visibility
+import LBT2PH.radiation_stream
 
 reload( LBT2PH )
 reload( LBT2PH.shading_lbt )
+reload( LBT2PH.shading_cache )
+reload( LBT2PH.visibility )
+reload( LBT2PH.radiation_stream )
 
 #-------------------------------------------------------------------------------
 grid_size = 0.5
@@ -146,20 +196,33 @@ else:
     mesh_params = Rhino.Geometry.MeshingParameters.Default
 
 if _run:
-    # Create the context shading Mesh geometry
+    if clear_cache_:
+        LBT2PH.shading_lbt.sky_matrix_cache().clear()
+        LBT2PH.shading_lbt.context_mesh_cache().clear()
+    
+    # Create the context shading Mesh geometry. Only new / changed Breps are re-meshed.
     #---------------------------------------------------------------------------
     shade_mesh = LBT2PH.shading_lbt.create_shading_mesh(_envelope_surfaces_punched,
-                additional_shading_surfaces_, _window_surrounds, mesh_params, ghenv)
+                additional_shading_surfaces_, _window_surrounds, mesh_params, ghenv, parallel_)
+    solver = solver_ if solver_ else 'Rhino'
+    shading_context = LBT2PH.shading_lbt.create_shading_context(shade_mesh)
     
     
     # deconstruct the sky-matrix and get the sky dome vectors. Winter (w) and Summer (s)
     #---------------------------------------------------------------------------
-    w_sky_vecs, w_total_sky_rad = LBT2PH.shading_lbt.deconstruct_sky_matrix(_winter_sky_mtx)
-    s_sky_vecs, s_total_sky_rad = LBT2PH.shading_lbt.deconstruct_sky_matrix(_summer_sky_mtx)
+    w_sky_vecs, w_total_sky_rad, w_dome_key = LBT2PH.shading_lbt.decode_sky_matrix(_winter_sky_mtx)
+    s_sky_vecs, s_total_sky_rad, s_dome_key = LBT2PH.shading_lbt.decode_sky_matrix(_summer_sky_mtx)
+    
+    # If both skies use the same dome and north, the rays only need to be cast once
+    shared_dome = LBT2PH.shading_lbt.skies_share_geometry(w_dome_key, s_dome_key)
     
     
     # Calc window surface shaded and unshaded radiation
     #---------------------------------------------------------------------------
+    results_cache = LBT2PH.shading_lbt.open_results_cache(cache_folder_, clear_cache_)
+    context_fingerprints = LBT2PH.shading_cache.ContextFingerprints(shading_context.vertices)
+    sky_keys = [(w_dome_key, w_total_sky_rad), (s_dome_key, s_total_sky_rad)]
+    
     winter_radiation_shaded_ = DataTree[Object]()
     winter_radiation_shaded_detailed_ = DataTree[Object]()
     winter_radiation_unshaded_ = DataTree[Object]()
@@ -167,55 +230,237 @@ if _run:
     summer_radiation_shaded_detailed_ = DataTree[Object]()
     summer_radiation_unshaded_ = DataTree[Object]()
     mesh_by_window = DataTree[Object]()
+    analysis_point_count_ = DataTree[Object]()
+    estimated_error_ = DataTree[Object]()
+    visibility_ = DataTree[Object]()
+    period_shading_factors_ = DataTree[Object]()
     lb_window_meshes = []
     
-    for i, window_surface in enumerate(_window_surfaces):
-        pts, nrmls, win_msh, win_msh_bck, rh_msh = LBT2PH.shading_lbt.build_window_meshes(window_surface, grid_size, mesh_params)
-        lb_window_meshes.append(win_msh)
+    # Adaptive mode refines each window's grid separately, so it is never batched
+    adaptive = bool(adaptive_tolerance_)
+    if adaptive and batch_:
+        msg = 'Note: batch_ is ignored when using an adaptive_tolerance_.'
+        ghenv.Component.AddRuntimeMessage( ghK.GH_RuntimeMessageLevel.Remark, msg )
+        batch_ = False
+    cache_options = ['adaptive', float(adaptive_tolerance_)] if adaptive else None
+    
+    # Any number of extra skies, applied to each window's stored visibility
+    period_skies = LBT2PH.shading_lbt.decode_period_skies(period_sky_mtxs_ or [])
+    if period_skies and adaptive:
+        msg = 'Note: period_sky_mtxs_ are ignored when using an adaptive_tolerance_.'
+        ghenv.Component.AddRuntimeMessage( ghK.GH_RuntimeMessageLevel.Remark, msg )
+        period_skies = []
+    if any(not LBT2PH.shading_lbt.skies_share_geometry(dome_key, w_dome_key) for _, _, dome_key in period_skies):
+        msg = 'One or more of the period_sky_mtxs_ do not use the same sky density and north\n'\
+        'as the _winter_sky_mtx. No shading factors can be found for those (None).'
+        ghenv.Component.AddRuntimeMessage( ghK.GH_RuntimeMessageLevel.Warning, msg )
+    
+    # In batch mode every window is ray-cast against the full context in a single call,
+    # so there is no per-window culling (and so no search radius) for the rays.
+    window_search_radius = None if batch_ else search_radius_
+    if batch_ and search_radius_:
+        msg = 'Note: search_radius_ is ignored when batch_ is True. All shading geometry is used.'
+        ghenv.Component.AddRuntimeMessage( ghK.GH_RuntimeMessageLevel.Remark, msg )
+    
+    # Streaming mode: the per-face results go to disk as each window is done,
+    # not into the DataTrees. Only each window's averages are kept in memory.
+    stream = LBT2PH.radiation_stream.RadiationWriter(stream_file_) if stream_file_ else None
+    
+    def prepare_window(window_surface, keep_cached):
+        """Builds the window's analysis mesh, and finds any results from previous runs """
         
-        # Solve Winter
-        # ----------------------------------------------------------------------
-        args_winter = (shade_mesh, win_msh_bck, pts, w_sky_vecs, nrmls, parallel_)
+        pts, nrmls, win_msh, rh_msh = LBT2PH.shading_lbt.build_window_analysis_meshes(window_surface, grid_size)
         
-        int_matrix_s, int_matrix_u, angles_s, angles_u = LBT2PH.shading_lbt.generate_intersection_data(*args_winter)
-        w_rads_shaded, face_areas = LBT2PH.shading_lbt.calc_win_radiation(int_matrix_s, angles_s, w_total_sky_rad, win_msh)
-        w_rads_unshaded, face_areas = LBT2PH.shading_lbt.calc_win_radiation(int_matrix_u, angles_u, w_total_sky_rad, win_msh)
+        # Only the context geometry which could shade this window. Shared by both seasons.
+        win_shade_mesh = LBT2PH.shading_lbt.window_shading_context(shading_context, win_msh, window_search_radius, solver)
         
-        winter_radiation_shaded_detailed_.AddRange(w_rads_shaded, GH_Path(i))
-        winter_radiation_shaded_.Add(sum(w_rads_shaded)/sum(face_areas), GH_Path(i))
-        winter_radiation_unshaded_.Add(sum(w_rads_unshaded)/sum(face_areas), GH_Path(i))
+        # Re-use the results from a previous run if nothing about this window has changed
+        cache_key = LBT2PH.shading_lbt.window_cache_key(win_msh, win_shade_mesh, grid_size, sky_keys, solver,
+                        cache_options, context_fingerprints)
+        cached = results_cache.get(cache_key)
+        point_count, error = len(pts), None
+        if cached and period_skies and not adaptive and 'visibility' not in cached:
+            cached = None   # From before the visibility was stored
+        if cached:
+            cached = LBT2PH.shading_lbt.results_from_cache(cached)
+            if 'adaptive' in cached:
+                win_msh, rh_msh = LBT2PH.shading_lbt.adaptive_mesh_from_cache(cached['adaptive'])
+                point_count, error = cached['adaptive']['point_count'], cached['adaptive']['error']
         
+        # If the results aren't used straight away, don't hold on to them. They are read again when output.
+        return {'surface': window_surface, 'pts': pts, 'nrmls': nrmls, 'win_msh': win_msh,
+                'rh_msh': rh_msh, 'shade_mesh': win_shade_mesh, 'cache_key': cache_key,
+                'results': cached if keep_cached else None, 'cached': cached is not None,
+                'point_count': point_count, 'error': error}
+    
+    def solve_window(window, w_data=None, s_data=None):
+        """Solves the window's radiation, and saves it to the cache
+        
+        w_data / s_data are the window's (int_matrix, angles) from the batched
+        intersection, if any. Otherwise the window is ray-cast on its own.
+        """
         
-        # Solve Summer
+        win_msh = window['win_msh']
+        
+        # Adaptive grid: refine until the shading factors are within the tolerance
         # ----------------------------------------------------------------------
-        args_summer = (shade_mesh, win_msh_bck, pts, s_sky_vecs, nrmls, parallel_)
+        if adaptive:
+            skies = [(w_sky_vecs, w_total_sky_rad), (s_sky_vecs, s_total_sky_rad)]
+            win_msh, rh_msh, results, point_count, error = LBT2PH.shading_lbt.adaptive_window_radiation(
+                window['surface'], window['shade_mesh'], skies, shared_dome, grid_size, adaptive_tolerance_, parallel_)
+            window.update( {'win_msh': win_msh, 'rh_msh': rh_msh, 'results': results,
+                            'point_count': point_count, 'error': error} )
+            results_cache.put(window['cache_key'], LBT2PH.shading_lbt.results_to_cache(results))
+            return
         
-        int_matrix_s, int_matrix_u, angles_s, angles_u = LBT2PH.shading_lbt.generate_intersection_data(*args_summer)
-        s_rads_shaded, face_areas = LBT2PH.shading_lbt.calc_win_radiation(int_matrix_s, angles_s, s_total_sky_rad, win_msh)
-        s_rads_unshaded, face_areas = LBT2PH.shading_lbt.calc_win_radiation(int_matrix_u, angles_u, s_total_sky_rad, win_msh)
+        # Solve Winter (and Summer too, if the skies share the same dome)
+        # ----------------------------------------------------------------------
+        if w_data:
+            int_matrix_s, angles_s = w_data
+        else:
+            args_winter = (window['shade_mesh'], window['pts'], w_sky_vecs, window['nrmls'], parallel_)
+            int_matrix_s, angles_s = LBT2PH.shading_lbt.generate_shaded_intersection_data(*args_winter)
+        visibility = LBT2PH.shading_lbt.window_visibility(int_matrix_s, win_msh, w_dome_key)
         
-        summer_radiation_shaded_detailed_.AddRange(s_rads_shaded, GH_Path(i))
-        summer_radiation_shaded_.Add(sum(s_rads_shaded)/sum(face_areas), GH_Path(i))
-        summer_radiation_unshaded_.Add(sum(s_rads_unshaded)/sum(face_areas), GH_Path(i))
+        if shared_dome:
+            sky_rads = [w_total_sky_rad, s_total_sky_rad]
+            w_shaded, s_shaded = LBT2PH.shading_lbt.calc_win_radiation_multi(int_matrix_s, angles_s, sky_rads, win_msh)
+        else:
+            w_shaded = LBT2PH.shading_lbt.calc_win_radiation_shaded(int_matrix_s, angles_s, w_total_sky_rad, win_msh)
+            
+            # Solve Summer
+            # ------------------------------------------------------------------
+            if s_data:
+                int_matrix_s, angles_s = s_data
+            else:
+                args_summer = (window['shade_mesh'], window['pts'], s_sky_vecs, window['nrmls'], parallel_)
+                int_matrix_s, angles_s = LBT2PH.shading_lbt.generate_shaded_intersection_data(*args_summer)
+            s_shaded = LBT2PH.shading_lbt.calc_win_radiation_shaded(int_matrix_s, angles_s, s_total_sky_rad, win_msh)
         
+        # Unshaded baseline, computed analytically (no ray-casting)
+        # ----------------------------------------------------------------------
+        w_unshaded = LBT2PH.shading_lbt.calc_win_radiation_unshaded(w_sky_vecs, w_total_sky_rad, win_msh)
+        s_unshaded = LBT2PH.shading_lbt.calc_win_radiation_unshaded(s_sky_vecs, s_total_sky_rad, win_msh)
         
-        mesh_by_window.Add(rh_msh, GH_Path(i) )
-    
+        window['results'] = {'winter_shaded': w_shaded, 'summer_shaded': s_shaded,
+                             'winter_unshaded': w_unshaded, 'summer_unshaded': s_unshaded,
+                             'visibility': visibility.to_dict()}
+        results_cache.put(window['cache_key'], LBT2PH.shading_lbt.results_to_cache(window['results']))
     
-    # Create the mesh and legend outputs
-    # --------------------------------------------------------------------------
-    # Flatten the radiation data trees
-    winter_rad_vals = [item for branch in winter_radiation_shaded_detailed_.Branches for item in branch]
-    summer_rad_vals = [item for branch in summer_radiation_shaded_detailed_.Branches for item in branch]
+    def output_window(i, window):
+        """Adds the window's results to the outputs (or the stream file), then drops its per-face results """
+        
+        results = window['results']
+        if results is None:
+            cached = results_cache.get(window['cache_key'])
+            if cached:
+                results = LBT2PH.shading_lbt.results_from_cache(cached)
+            else:
+                # Dropped from the cache since it was prepared (ie: evicted). Solve it again.
+                solve_window(window)
+                results = window['results']
+        
+        w_rads_shaded, face_areas, w_avg_shaded = results['winter_shaded']
+        w_rads_unshaded, face_areas, w_avg_unshaded = results['winter_unshaded']
+        s_rads_shaded, face_areas, s_avg_shaded = results['summer_shaded']
+        s_rads_unshaded, face_areas, s_avg_unshaded = results['summer_unshaded']
+        
+        if stream:
+            name = _window_names[i] if i < len(_window_names) else ''
+            stream.write_window(i, name, face_areas, w_rads_shaded, s_rads_shaded)
+        else:
+            winter_radiation_shaded_detailed_.AddRange(w_rads_shaded, GH_Path(i))
+            summer_radiation_shaded_detailed_.AddRange(s_rads_shaded, GH_Path(i))
+        
+        winter_radiation_shaded_.Add(w_avg_shaded, GH_Path(i))
+        winter_radiation_unshaded_.Add(w_avg_unshaded, GH_Path(i))
+        
+        summer_radiation_shaded_.Add(s_avg_shaded, GH_Path(i))
+        summer_radiation_unshaded_.Add(s_avg_unshaded, GH_Path(i))
+        
+        mesh_by_window.Add(window['rh_msh'], GH_Path(i) )
+        lb_window_meshes.append(window['win_msh'])
+        analysis_point_count_.Add(window['point_count'], GH_Path(i))
+        estimated_error_.Add(window['error'], GH_Path(i))
+        
+        if 'visibility' in results:
+            visibility = LBT2PH.visibility.VisibilityMatrix.from_dict(results['visibility'])
+            visibility_.Add(visibility, GH_Path(i))
+            if period_skies:
+                factors = LBT2PH.shading_lbt.period_shading_factors(visibility, period_skies)
+                period_shading_factors_.AddRange(factors, GH_Path(i))
+        
+        # Everything needed is in the outputs (or on disk) now
+        window['results'] = None
+        window['pts'], window['nrmls'], window['shade_mesh'] = None, None, None
     
-    # Create the single window Mesh
-    joined_window_mesh = LBT2PH.shading_lbt.create_window_mesh( lb_window_meshes )
+    try:
+        if not batch_:
+            # Each window is solved and output as soon as it is ready
+            # ------------------------------------------------------------------
+            for i, window_surface in enumerate(_window_surfaces):
+                window = prepare_window(window_surface, True)
+                if window['results'] is None:
+                    solve_window(window)
+                output_window(i, window)
+        else:
+            # Batch mode: one intersection call for all the windows, per season
+            # ------------------------------------------------------------------
+            windows = [prepare_window(window_surface, False) for window_surface in _window_surfaces]
+            to_solve = [window for window in windows if not window['cached']]
+            
+            if to_solve:
+                batch_shade_mesh = LBT2PH.shading_lbt.batch_shading_mesh(shading_context, shade_mesh, solver)
+                pts_by_window = [window['pts'] for window in to_solve]
+                nrmls_by_window = [window['nrmls'] for window in to_solve]
+                
+                w_batch = LBT2PH.shading_lbt.generate_intersection_data_batched(batch_shade_mesh,
+                            pts_by_window, w_sky_vecs, nrmls_by_window, parallel_)
+                if shared_dome:
+                    s_batch = w_batch
+                else:
+                    s_batch = LBT2PH.shading_lbt.generate_intersection_data_batched(batch_shade_mesh,
+                                pts_by_window, s_sky_vecs, nrmls_by_window, parallel_)
+                
+                for k, window in enumerate(to_solve):
+                    solve_window(window, w_batch[k], None if shared_dome else s_batch[k])
+                    w_batch[k] = None
+                    if not shared_dome: s_batch[k] = None
+                    
+                    # Only keep the results if streaming. They are read back from the cache when output.
+                    if stream: window['results'] = None
+            
+            for i, window in enumerate(windows):
+                output_window(i, window)
+    finally:
+        if stream:
+            stream.close()
     
-    winter_graphic, title = LBT2PH.shading_lbt.create_graphic_container('Winter', winter_rad_vals, joined_window_mesh, legend_par_)
-    winter_radiation_shaded_mesh_, legend = LBT2PH.shading_lbt.create_rhino_mesh(winter_graphic, joined_window_mesh)
     
-    summer_graphic, title = LBT2PH.shading_lbt.create_graphic_container('Summer', summer_rad_vals, joined_window_mesh, legend_par_)
-    summer_radiation_shaded_mesh_, legend = LBT2PH.shading_lbt.create_rhino_mesh(summer_graphic, joined_window_mesh)
+    # Create the mesh and legend outputs
+    # --------------------------------------------------------------------------
+    if stream:
+        # Colour the window meshes from the file, a window at a time, using the
+        # min / max found while writing the values for the legends
+        winter_radiation_shaded_mesh_, legend, title = LBT2PH.shading_lbt.streamed_radiation_mesh(
+                    'Winter', stream_file_, 'winter_shaded_kWh', lb_window_meshes, legend_par_,
+                    stream.ranges['winter_shaded_kWh'])
+        summer_radiation_shaded_mesh_, legend, title = LBT2PH.shading_lbt.streamed_radiation_mesh(
+                    'Summer', stream_file_, 'summer_shaded_kWh', lb_window_meshes, legend_par_,
+                    stream.ranges['summer_shaded_kWh'])
+    else:
+        # Flatten the radiation data trees
+        winter_rad_vals = [item for branch in winter_radiation_shaded_detailed_.Branches for item in branch]
+        summer_rad_vals = [item for branch in summer_radiation_shaded_detailed_.Branches for item in branch]
+        
+        # Create the single window Mesh
+        joined_window_mesh = LBT2PH.shading_lbt.create_window_mesh( lb_window_meshes )
+        
+        winter_graphic, title = LBT2PH.shading_lbt.create_graphic_container('Winter', winter_rad_vals, joined_window_mesh, legend_par_)
+        winter_radiation_shaded_mesh_, legend = LBT2PH.shading_lbt.create_rhino_mesh(winter_graphic, joined_window_mesh)
+        
+        summer_graphic, title = LBT2PH.shading_lbt.create_graphic_container('Summer', summer_rad_vals, joined_window_mesh, legend_par_)
+        summer_radiation_shaded_mesh_, legend = LBT2PH.shading_lbt.create_rhino_mesh(summer_graphic, joined_window_mesh)
 
 if _HB_rooms and not _run:
     msg = 'Please set _run to True in order to calculate Radiation results.'
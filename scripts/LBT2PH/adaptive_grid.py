@@ -0,0 +1,293 @@
+"""Error-driven analysis grid for a planar window.
+
+Starts from a coarse grid and splits (into 4) only the cells whose value differs
+from their neighbours', ie: along a shadow edge, until the estimated error of
+the window's average is under the tolerance. Cells are clipped to the window
+outline, so odd-shaped windows get the right area.
+"""
+
+import math
+from collections import namedtuple
+
+import LBT2PH.spatial
+from LBT2PH.vectors import xyz, unit
+
+Cell = namedtuple('Cell', ['bounds', 'depth', 'pieces', 'area', 'sample'])
+AdaptiveResult = namedtuple('AdaptiveResult', ['cells', 'values', 'point_count', 'error', 'converged'])
+
+EPSILON = 1e-9
+
+
+def clip_polygon(_polygon, _u0, _v0, _u1, _v1):
+    """Clips a 2D polygon to a rectangle (Sutherland-Hodgman)
+
+    The polygon may be concave, the rectangle is the (convex) clip region.
+
+    Arguments:
+        _polygon: (list: tuple) The (u, v) polygon vertices
+        _u0, _v0, _u1, _v1: (float) The rectangle bounds
+    Returns:
+        polygon: (list: tuple) The clipped polygon. Empty if there is no overlap.
+    """
+
+    edges = (
+        (lambda p: p[0] >= _u0, lambda a, b: _cross_u(a, b, _u0)),
+        (lambda p: p[0] <= _u1, lambda a, b: _cross_u(a, b, _u1)),
+        (lambda p: p[1] >= _v0, lambda a, b: _cross_v(a, b, _v0)),
+        (lambda p: p[1] <= _v1, lambda a, b: _cross_v(a, b, _v1)),
+    )
+
+    output = list(_polygon)
+    for inside, intersect in edges:
+        if not output:
+            break
+        polygon, output = output, []
+        prev = polygon[-1]
+        for pt in polygon:
+            if inside(pt):
+                if not inside(prev):
+                    output.append(intersect(prev, pt))
+                output.append(pt)
+            elif inside(prev):
+                output.append(intersect(prev, pt))
+            prev = pt
+
+    return output
+
+
+def area_centroid(_polygon):
+    """Returns the (area, (u, v) centroid) of a simple 2D polygon """
+
+    area2 = cu = cv = 0.0
+    n = len(_polygon)
+    for i in range(n):
+        u0, v0 = _polygon[i]
+        u1, v1 = _polygon[(i + 1) % n]
+        cross = u0 * v1 - u1 * v0
+        area2 += cross
+        cu += (u0 + u1) * cross
+        cv += (v0 + v1) * cross
+
+    if abs(area2) < EPSILON:
+        if not n:
+            return 0.0, (0.0, 0.0)
+        return 0.0, (sum(p[0] for p in _polygon) / n, sum(p[1] for p in _polygon) / n)
+
+    return abs(area2) / 2.0, (cu / (3.0 * area2), cv / (3.0 * area2))
+
+
+class AdaptiveGrid(object):
+    """An error-driven, quadtree analysis grid on a planar window
+
+    Arguments:
+        _polygons: (list: list) The window outline(s): each a list of 3D points
+            (tuples, or Ladybug / Rhino points). All must lie in the same plane.
+        _normal: The window's normal
+        _cell_size: (float) The starting (coarsest) cell size. There are always at
+            least 2 cells in each direction, so that there is something to compare.
+        _offset: (float) Optional. Distance to move the analysis points off the window
+            along the normal, so they do not intersect the window itself.
+    """
+
+    def __init__(self, _polygons, _normal, _cell_size, _offset=0.0):
+        pts3d = [[xyz(pt) for pt in polygon] for polygon in _polygons]
+        self.normal = unit(xyz(_normal))
+        self.offset = float(_offset)
+        self.origin, self.x_axis, self.y_axis = _plane_frame(pts3d[0], self.normal)
+        self.polygons = [[self._to_2d(pt) for pt in polygon] for polygon in pts3d]
+
+        us = [p[0] for polygon in self.polygons for p in polygon]
+        vs = [p[1] for polygon in self.polygons for p in polygon]
+        u0, u1, v0, v1 = min(us), max(us), min(vs), max(vs)
+        self.area = sum(area_centroid(polygon)[0] for polygon in self.polygons)
+        self.tolerance = max(u1 - u0, v1 - v0) * 1e-7
+
+        n_u = max(2, int(math.ceil((u1 - u0) / float(_cell_size) - EPSILON)))
+        n_v = max(2, int(math.ceil((v1 - v0) / float(_cell_size) - EPSILON)))
+        du, dv = (u1 - u0) / n_u, (v1 - v0) / n_v
+
+        self.initial_cells = []
+        for i in range(n_u):
+            for j in range(n_v):
+                cell = self._make_cell((u0 + i * du, v0 + j * dv, u0 + (i + 1) * du, v0 + (j + 1) * dv), 0)
+                if cell:
+                    self.initial_cells.append(cell)
+
+    def _to_2d(self, _pt):
+        d = [_pt[k] - self.origin[k] for k in range(3)]
+        return (_dot(d, self.x_axis), _dot(d, self.y_axis))
+
+    def to_3d(self, _uv, _offset=0.0):
+        """The 3D point for a (u, v) point in the window's plane """
+
+        u, v = _uv
+        return tuple(self.origin[k] + u * self.x_axis[k] + v * self.y_axis[k] + _offset * self.normal[k]
+                        for k in range(3))
+
+    def _make_cell(self, _bounds, _depth):
+        pieces = []
+        for polygon in self.polygons:
+            piece = clip_polygon(polygon, *_bounds)
+            if len(piece) < 3:
+                continue
+            area, centroid = area_centroid(piece)
+            if area > self.tolerance ** 2:
+                pieces.append((area, centroid, piece))
+
+        if not pieces:
+            return None
+
+        # Sample the centre of the largest piece, so the point is on the window
+        area = sum(p[0] for p in pieces)
+        sample = max(pieces, key=lambda p: p[0])[1]
+        return Cell(_bounds, _depth, [p[2] for p in pieces], area, sample)
+
+    def _split(self, _cell):
+        u0, v0, u1, v1 = _cell.bounds
+        um, vm = (u0 + u1) / 2.0, (v0 + v1) / 2.0
+        children = []
+        for bounds in ((u0, v0, um, vm), (um, v0, u1, vm), (u0, vm, um, v1), (um, vm, u1, v1)):
+            child = self._make_cell(bounds, _cell.depth + 1)
+            if child:
+                children.append(child)
+        return children
+
+    def _cell_errors(self, _cells, _values):
+        """Estimated error contributed by each cell, for each value component
+
+        A cell's point value is taken as the value for the whole cell. The true
+        average over the cell is estimated to be within half the largest difference
+        to any edge-sharing neighbour cell. So the cell contributes up to:
+            area * max(|value - neighbour value|) / 2
+        """
+
+        n_comps = len(_values[0]) if _values else 0
+        spread = [[0.0] * n_comps for _ in _cells]
+        boxes = [((c.bounds[0], c.bounds[1]), (c.bounds[2], c.bounds[3])) for c in _cells]
+        for i, j in LBT2PH.spatial.overlapping_pairs(boxes, self.tolerance):
+            if not self._share_edge(_cells[i], _cells[j]):
+                continue
+            for k in range(n_comps):
+                diff = abs(_values[i][k] - _values[j][k])
+                if diff > spread[i][k]:
+                    spread[i][k] = diff
+                if diff > spread[j][k]:
+                    spread[j][k] = diff
+
+        return [[cell.area * s / 2.0 for s in cell_spread] for cell, cell_spread in zip(_cells, spread)]
+
+    def _share_edge(self, _cell_a, _cell_b):
+        a, b = _cell_a.bounds, _cell_b.bounds
+        overlap_u = min(a[2], b[2]) - max(a[0], b[0])
+        overlap_v = min(a[3], b[3]) - max(a[1], b[1])
+        return max(overlap_u, overlap_v) > self.tolerance
+
+    def refine(self, _evaluate, _tolerance, _max_depth=3, _max_points=None):
+        """Evaluates and refines the grid until the estimated error is under the tolerance
+
+        Arguments:
+            _evaluate: (callable) Called with a list of 3D analysis points. Must
+                return a list (one per point) of tuples of floats (ie: the shading
+                factor for each season). It is called once per refinement pass with
+                only the new points, so all the points in a pass can be ray-cast together.
+            _tolerance: (float) The target error of the window's area-weighted average,
+                in the same units as the values. Applies to each value component.
+            _max_depth: (int) The maximum number of times a starting cell can be split.
+            _max_points: (int) Optional. Stop refining once this many points have been evaluated.
+        Returns:
+            (AdaptiveResult) namedtuple with:
+                cells: (list: Cell) The final (leaf) cells
+                values: (list: tuple) The value(s) for each cell
+                point_count: (int) The total number of points evaluated
+                error: (float) The final estimated error of the window average (worst component)
+                converged: (bool) False if the tolerance could not be met within the
+                    depth / point limits
+        """
+
+        cells = list(self.initial_cells)
+        values = self._evaluate(_evaluate, cells)
+        point_count = len(cells)
+
+        while True:
+            cell_errors = self._cell_errors(cells, values)
+            n_comps = len(values[0]) if values else 0
+            totals = [sum(e[k] for e in cell_errors) for k in range(n_comps)]
+            error = max(totals) / self.area if totals and self.area else 0.0
+            if error <= _tolerance:
+                return AdaptiveResult(cells, values, point_count, error, True)
+
+            # Split the worst cells first, until enough error is (potentially) removed
+            candidates = sorted((i for i, c in enumerate(cells) if c.depth < _max_depth and max(cell_errors[i]) > 0),
+                                key=lambda i: -max(cell_errors[i]))
+            if _max_points is not None:
+                room = (int(_max_points) - point_count) // 4
+                candidates = candidates[:max(room, 0)]
+            if not candidates:
+                return AdaptiveResult(cells, values, point_count, error, False)
+
+            excess = (error - _tolerance) * self.area
+            to_split, removed = set(), 0.0
+            for i in candidates:
+                to_split.add(i)
+                removed += max(cell_errors[i])
+                if removed >= excess:
+                    break
+
+            new_cells, new_values, children = [], [], []
+            for i, cell in enumerate(cells):
+                if i in to_split:
+                    children.extend(self._split(cell))
+                else:
+                    new_cells.append(cell)
+                    new_values.append(values[i])
+
+            new_values.extend(self._evaluate(_evaluate, children))
+            new_cells.extend(children)
+            point_count += len(children)
+            cells, values = new_cells, new_values
+
+    def _evaluate(self, _evaluate, _cells):
+        if not _cells:
+            return []
+        points = [self.to_3d(cell.sample, self.offset) for cell in _cells]
+        return [tuple(float(v) for v in value) for value in _evaluate(points)]
+
+    def cell_polygons_3d(self, _cell):
+        """The 3D outline(s) of a cell, clipped to the window """
+
+        return [[self.to_3d(pt) for pt in piece] for piece in _cell.pieces]
+
+
+# ------------------------------------------------------------------------------
+def _plane_frame(_points, _normal):
+    origin = _points[0]
+    x_axis = None
+    for pt in _points[1:]:
+        d = [pt[k] - origin[k] for k in range(3)]
+        # Remove any out-of-plane component
+        along = _dot(d, _normal)
+        d = [d[k] - along * _normal[k] for k in range(3)]
+        if math.sqrt(_dot(d, d)) > EPSILON:
+            x_axis = unit(d)
+            break
+    if x_axis is None:
+        raise ValueError('Cannot build an adaptive grid on a degenerate window outline.')
+
+    nx, ny, nz = _normal
+    ax, ay, az = x_axis
+    y_axis = unit((ny * az - nz * ay, nz * ax - nx * az, nx * ay - ny * ax))
+    return origin, x_axis, y_axis
+
+
+def _cross_u(_a, _b, _u):
+    t = (_u - _a[0]) / (_b[0] - _a[0])
+    return (_u, _a[1] + t * (_b[1] - _a[1]))
+
+
+def _cross_v(_a, _b, _v):
+    t = (_v - _a[1]) / (_b[1] - _a[1])
+    return (_a[0] + t * (_b[0] - _a[0]), _v)
+
+
+def _dot(_a, _b):
+    return _a[0] * _b[0] + _a[1] * _b[1] + _a[2] * _b[2]
@@ -0,0 +1,120 @@
+"""Parsed index of the PHPP library entries (glazing, frames...) in the Rhino DocumentUserText.
+
+Only new or changed entries are parsed again on refresh, and nothing at all if
+the entries' hash has not changed. Reading the entries from the document is left
+to the caller.
+"""
+
+import hashlib
+import json
+from collections import namedtuple
+
+Category = namedtuple('Category', ['name', 'key_part', 'parser'])
+
+_Entry = namedtuple('_Entry', ['value', 'category', 'name', 'obj'])
+
+
+def content_hash(_entries):
+    """A hash of the (key, value) string pairs, independent of their order """
+
+    hasher = hashlib.sha1()
+    for key, value in sorted(_entries):
+        hasher.update(key.encode('utf-8'))
+        hasher.update(b'\x00')
+        hasher.update(value.encode('utf-8'))
+        hasher.update(b'\x01')
+    return hasher.hexdigest()
+
+
+class LibraryIndex(object):
+    """The parsed library entries, by category and name
+
+    Arguments:
+        _categories: (list: Category) For each category of entry:
+            name: (str) The category name (ie: 'lib_GlazingTypes')
+            key_part: (str) Any key containing this string is in the category
+            parser: (callable) Takes the entry's JSON (as a dict) and returns
+                (name, obj) for it.
+    """
+
+    def __init__(self, _categories):
+        self.categories = list(_categories)
+        self.hash = None
+        self.parse_count = 0
+        self.errors = {}
+        self._entries = {}
+        self._by_category = dict((category.name, {}) for category in self.categories)
+
+    def category_of(self, _key):
+        """The Category the key belongs to, or None. The first match wins. """
+
+        for category in self.categories:
+            if category.key_part in _key:
+                return category
+        return None
+
+    def wants(self, _key):
+        """True if the key belongs to any category (so its value should be read) """
+
+        return self.category_of(_key) is not None
+
+    def refresh(self, _entries):
+        """Updates the index from the document's current entries
+
+        Arguments:
+            _entries: (list: tuple) The (key, value) strings, in document order.
+                Keys which don't belong to any category are ignored.
+        Returns:
+            (bool) True if anything changed
+        """
+
+        entries = [(key, value) for key, value in _entries if self.wants(key)]
+        new_hash = content_hash(entries)
+        if new_hash == self.hash:
+            return False
+
+        new_entries = {}
+        errors = {}
+        for key, value in entries:
+            old = self._entries.get(key)
+            if old is not None and old.value == value:
+                new_entries[key] = old
+                continue
+
+            category = self.category_of(key)
+            try:
+                name, obj = category.parser(json.loads(value))
+            except (ValueError, KeyError, TypeError) as e:
+                errors[key] = '{}: {}'.format(type(e).__name__, e)
+                continue
+            self.parse_count += 1
+            new_entries[key] = _Entry(value, category.name, name, obj)
+
+        # Re-build the by-name dicts, in document order (later entries win any name clash)
+        by_category = dict((category.name, {}) for category in self.categories)
+        for key, _ in entries:
+            entry = new_entries.get(key)
+            if entry is not None:
+                by_category[entry.category][entry.name] = entry.obj
+
+        self._entries = new_entries
+        self._by_category = by_category
+        self.errors = errors
+        self.hash = new_hash
+        return True
+
+    def get(self, _category):
+        """The {name: obj} dict for the category """
+
+        return self._by_category.get(_category, {})
+
+    def to_library_dict(self):
+        """All the categories: {category name: {name: obj}} """
+
+        return dict((name, dict(objs)) for name, objs in self._by_category.items())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return "{}(_categories={!r})".format(self.__class__.__name__, [c.name for c in self.categories])
@@ -0,0 +1,167 @@
+"""Building 'footprint' from Ladybug Face3Ds, without any Rhino Brep operations.
+
+Used for the PHPP 'Primary Energy Renewable' footprint area. The faces are
+projected onto the World-XY plane and the outline is found with a 2D polygon
+union.
+"""
+
+from collections import namedtuple
+
+try:
+    from ladybug_geometry.geometry2d.pointvector import Point2D
+    from ladybug_geometry.geometry2d.polygon import Polygon2D
+    from ladybug_geometry.geometry3d.pointvector import Point3D
+    from ladybug_geometry.geometry3d.face import Face3D
+except ImportError as e:
+    raise ImportError('\nFailed to import ladybug_geometry:\n\t{}'.format(e))
+
+import LBT2PH.spatial
+
+Footprint = namedtuple('Footprint', ['Footprint_surface', 'Footprint_area'])
+
+
+def project_face_to_xy(_face3d, _tolerance=0.001):
+    """Projects a Face3D's outer boundary onto the World-XY plane
+
+    Arguments:
+        _face3d: (ladybug_geometry.geometry3d.Face3D) The face to project
+        _tolerance: (float) Model tolerance
+    Returns:
+        polygon: (Polygon2D) The projected outline, or None if the face is
+            vertical (or otherwise degenerate) when seen from above.
+    """
+
+    pts = [Point2D(pt.x, pt.y) for pt in _face3d.boundary]
+    if len(pts) < 3:
+        return None
+
+    polygon = Polygon2D(pts)
+    if polygon.area < _tolerance:
+        return None
+
+    try:
+        polygon = polygon.remove_colinear_vertices(_tolerance)
+    except AssertionError:
+        # Collapses down to less than 3 vertices
+        return None
+
+    if polygon.is_clockwise:
+        polygon = polygon.reverse()
+
+    return polygon
+
+
+def union_polygons(_polygons, _tolerance=0.001):
+    """Unions a set of Polygon2Ds into their outer outlines (and any holes)
+
+    The polygons are first grouped into clusters of overlapping bounding
+    rectangles so that the (expensive) boolean union only ever runs on
+    polygons which could actually touch one another.
+
+    Arguments:
+        _polygons: (list: Polygon2D) The polygons to union
+        _tolerance: (float) Model tolerance
+    Returns:
+        outlines: (list: Polygon2D) The unioned polygons. Note that some of
+            these may be holes inside others, see footprint_area()
+    """
+
+    # Exact duplicates are common (stacked floor plates), drop them early
+    unique = {}
+    for polygon in _polygons:
+        if polygon is None:
+            continue
+        key = tuple(sorted((round(pt.x / _tolerance), round(pt.y / _tolerance)) for pt in polygon))
+        unique.setdefault(key, polygon)
+    polygons = list(unique.values())
+
+    boxes = [LBT2PH.spatial.bounding_box((pt.x, pt.y) for pt in polygon) for polygon in polygons]
+
+    outlines = []
+    for group in LBT2PH.spatial.group_overlapping(boxes, _tolerance):
+        if len(group) == 1:
+            outlines.append(polygons[group[0]])
+            continue
+
+        group_polygons = [polygons[i] for i in group]
+        result = Polygon2D.boolean_union_all(group_polygons, _tolerance)
+        if not result:
+            # Boolean failed for some reason, keep the originals rather than losing area
+            print('Warning: Polygon union failed for {} footprint polygons.'.format(len(group_polygons)))
+            result = group_polygons
+        outlines.extend(result)
+
+    return outlines
+
+
+def group_boundaries_and_holes(_outlines):
+    """Sorts the unioned outlines into outer boundaries and the holes inside them
+
+    Each outline is classed by how many of the others it is inside: an even number
+    (0, 2...) makes it a boundary, an odd number a hole in the smallest outline
+    around it. So an 'island' inside a courtyard is its own boundary again.
+
+    Arguments:
+        _outlines: (list: Polygon2D) Unioned outlines, as from union_polygons()
+    Returns:
+        groups: (list: tuple) (boundary, [holes]) for each outer boundary
+    """
+
+    by_area = sorted(_outlines, key=lambda p: p.area, reverse=True)
+    groups = []
+    group_by_index = {}
+    for i, polygon in enumerate(by_area):
+        # Only larger outlines can contain this one. The last found is the smallest.
+        parents = [j for j in range(i) if by_area[j].is_polygon_inside(polygon)]
+        if len(parents) % 2 == 0:
+            group_by_index[i] = (polygon, [])
+            groups.append(group_by_index[i])
+        else:
+            group_by_index[parents[-1]][1].append(polygon)
+
+    return groups
+
+
+def footprint_area(_outlines):
+    """Returns the net area of the unioned outlines, with any holes subtracted """
+
+    area = 0.0
+    for boundary, holes in group_boundaries_and_holes(_outlines):
+        area += boundary.area - sum(hole.area for hole in holes)
+
+    return area
+
+
+def footprint_from_faces(_face3ds, _tolerance=0.001):
+    """Finds the building footprint from a set of Ladybug Face3Ds
+
+    Arguments:
+        _face3ds: (list: Face3D) The building's floor and wall faces
+        _tolerance: (float) Model tolerance
+    Returns:
+        footprint: (Footprint) namedtuple with:
+            Footprint_surface: (list: Face3D) The footprint outline(s), located at
+                the lowest Z of the input faces.
+            Footprint_area: (float) The net projected area.
+    """
+
+    faces = [f for f in _face3ds if f is not None]
+    if not faces:
+        return Footprint(None, None)
+
+    polygons = [project_face_to_xy(face, _tolerance) for face in faces]
+    polygons = [p for p in polygons if p is not None]
+    if not polygons:
+        return Footprint(None, None)
+
+    outlines = union_polygons(polygons, _tolerance)
+    area = footprint_area(outlines)
+
+    z = min(face.min.z for face in faces)
+    surfaces = []
+    for boundary, holes in group_boundaries_and_holes(outlines):
+        boundary_3d = [Point3D(pt.x, pt.y, z) for pt in boundary]
+        holes_3d = [[Point3D(pt.x, pt.y, z) for pt in hole] for hole in holes] or None
+        surfaces.append(Face3D(boundary_3d, holes=holes_3d))
+
+    return Footprint(surfaces, area)
@@ -0,0 +1,187 @@
+"""The exact glazing surface of a window: its outline inset by each side's frame width.
+
+The outline is flattened into its own plane and each edge moved in by the frame
+width of its side, with the same Left / Right / Bottom / Top rules as the
+PHPP_Window 'window_edges'. No Rhino curve offsetting is needed.
+"""
+
+from collections import namedtuple
+
+try:
+    from ladybug_geometry.geometry2d.pointvector import Point2D
+    from ladybug_geometry.geometry2d.polygon import Polygon2D
+    from ladybug_geometry.geometry3d.pointvector import Vector3D
+    from ladybug_geometry.geometry3d.face import Face3D
+except ImportError as e:
+    raise ImportError('\nFailed to import ladybug_geometry:\n\t{}'.format(e))
+
+SIDES = ('Left', 'Right', 'Bottom', 'Top')
+
+Glazing = namedtuple('Glazing', ['face', 'area', 'edge_lengths'])
+
+
+def local_axes(_normal, _tolerance=0.001):
+    """The (right, up) axes of the window's own 2D plane
+
+    Arguments:
+        _normal: (Vector3D) The window's normal
+        _tolerance: (float)
+    Returns:
+        (tuple) right, up: (Vector3D) unit vectors in the window's plane. 'up' is
+            World-Z (or World-Y for horizontal windows) flattened onto the plane.
+            'right' points toward higher World-X (or World-Y, for windows facing along X)
+    """
+
+    normal = _normal.normalize()
+    up = Vector3D(0, 0, 1)
+    if abs(normal.z) > 1 - _tolerance:
+        up = Vector3D(0, 1, 0)
+    up = (up - normal * up.dot(normal)).normalize()
+
+    right = up.cross(normal).normalize()
+    if abs(normal.x) < 1 - _tolerance:
+        flip = right.x < -_tolerance or (abs(right.x) <= _tolerance and right.y < 0)
+    else:
+        flip = right.y < 0
+    if flip:
+        right = right.reverse()
+
+    return right, up
+
+
+def window_edges(_face3d, _tolerance=0.01):
+    """The window outline's (Left, Right, Bottom, Top) edges, from the Ladybug Face3D edge methods
+
+    Note that get_top_bottom_horizontal_edges() returns them as (bottom, top).
+
+    Arguments:
+        _face3d: (Face3D) The window outline
+        _tolerance: (float)
+    Returns:
+        (tuple: LineSegment3D) left, right, bottom, top. Or None if the window does
+            not have two vertical and two horizontal edges.
+    """
+
+    verticals = _face3d.get_left_right_vertical_edges(_tolerance)
+    horizontals = _face3d.get_top_bottom_horizontal_edges(_tolerance)
+    if not verticals or not horizontals:
+        return None
+
+    left, right = verticals
+    bottom, top = horizontals
+    return left, right, bottom, top
+
+
+def edge_sides(_polygon):
+    """Which side (Left, Right, Bottom or Top) each edge of the counter-clockwise polygon is on
+
+    An edge is on the side its outward normal points most toward. Edge i runs from
+    vertex i to vertex i+1.
+    """
+
+    sides = []
+    verts = _polygon.vertices
+    for i, pt in enumerate(verts):
+        nxt = verts[(i + 1) % len(verts)]
+        dx, dy = nxt.x - pt.x, nxt.y - pt.y
+        out_x, out_y = dy, -dx      # Outward normal, for a counter-clockwise polygon
+        if abs(out_y) >= abs(out_x):
+            sides.append('Top' if out_y > 0 else 'Bottom')
+        else:
+            sides.append('Right' if out_x > 0 else 'Left')
+    return sides
+
+
+def inset_polygon(_polygon, _distances, _tolerance=0.001):
+    """Moves each edge of the counter-clockwise polygon inwards by its own distance
+
+    Arguments:
+        _polygon: (Polygon2D) Counter-clockwise, with no colinear vertices
+        _distances: (list: float) The inset distance for each edge (edge i runs
+            from vertex i to vertex i+1)
+        _tolerance: (float)
+    Returns:
+        (Polygon2D) The inset polygon, with the same number of vertices (vertex i is
+            where edges i-1 and i meet), or None if the inset collapses any edge.
+    """
+
+    verts = _polygon.vertices
+    count = len(verts)
+
+    # Each edge's line, moved inwards
+    lines = []
+    for i, pt in enumerate(verts):
+        nxt = verts[(i + 1) % count]
+        dx, dy = nxt.x - pt.x, nxt.y - pt.y
+        length = (dx * dx + dy * dy) ** 0.5
+        dx, dy = dx / length, dy / length
+        dist = float(_distances[i])
+        lines.append( (pt.x - dy * dist, pt.y + dx * dist, dx, dy) )
+
+    new_verts = []
+    for i in range(count):
+        ax, ay, adx, ady = lines[i - 1]
+        bx, by, bdx, bdy = lines[i]
+        denom = adx * bdy - ady * bdx
+        if abs(denom) < 1e-12:
+            return None     # Parallel neighbours (a spike). Can't be inset.
+        t = ((bx - ax) * bdy - (by - ay) * bdx) / denom
+        new_verts.append( Point2D(ax + adx * t, ay + ady * t) )
+
+    # Every edge must still run the same way, and not have shrunk to nothing
+    for i in range(count):
+        old_a, old_b = verts[i], verts[(i + 1) % count]
+        new_a, new_b = new_verts[i], new_verts[(i + 1) % count]
+        along = (new_b.x - new_a.x) * (old_b.x - old_a.x) + (new_b.y - new_a.y) * (old_b.y - old_a.y)
+        if along <= _tolerance * _tolerance:
+            return None
+
+    inset = Polygon2D(new_verts)
+    if inset.area < _tolerance * _tolerance or inset.is_clockwise or inset.is_self_intersecting:
+        return None
+    return inset
+
+
+def glazing_geometry(_face3d, _frame_widths, _depth=0.0, _tolerance=0.001):
+    """The window's glazing surface: the outline inset by the frame widths on each side
+
+    Arguments:
+        _face3d: (Face3D) The window's outline
+        _frame_widths: (dict) The frame width for each side: {'Left': 0.1, 'Right': ...}
+        _depth: (float) Optional. Move the glazing this far back (against the
+            normal), ie: the window's install depth.
+        _tolerance: (float)
+    Returns:
+        (Glazing) namedtuple with:
+            face: (Face3D) The glazing surface
+            area: (float) The glazing area
+            edge_lengths: (dict) The total glazing edge length on each side
+        Or None if the frame widths are too big for the window.
+    """
+
+    right, up = local_axes(_face3d.normal, _tolerance)
+    origin = _face3d.boundary[0]
+
+    polygon = Polygon2D([Point2D((pt - origin).dot(right), (pt - origin).dot(up)) for pt in _face3d.boundary])
+    try:
+        polygon = polygon.remove_colinear_vertices(_tolerance)
+    except AssertionError:
+        return None
+    if polygon.is_clockwise:
+        polygon = polygon.reverse()
+
+    sides = edge_sides(polygon)
+    inset = inset_polygon(polygon, [_frame_widths[side] for side in sides], _tolerance)
+    if inset is None:
+        return None
+
+    move = _face3d.normal.normalize() * -float(_depth)
+    face = Face3D([origin + right * pt.x + up * pt.y + move for pt in inset.vertices])
+    if face.normal.dot(_face3d.normal) < 0:
+        face = face.flip()
+
+    edge_lengths = dict((side, 0.0) for side in SIDES)
+    for side, segment in zip(sides, inset.segments):
+        edge_lengths[side] += segment.length
+
+    return Glazing(face, inset.area, edge_lengths)
@@ -18,6 +18,7 @@ import LBT2PH.climate
 import LBT2PH.summer_vent
 import LBT2PH.heating_cooling
 import LBT2PH.occupancy
+import LBT2PH.footprint
 
 reload(LBT2PH.materials)
 reload(LBT2PH.assemblies)
@@ -30,6 +31,7 @@ reload(LBT2PH.climate)
 reload(LBT2PH.summer_vent)
 reload(LBT2PH.heating_cooling)
 reload(LBT2PH.occupancy)
+reload(LBT2PH.footprint)
 
 try:
     import ladybug.epw as epw  
@@ -389,37 +391,22 @@ def find_nearest_phpp_climate(_epw_file):
 
 def get_footprint( _surfaces ):
     # Finds the 'footprint' of the building for 'Primary Energy Renewable' reference
-    # 1) Re-build the Opaque Surfaces
-    # 2) Join all the surface Breps into a single brep
-    # 3) Find the 'box' for the single joined brep
-    # 4) Find the lowest Z points on the box, offset another 10 units 'down'
-    # 5) Make a new Plane at this new location
-    # 6) Projects the brep onto the new Plane
+    # 1) Collect the Floor and Wall Face3Ds of the Opaque Surfaces
+    # 2) Project each one onto the World-XY plane (vertical walls drop out)
+    # 3) Union the projected outlines in 2D (see LBT2PH.footprint)
+    # 4) Re-build the outline(s) as Rhino surfaces for preview
     
     Footprint = namedtuple('Footprint', ['Footprint_surface', 'Footprint_area'])
     
     #-----
-    surfaces = [from_face3d(surface.Srfc) for surface in _surfaces]
-    bldg_mass = ghc.BrepJoin( surfaces ).breps
-    if not bldg_mass:
+    face3ds = [surface.Srfc for surface in _surfaces if str(surface.type) in ('Floor', 'Wall')]
+    lb_footprint = LBT2PH.footprint.footprint_from_faces( face3ds )
+    if not lb_footprint.Footprint_surface:
         return Footprint(None, None)
     
-    #------- Find Corners, Find 'bottom' (lowest Z)
-    return Footprint(bldg_mass, 4)
-    bldg_mass_corners = [v for v in ghc.BoxCorners(bldg_mass)]
-
-    bldg_mass_corners.sort(reverse=False, key=lambda point3D: point3D.Z)
-    rect_pts = bldg_mass_corners[0:3]
-    
-    #------- Project Brep to Footprint
-    projection_plane1 = ghc.Plane3Pt(rect_pts[0], rect_pts[1], rect_pts[2])
-    projection_plane2 = ghc.Move(projection_plane1, ghc.UnitZ(-10)).geometry
-    matrix = rs.XformPlanarProjection(projection_plane2)
-    footprint_srfc = ghc.Transform(bldg_mass, matrix )
-    footprint_area = ghc.Area(footprint_srfc).area
-    
     #------- Output
-    fp = Footprint(footprint_srfc, footprint_area)
+    footprint_srfc = [from_face3d(face) for face in lb_footprint.Footprint_surface]
+    fp = Footprint(footprint_srfc, lb_footprint.Footprint_area)
     
     return fp
 
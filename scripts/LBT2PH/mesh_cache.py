@@ -0,0 +1,85 @@
+"""In-memory cache of the shading context meshes, by Brep fingerprint and meshing parameters.
+
+Only new or changed Breps need to be meshed again from one run to the next.
+"""
+
+from collections import OrderedDict
+
+DEFAULT_MAX_ITEMS = 10000
+
+
+class MeshCache(object):
+    """An LRU cache of meshes (or any other item) by key
+
+    Arguments:
+        _max_items: (int) Optional. The most items to keep. The least recently
+            used ones are dropped first.
+    """
+
+    def __init__(self, _max_items=DEFAULT_MAX_ITEMS):
+        self.max_items = _max_items
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+
+    def get(self, _key):
+        """The cached item, or None """
+
+        item = self._items.pop(_key, None)
+        if item is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._items[_key] = item
+        return item
+
+    def put(self, _key, _item):
+        self._items.pop(_key, None)
+        self._items[_key] = _item
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def get_many(self, _keys, _sources, _build, _map=None):
+        """The item for each key, building (and caching) only the ones not already cached
+
+        Arguments:
+            _keys: (list) The cache key for each source
+            _sources: (list) The sources (ie: Breps) to build the items from
+            _build: (callable) Builds the item for a single source. If it returns
+                None, nothing is cached for that source.
+            _map: (callable) Optional. A map(function, sources) to build the missing
+                items with (ie: a parallel map). Must return the results in order.
+                Default is the built-in map.
+        Returns:
+            (list) The item for each key, in order. None for any which could not be built.
+        """
+
+        items = [self.get(key) for key in _keys]
+
+        # Each distinct missing key is only built once
+        to_build = OrderedDict()
+        for i, (key, item) in enumerate(zip(_keys, items)):
+            if item is None:
+                to_build.setdefault(key, []).append(i)
+
+        if to_build:
+            sources = [_sources[indices[0]] for indices in to_build.values()]
+            built = list((_map or map)(_build, sources))
+            for (key, indices), item in zip(to_build.items(), built):
+                if item is None:
+                    continue
+                self.put(key, item)
+                for i in indices:
+                    items[i] = item
+
+        return items
+
+    def clear(self):
+        self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __repr__(self):
+        return "{}(_max_items={!r})".format(self.__class__.__name__, self.max_items)
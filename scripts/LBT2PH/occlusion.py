@@ -0,0 +1,544 @@
+"""Ray / mesh occlusion using a Bounding-Volume-Hierarchy (BVH). No Rhino required.
+
+A drop-in replacement for 'ladybug_rhino.intersect.intersect_mesh_rays' for the
+window shading calculation, so that it can also be run in (Linux) batch jobs.
+The shading mesh is given as flat vertex and face arrays. Only 'any-hit'
+queries are needed for shading (is the sky patch blocked or not) so each ray
+stops traversing the tree as soon as it hits any triangle.
+
+NumPy is used when it is available (rays are traversed in vectorized
+'packets'). Under IronPython a pure-Python per-ray traversal is used instead.
+"""
+
+import math
+from array import array
+
+try:
+    from itertools import izip
+except ImportError:  # Python 3
+    izip = zip
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from LBT2PH.vectors import xyz
+
+
+EPSILON = 1e-9
+T_MIN = 1e-6
+
+
+class MeshBVH(object):
+    """A BVH of the triangles of a shading mesh, for fast any-hit ray queries.
+
+    Arguments:
+        _vertices: (list: float) Flat vertex coordinates [x0, y0, z0, x1, y1, z1, ...]
+            or a list of (x, y, z) items.
+        _faces: (list: int) Flat triangle vertex indices [a0, b0, c0, a1, b1, c1, ...]
+            or a list of (a, b, c) / (a, b, c, d) items. Quads are split into
+            two triangles.
+        _leaf_size: (int) Max number of triangles in a leaf node.
+    """
+
+    def __init__(self, _vertices, _faces, _leaf_size=None):
+        verts = _flatten_vertices(_vertices)
+        tris = _flatten_faces(_faces)
+
+        if _leaf_size is None:
+            _leaf_size = 8 if np is not None else 4
+        self.leaf_size = max(1, int(_leaf_size))
+        self.triangle_count = len(tris) // 3
+
+        # Per-triangle data, in the order of the BVH leaves
+        if np is not None:
+            self._build_numpy(verts, tris)
+        else:
+            self._build_python(verts, tris)
+
+    def __len__(self):
+        return self.triangle_count
+
+    # --------------------------------------------------------------------------
+    # Build
+    def _build_numpy(self, _verts, _tris):
+        v = np.asarray(_verts, dtype=float).reshape(-1, 3)
+        t = np.asarray(_tris, dtype=np.int64).reshape(-1, 3)
+
+        p0, p1, p2 = v[t[:, 0]], v[t[:, 1]], v[t[:, 2]]
+        tri_min = np.minimum(np.minimum(p0, p1), p2)
+        tri_max = np.maximum(np.maximum(p0, p1), p2)
+        centroids = (tri_min + tri_max) * 0.5
+
+        nodes_min, nodes_max, nodes_a, nodes_b = [], [], [], []
+        order = np.arange(len(t))
+
+        # Iterative build. Each node covers order[start:end]
+        stack = [(0, len(t), None, None)]
+        while stack:
+            start, end, parent, side = stack.pop()
+            node = len(nodes_min)
+            if parent is not None:
+                if side == 0:
+                    nodes_a[parent] = node
+                else:
+                    nodes_b[parent] = node
+
+            idx = order[start:end]
+            if len(idx):
+                nodes_min.append(tri_min[idx].min(axis=0))
+                nodes_max.append(tri_max[idx].max(axis=0))
+            else:
+                nodes_min.append(np.zeros(3))
+                nodes_max.append(np.zeros(3))
+
+            if end - start <= self.leaf_size:
+                nodes_a.append(start)
+                nodes_b.append(-(end - start))  # negative: leaf triangle count
+                continue
+
+            cent = centroids[idx]
+            axis = int(np.argmax(cent.max(axis=0) - cent.min(axis=0)))
+            mid = (end - start) // 2
+            part = np.argpartition(cent[:, axis], mid)
+            order[start:end] = idx[part]
+
+            nodes_a.append(-1)
+            nodes_b.append(-1)
+            stack.append((start + mid, end, node, 1))
+            stack.append((start, start + mid, node, 0))
+
+        self._node_min = np.asarray(nodes_min, dtype=float).reshape(-1, 3)
+        self._node_max = np.asarray(nodes_max, dtype=float).reshape(-1, 3)
+        self._node_a = np.asarray(nodes_a, dtype=np.int64)
+        self._node_b = np.asarray(nodes_b, dtype=np.int64)
+
+        p0, p1, p2 = p0[order], p1[order], p2[order]
+        self._v0 = p0
+        self._e1 = p1 - p0
+        self._e2 = p2 - p0
+
+    def _build_python(self, _verts, _tris):
+        n_tris = len(_tris) // 3
+        tri_min, tri_max, centroids = [], [], []
+        for i in range(n_tris):
+            a, b, c = _tris[3 * i], _tris[3 * i + 1], _tris[3 * i + 2]
+            pts = [(_verts[3 * k], _verts[3 * k + 1], _verts[3 * k + 2]) for k in (a, b, c)]
+            lo = tuple(min(p[ax] for p in pts) for ax in range(3))
+            hi = tuple(max(p[ax] for p in pts) for ax in range(3))
+            tri_min.append(lo)
+            tri_max.append(hi)
+            centroids.append(tuple((lo[ax] + hi[ax]) * 0.5 for ax in range(3)))
+
+        node_min, node_max = array('d'), array('d')
+        node_a, node_b = [], []
+        order = list(range(n_tris))
+
+        stack = [(0, n_tris, None, None)]
+        while stack:
+            start, end, parent, side = stack.pop()
+            node = len(node_a)
+            if parent is not None:
+                if side == 0:
+                    node_a[parent] = node
+                else:
+                    node_b[parent] = node
+
+            idx = order[start:end]
+            for ax in range(3):
+                node_min.append(min(tri_min[i][ax] for i in idx) if idx else 0.0)
+            for ax in range(3):
+                node_max.append(max(tri_max[i][ax] for i in idx) if idx else 0.0)
+
+            if end - start <= self.leaf_size:
+                node_a.append(start)
+                node_b.append(-(end - start))
+                continue
+
+            spans = [max(centroids[i][ax] for i in idx) - min(centroids[i][ax] for i in idx) for ax in range(3)]
+            axis = spans.index(max(spans))
+            idx.sort(key=lambda i: centroids[i][axis])
+            order[start:end] = idx
+            mid = (end - start) // 2
+
+            node_a.append(-1)
+            node_b.append(-1)
+            stack.append((start + mid, end, node, 1))
+            stack.append((start, start + mid, node, 0))
+
+        self._node_min = node_min
+        self._node_max = node_max
+        self._node_a = node_a
+        self._node_b = node_b
+
+        v0, e1, e2 = array('d'), array('d'), array('d')
+        for i in order:
+            a, b, c = _tris[3 * i], _tris[3 * i + 1], _tris[3 * i + 2]
+            for ax in range(3):
+                p0 = _verts[3 * a + ax]
+                v0.append(p0)
+                e1.append(_verts[3 * b + ax] - p0)
+                e2.append(_verts[3 * c + ax] - p0)
+        self._v0, self._e1, self._e2 = v0, e1, e2
+
+    # --------------------------------------------------------------------------
+    # Queries
+    def any_hit(self, _origins, _directions):
+        """Tests a batch of rays for ANY intersection with the mesh.
+
+        Arguments:
+            _origins: (list) (x, y, z) ray origins
+            _directions: (list) (x, y, z) ray directions (do not need to be unit)
+        Returns:
+            hits: (list: bool) True if the ray hits the mesh, for each ray
+        """
+
+        if not self.triangle_count or not len(_origins):
+            return [False] * len(_origins)
+
+        if np is not None:
+            return self._any_hit_numpy(np.asarray(_origins, dtype=float).reshape(-1, 3),
+                                        np.asarray(_directions, dtype=float).reshape(-1, 3)).tolist()
+
+        return [self._any_hit_python(o, d) for o, d in izip(_origins, _directions)]
+
+    def _any_hit_numpy(self, _origins, _directions):
+        n = len(_origins)
+        hit = np.zeros(n, dtype=bool)
+
+        d = np.where(np.abs(_directions) < EPSILON, np.copysign(EPSILON, _directions), _directions)
+        inv_d = 1.0 / d
+
+        stack = [(0, np.arange(n))]
+        while stack:
+            node, rays = stack.pop()
+            rays = rays[~hit[rays]]
+            if not len(rays):
+                continue
+
+            # Slab test of the node box against the rays still alive
+            o, inv = _origins[rays], inv_d[rays]
+            t1 = (self._node_min[node] - o) * inv
+            t2 = (self._node_max[node] - o) * inv
+            t_near = np.minimum(t1, t2).max(axis=1)
+            t_far = np.maximum(t1, t2).min(axis=1)
+            rays = rays[t_far >= np.maximum(t_near, 0.0)]
+            if not len(rays):
+                continue
+
+            a, b = self._node_a[node], self._node_b[node]
+            if b < 0:
+                hit[rays] |= self._leaf_hits_numpy(a, -b, _origins[rays], _directions[rays])
+            else:
+                stack.append((b, rays))
+                stack.append((a, rays))
+
+        return hit
+
+    def _leaf_hits_numpy(self, _start, _count, _o, _d):
+        """Moller-Trumbore, vectorized over rays (R) x leaf triangles (T) """
+
+        v0 = self._v0[_start:_start + _count][None, :, :]
+        e1 = self._e1[_start:_start + _count][None, :, :]
+        e2 = self._e2[_start:_start + _count][None, :, :]
+        o = _o[:, None, :]
+        d = _d[:, None, :]
+
+        p = np.cross(d, e2)
+        det = (e1 * p).sum(axis=2)
+        valid = np.abs(det) > EPSILON
+        inv_det = np.where(valid, 1.0 / np.where(valid, det, 1.0), 0.0)
+
+        tvec = o - v0
+        u = (tvec * p).sum(axis=2) * inv_det
+        q = np.cross(tvec, e1)
+        v = (d * q).sum(axis=2) * inv_det
+        t = (e2 * q).sum(axis=2) * inv_det
+
+        hits = valid & (u >= 0.0) & (v >= 0.0) & (u + v <= 1.0) & (t > T_MIN)
+        return hits.any(axis=1)
+
+    def _any_hit_python(self, _o, _d):
+        ox, oy, oz = _o
+        dx, dy, dz = _d
+        ix = 1.0 / (dx if abs(dx) > EPSILON else math.copysign(EPSILON, dx))
+        iy = 1.0 / (dy if abs(dy) > EPSILON else math.copysign(EPSILON, dy))
+        iz = 1.0 / (dz if abs(dz) > EPSILON else math.copysign(EPSILON, dz))
+
+        n_min, n_max = self._node_min, self._node_max
+        n_a, n_b = self._node_a, self._node_b
+        v0, e1, e2 = self._v0, self._e1, self._e2
+
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            k = 3 * node
+
+            t1 = (n_min[k] - ox) * ix
+            t2 = (n_max[k] - ox) * ix
+            t_near, t_far = (t1, t2) if t1 < t2 else (t2, t1)
+            t1 = (n_min[k + 1] - oy) * iy
+            t2 = (n_max[k + 1] - oy) * iy
+            if t1 > t2:
+                t1, t2 = t2, t1
+            if t1 > t_near:
+                t_near = t1
+            if t2 < t_far:
+                t_far = t2
+            t1 = (n_min[k + 2] - oz) * iz
+            t2 = (n_max[k + 2] - oz) * iz
+            if t1 > t2:
+                t1, t2 = t2, t1
+            if t1 > t_near:
+                t_near = t1
+            if t2 < t_far:
+                t_far = t2
+            if t_far < t_near or t_far < 0.0:
+                continue
+
+            b = n_b[node]
+            if b >= 0:
+                stack.append(b)
+                stack.append(n_a[node])
+                continue
+
+            # Leaf: Moller-Trumbore on each triangle, exit on first hit
+            start = n_a[node]
+            for tri in range(start, start - b):
+                j = 3 * tri
+                e1x, e1y, e1z = e1[j], e1[j + 1], e1[j + 2]
+                e2x, e2y, e2z = e2[j], e2[j + 1], e2[j + 2]
+
+                px = dy * e2z - dz * e2y
+                py = dz * e2x - dx * e2z
+                pz = dx * e2y - dy * e2x
+                det = e1x * px + e1y * py + e1z * pz
+                if -EPSILON < det < EPSILON:
+                    continue
+                inv_det = 1.0 / det
+
+                tx, ty, tz = ox - v0[j], oy - v0[j + 1], oz - v0[j + 2]
+                u = (tx * px + ty * py + tz * pz) * inv_det
+                if u < 0.0 or u > 1.0:
+                    continue
+
+                qx = ty * e1z - tz * e1y
+                qy = tz * e1x - tx * e1z
+                qz = tx * e1y - ty * e1x
+                v = (dx * qx + dy * qy + dz * qz) * inv_det
+                if v < 0.0 or u + v > 1.0:
+                    continue
+
+                if (e2x * qx + e2y * qy + e2z * qz) * inv_det > T_MIN:
+                    return True
+
+        return False
+
+
+class ShadingContext(object):
+    """The full context shading mesh as flat arrays, for culling per-window
+
+    Arguments:
+        _vertices: (list: float) Flat vertex coordinates, as for MeshBVH
+        _faces: (list: int) Flat triangle vertex indices, as for MeshBVH
+    """
+
+    def __init__(self, _vertices, _faces):
+        self.vertices = _flatten_vertices(_vertices)
+        self.faces = _flatten_faces(_faces)
+        self.triangle_count = len(self.faces) // 3
+
+        # Per-triangle bounds, used by all the culling tests
+        if np is not None:
+            v = np.asarray(self.vertices, dtype=float).reshape(-1, 3)
+            tri_pts = v[np.asarray(self.faces, dtype=np.int64).reshape(-1, 3)]
+            self._tri_pts = tri_pts
+            self._tri_min = tri_pts.min(axis=1)
+            self._tri_max = tri_pts.max(axis=1)
+        else:
+            verts, faces = self.vertices, self.faces
+            self._tri_pts = [[(verts[3 * k], verts[3 * k + 1], verts[3 * k + 2]) for k in faces[3 * i:3 * i + 3]]
+                                for i in range(self.triangle_count)]
+            self._tri_min = [tuple(min(p[ax] for p in pts) for ax in range(3)) for pts in self._tri_pts]
+            self._tri_max = [tuple(max(p[ax] for p in pts) for ax in range(3)) for pts in self._tri_pts]
+
+    def __len__(self):
+        return self.triangle_count
+
+    def cull(self, _window_points, _window_normal, _radius=None):
+        """Finds the triangles which could possibly shade a window
+
+        A triangle is kept only if it is:
+            1) In front of the window plane (at least one vertex in front).
+            2) Inside the sky hemisphere seen by the window. The sky patches are all
+                above the horizon, so the triangle must reach above the window's lowest point.
+            3) Within the search radius of the window, if a radius is given.
+        1 and 2 can never change the result. 3 ignores anything further away than
+        the radius, which is an approximation the user opts into.
+
+        Arguments:
+            _window_points: (list) The window's analysis points (or its vertices)
+            _window_normal: The window's outward normal
+            _radius: (float) Optional. Max distance to search for shading geometry.
+        Returns:
+            faces: (list: int) Flat triangle indices of the kept triangles
+        """
+
+        pts = [xyz(pt) for pt in _window_points]
+        if not pts or not self.triangle_count:
+            return []
+
+        nx, ny, nz = xyz(_window_normal)
+        cx = sum(p[0] for p in pts) / len(pts)
+        cy = sum(p[1] for p in pts) / len(pts)
+        cz = sum(p[2] for p in pts) / len(pts)
+        min_z = min(p[2] for p in pts)
+        reach = None
+        if _radius is not None:
+            win_size = max(math.sqrt((p[0] - cx) ** 2 + (p[1] - cy) ** 2 + (p[2] - cz) ** 2) for p in pts)
+            reach = float(_radius) + win_size
+
+        if np is not None:
+            tri_pts = self._tri_pts
+            front = ((tri_pts - (cx, cy, cz)) * (nx, ny, nz)).sum(axis=2).max(axis=1) > -EPSILON
+            keep = front & (self._tri_max[:, 2] > min_z - EPSILON)
+            if reach is not None:
+                closest = np.clip((cx, cy, cz), self._tri_min, self._tri_max)
+                keep &= ((closest - (cx, cy, cz)) ** 2).sum(axis=1) <= reach * reach
+            tri_idx = np.nonzero(keep)[0]
+            return np.asarray(self.faces, dtype=np.int64).reshape(-1, 3)[tri_idx].ravel().tolist()
+
+        faces = []
+        for i in range(self.triangle_count):
+            if self._tri_max[i][2] <= min_z - EPSILON:
+                continue
+            if max(nx * (x - cx) + ny * (y - cy) + nz * (z - cz) for x, y, z in self._tri_pts[i]) <= -EPSILON:
+                continue
+            if reach is not None:
+                lo, hi = self._tri_min[i], self._tri_max[i]
+                dist_sq = sum((min(max(c, lo[ax]), hi[ax]) - c) ** 2 for ax, c in enumerate((cx, cy, cz)))
+                if dist_sq > reach * reach:
+                    continue
+            faces.extend(self.faces[3 * i:3 * i + 3])
+
+        return faces
+
+
+class WindowContext(object):
+    """The culled shading geometry for a single window, built lazily.
+
+    The same WindowContext can be used for every sky / season, so the culling
+    and mesh / BVH build only happen once per window.
+
+    Arguments:
+        _context: (ShadingContext) The full context shading mesh
+        _window_points: (list) The window's analysis points
+        _window_normal: The window's outward normal
+        _radius: (float) Optional. Max distance to search for shading geometry.
+        _builder: (callable) Optional. Called as _builder(vertices, faces) to
+            build the mesh object used for the ray intersection. Default: MeshBVH
+    """
+
+    def __init__(self, _context, _window_points, _window_normal, _radius=None, _builder=None):
+        self.context = _context
+        self.window_points = _window_points
+        self.window_normal = _window_normal
+        self.radius = _radius
+        self._builder = _builder or MeshBVH
+        self._faces = None
+        self._mesh = None
+
+    @property
+    def faces(self):
+        if self._faces is None:
+            self._faces = self.context.cull(self.window_points, self.window_normal, self.radius)
+        return self._faces
+
+    @property
+    def triangle_count(self):
+        return len(self.faces) // 3
+
+    @property
+    def mesh(self):
+        if self._mesh is None:
+            self._mesh = self._builder(self.context.vertices, self.faces)
+        return self._mesh
+
+
+def intersect_mesh_rays(_bvh, _points, _vectors, _normals=None):
+    """Same inputs/outputs as 'ladybug_rhino.intersect.intersect_mesh_rays'
+
+    Arguments:
+        _bvh: (MeshBVH) The shading mesh BVH
+        _points: (list) The analysis points (Ladybug / Rhino points or tuples)
+        _vectors: (list) The sky patch vectors to cast from each point
+        _normals: (list) Optional. The normal for each point. If given, any vector
+            more than 90 degrees from the normal is set to 0 without casting a ray.
+    Returns: (tuple)
+        int_matrix: (list: list: int) 1 if the patch is visible (not blocked), else 0
+        angles: (list: list: float) Angle (radians) between the normal and each
+            vector. Only returned if _normals are given, otherwise None.
+    """
+
+    points = [xyz(pt) for pt in _points]
+    vectors = [xyz(vec) for vec in _vectors]
+    n_vecs = len(vectors)
+
+    # Angle of each vector from the point normals, and which rays need casting
+    angles = None
+    if _normals is not None:
+        angles = [[_angle(xyz(normal), vec) for vec in vectors] for normal in _normals]
+        cast = [[ang <= math.pi / 2 for ang in row] for row in angles]
+    else:
+        cast = [[True] * n_vecs for _ in points]
+
+    origins, directions, slots = [], [], []
+    for i, pt in enumerate(points):
+        for j, vec in enumerate(vectors):
+            if cast[i][j]:
+                origins.append(pt)
+                directions.append(vec)
+                slots.append((i, j))
+
+    int_matrix = [[0] * n_vecs for _ in points]
+    for (i, j), blocked in izip(slots, _bvh.any_hit(origins, directions)):
+        int_matrix[i][j] = 0 if blocked else 1
+
+    return int_matrix, angles
+
+
+# ------------------------------------------------------------------------------
+def _flatten_vertices(_vertices):
+    if not len(_vertices):
+        return []
+    first = _vertices[0]
+    if isinstance(first, (int, float)):
+        return [float(v) for v in _vertices]
+    return [float(c) for v in _vertices for c in xyz(v)]
+
+
+def _flatten_faces(_faces):
+    if not len(_faces):
+        return []
+    if isinstance(_faces[0], int) or (np is not None and isinstance(_faces[0], np.integer)):
+        return [int(f) for f in _faces]
+
+    tris = []
+    for face in _faces:
+        face = [int(f) for f in face]
+        tris.extend(face[:3])
+        if len(face) == 4 and face[3] != face[2]:
+            tris.extend((face[0], face[2], face[3]))
+    return tris
+
+
+def _angle(_a, _b):
+    ax, ay, az = _a
+    bx, by, bz = _b
+    len_a = math.sqrt(ax * ax + ay * ay + az * az)
+    len_b = math.sqrt(bx * bx + by * by + bz * bz)
+    if not len_a or not len_b:
+        return 0.0
+    cos = (ax * bx + ay * by + az * bz) / (len_a * len_b)
+    return math.acos(max(-1.0, min(1.0, cos)))
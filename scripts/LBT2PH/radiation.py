@@ -0,0 +1,149 @@
+"""Incident radiation kernels for the window shading calculation.
+
+Uses NumPy when it is available, otherwise (ie: under IronPython) a fallback
+built on the 'array' module.
+"""
+
+import math
+from array import array
+from collections import namedtuple
+
+try:
+    from itertools import izip
+except ImportError:  # Python 3
+    izip = zip
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from LBT2PH.vectors import xyz, unit
+
+WindowRadiation = namedtuple('WindowRadiation', ['face_kWh', 'face_areas', 'total_kWh', 'average_kWh'])
+
+
+def relative_matrix(_int_matrix, _angles):
+    """Builds the dense (points x sky-patches) intersection * cos(angle) matrix
+
+    Arguments:
+        _int_matrix: (list: list: int) 1 if the sky patch is visible from the
+            point, 0 if not. As returned by 'intersect_mesh_rays'.
+        _angles: (list: list: float) Angle (radians) between the point's normal
+            and each sky patch vector.
+    Returns:
+        matrix: A numpy 2D array, or a list of array('d') rows under IronPython
+    """
+
+    if np is not None:
+        int_mtx = np.asarray(_int_matrix, dtype=float)
+        if int_mtx.size == 0:
+            return int_mtx.reshape(0, 0)
+        return int_mtx * np.cos(np.asarray(_angles, dtype=float))
+
+    cos = math.cos
+    return [array('d', [cos(ang) if ival else 0.0 for ival, ang in izip(int_vals, angs)])
+            for int_vals, angs in izip(_int_matrix, _angles)]
+
+
+def unshaded_matrix(_normals, _sky_vecs):
+    """Builds the dense (points x sky-patches) cos(angle) matrix with no shading at all
+
+    This is the analytical version of ray-casting against a surface which
+    can never shade the point: a sky patch is visible if it is in front of the
+    point's normal, and its contribution is weighted by the cosine of the angle.
+    Patches behind the normal get 0.
+
+    Arguments:
+        _normals: (list) The normal vector of each analysis point
+        _sky_vecs: (list) The vector of each sky patch
+    Returns:
+        matrix: A numpy 2D array, or a list of array('d') rows under IronPython
+    """
+
+    normals = [unit(xyz(v)) for v in _normals]
+    sky_vecs = [unit(xyz(v)) for v in _sky_vecs]
+
+    if np is not None:
+        if not normals or not sky_vecs:
+            return np.zeros((len(normals), len(sky_vecs)))
+        cos = np.dot(np.asarray(normals, dtype=float), np.asarray(sky_vecs, dtype=float).T)
+        return np.clip(cos, 0.0, None)
+
+    rows = []
+    for nx, ny, nz in normals:
+        row = array('d', [nx * vx + ny * vy + nz * vz for vx, vy, vz in sky_vecs])
+        rows.append( array('d', [c if c > 0.0 else 0.0 for c in row]) )
+    return rows
+
+
+def matrix_vector(_matrix, _vector):
+    """Matrix-vector product. Returns a list of floats (one per matrix row) """
+
+    if np is not None:
+        if len(_matrix) == 0:
+            return []
+        return np.dot(_matrix, np.asarray(_vector, dtype=float)).tolist()
+
+    vec = _vector if isinstance(_vector, array) else array('d', _vector)
+    return [math.fsum(map(float.__mul__, row, vec)) for row in _matrix]
+
+
+def matrix_matrix(_matrix, _vectors):
+    """Applies several weight vectors to the same matrix in a single pass.
+
+    Returns a list (one per vector) of lists of floats (one per matrix row)
+    """
+
+    if np is not None:
+        if len(_matrix) == 0:
+            return [[] for _ in _vectors]
+        weights = np.asarray(_vectors, dtype=float).T  # patches x vectors
+        return np.dot(_matrix, weights).T.tolist()
+
+    return [matrix_vector(_matrix, vector) for vector in _vectors]
+
+
+def window_radiation(_matrix, _total_sky_rad, _face_areas):
+    """Computes the per-face and whole-window radiation for a single window
+
+    Arguments:
+        _matrix: The dense relative matrix for the window, from relative_matrix()
+        _total_sky_rad: (list: float) Radiation (kWh/m2) of each sky patch
+        _face_areas: (list: float) Area of each analysis face (one per matrix row)
+    Returns:
+        (WindowRadiation) namedtuple with:
+            face_kWh: (list: float) Total kWh on each analysis face
+            face_areas: (list: float) The area of each analysis face
+            total_kWh: (float) Total kWh on the window
+            average_kWh: (float) Area-weighted average kWh/m2 on the window
+    """
+
+    return window_radiation_multi(_matrix, [_total_sky_rad], _face_areas)[0]
+
+
+def window_radiation_multi(_matrix, _sky_rads, _face_areas):
+    """Same as window_radiation() but for several skies sharing one matrix
+
+    Used when the skies share the same patch geometry (dome type and north)
+    so that the intersection matrix only has to be computed once.
+
+    Arguments:
+        _matrix: The dense relative matrix for the window, from relative_matrix()
+        _sky_rads: (list: list: float) The sky patch radiation vector for each sky
+        _face_areas: (list: float) Area of each analysis face (one per matrix row)
+    Returns:
+        (list: WindowRadiation) One result for each sky, in input order
+    """
+
+    face_areas = [float(a) for a in _face_areas]
+    total_area = math.fsum(face_areas)
+
+    results = []
+    for point_rad in matrix_matrix(_matrix, _sky_rads):
+        face_kWh = [rad * area for rad, area in izip(point_rad, face_areas)]
+        total_kWh = math.fsum(face_kWh)
+        average_kWh = total_kWh / total_area if total_area else 0.0
+        results.append( WindowRadiation(face_kWh, face_areas, total_kWh, average_kWh) )
+
+    return results
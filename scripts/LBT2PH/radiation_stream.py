@@ -0,0 +1,148 @@
+"""Writes the per-face window radiation results to a CSV file, instead of holding them all in memory.
+
+Only the running min / max of each column is kept (for the legend). A column can
+be read back a row at a time, or as an array('d').
+"""
+
+import csv
+from array import array
+
+try:
+    from itertools import izip
+except ImportError:  # Python 3
+    izip = zip
+
+try:
+    text_type = unicode
+except NameError:  # Python 3
+    text_type = None
+
+COLUMNS = ('window', 'name', 'face', 'area', 'winter_shaded_kWh', 'summer_shaded_kWh')
+VALUE_COLUMNS = COLUMNS[3:]
+
+
+class RunningRange(object):
+    """The min / max of a stream of values, without keeping the values """
+
+    def __init__(self):
+        self.min = None
+        self.max = None
+        self.count = 0
+
+    def add(self, _values):
+        for val in _values:
+            val = float(val)
+            if self.min is None or val < self.min:
+                self.min = val
+            if self.max is None or val > self.max:
+                self.max = val
+            self.count += 1
+
+    def __repr__(self):
+        return "{}(min={!r}, max={!r}, count={!r})".format(self.__class__.__name__, self.min, self.max, self.count)
+
+
+class RadiationWriter(object):
+    """Writes each window's per-face results to a CSV file, a chunk of rows at a time
+
+    Arguments:
+        _path: (str) The CSV file to write. Any existing file is overwritten.
+        _chunk_rows: (int) Optional. The number of rows to collect before writing them out.
+    """
+
+    def __init__(self, _path, _chunk_rows=10000):
+        self.path = _path
+        self.chunk_rows = _chunk_rows
+        self.ranges = dict((column, RunningRange()) for column in VALUE_COLUMNS)
+        self.window_count = 0
+        self._rows = []
+
+        try:
+            self._file = open(_path, 'w', newline='')
+        except TypeError:  # Python 2
+            self._file = open(_path, 'wb')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(COLUMNS)
+
+    def write_window(self, _index, _name, _face_areas, _winter_kWh, _summer_kWh):
+        """Adds one window's per-face results
+
+        Arguments:
+            _index: (int) The window's index (branch) in the outputs
+            _name: (str) The window's name
+            _face_areas: (list: float) The area of each face of the window's mesh
+            _winter_kWh: (list: float) The winter radiation on each face
+            _summer_kWh: (list: float) The summer radiation on each face
+        """
+
+        columns = (_face_areas, _winter_kWh, _summer_kWh)
+        for column, values in izip(VALUE_COLUMNS, columns):
+            self.ranges[column].add(values)
+
+        # The Python 2 csv module only writes byte strings
+        if text_type and isinstance(_name, text_type):
+            _name = _name.encode('utf-8')
+
+        for face, (area, winter, summer) in enumerate(izip(*columns)):
+            self._rows.append( (_index, _name, face, repr(float(area)), repr(float(winter)), repr(float(summer))) )
+
+        self.window_count += 1
+        if len(self._rows) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if self._rows:
+            self._writer.writerows(self._rows)
+            self._rows = []
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        self.close()
+
+    def __repr__(self):
+        return "{}(_path={!r}, _chunk_rows={!r})".format(self.__class__.__name__, self.path, self.chunk_rows)
+
+
+def iter_column(_path, _column):
+    """Reads one of the value columns back from the file, a row at a time
+
+    Only the current row is held in memory, so any number of rows can be read.
+
+    Arguments:
+        _path: (str) The CSV file written by a RadiationWriter
+        _column: (str) One of the VALUE_COLUMNS
+    Yields:
+        (float) The values, in row order
+    """
+
+    try:
+        f = open(_path, 'r', newline='')
+    except TypeError:  # Python 2
+        f = open(_path, 'rb')
+
+    with f:
+        reader = csv.reader(f)
+        k = next(reader).index(_column)
+        for row in reader:
+            yield float(row[k])
+
+
+def read_column(_path, _column):
+    """Reads one of the value columns back from the file, in row order
+
+    Arguments:
+        _path: (str) The CSV file written by a RadiationWriter
+        _column: (str) One of the VALUE_COLUMNS
+    Returns:
+        (array) The values, as array('d')
+    """
+
+    return array('d', iter_column(_path, _column))
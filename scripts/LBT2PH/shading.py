@@ -1,8 +1,17 @@
 from collections import namedtuple
 import math
+import time
+import Rhino
 import ghpythonlib.components as ghc
 from System import Object
 
+import LBT2PH
+import LBT2PH.spatial
+import LBT2PH.shading_geometry
+
+reload(LBT2PH.spatial)
+reload(LBT2PH.shading_geometry)
+
 class PHPP_Shading_Dims(Object):
     """ PHPP-Style dimensions to shading objects """
     
@@ -103,8 +112,83 @@ class PHPP_Shading_Dims(Object):
         
         return new_obj
 
-def calc_shading_dims_simple(_phpp_window_obj, _shading_objs, _limit=99):
-    """Finds PHPP-Style dimensions to relevant shading objects"""
+class ShadingIndex(object):
+    """Spatial index (AABB tree) of the shading objects
+    
+    Built once for all the windows. Each window's test lines / surfaces are then
+    only intersected with the shading objects whose bounding-boxes they pass through,
+    instead of with every object in the scene. The box test is conservative, so the
+    objects found are always a super-set of the ones which really intersect.
+    
+    Arguments:
+        _shading_objs: (list) The shading Breps
+        _tolerance: (float) Extra margin around each bounding-box
+    """
+    
+    def __init__(self, _shading_objs, _tolerance=0.01):
+        self.objs = list(_shading_objs)
+        self.tolerance = _tolerance
+        
+        boxes = []
+        self._unboxed = []
+        for i, obj in enumerate(self.objs):
+            try:
+                bb = obj.GetBoundingBox(True)
+            except AttributeError:
+                bb = None
+            
+            if bb and bb.IsValid:
+                boxes.append( ((bb.Min.X, bb.Min.Y, bb.Min.Z), (bb.Max.X, bb.Max.Y, bb.Max.Z)) )
+            else:
+                # Can't box it, so always test it
+                boxes.append( None )
+                self._unboxed.append( i )
+        
+        self.tree = LBT2PH.spatial.BoxTree(boxes)
+    
+    def _objs(self, _indices):
+        return [self.objs[i] for i in sorted(set(_indices + self._unboxed))]
+    
+    def along_line(self, _line):
+        """The shading objects which could intersect the line. In input order. """
+        
+        start = (_line.From.X, _line.From.Y, _line.From.Z)
+        end = (_line.To.X, _line.To.Y, _line.To.Z)
+        return self._objs( self.tree.query_segment(start, end, self.tolerance) )
+    
+    def on_surface(self, _line_a, _line_b):
+        """The shading objects which could intersect the ghc.SumSurface() of the two lines. In input order. """
+        
+        origin = (_line_a.From.X, _line_a.From.Y, _line_a.From.Z)
+        edge_a = (_line_a.To.X - _line_a.From.X, _line_a.To.Y - _line_a.From.Y, _line_a.To.Z - _line_a.From.Z)
+        edge_b = (_line_b.To.X - _line_b.From.X, _line_b.To.Y - _line_b.From.Y, _line_b.To.Z - _line_b.From.Z)
+        return self._objs( self.tree.query_parallelogram(origin, edge_a, edge_b, self.tolerance) )
+
+def _nearby(_shadingGeom, _index, _line_a, _line_b=None):
+    """The shading objects to test: all of them, or only those the index finds near the line / surface """
+    
+    if _index is None:
+        return _shadingGeom
+    
+    if _line_b is None:
+        return _index.along_line(_line_a)
+    
+    return _index.on_surface(_line_a, _line_b)
+
+def calc_shading_dims_simple(_phpp_window_obj, _shading_objs, _limit=99, _index=None, _analytic_reveal=False):
+    """Finds PHPP-Style dimensions to relevant shading objects
+    
+    Arguments:
+        _phpp_window_obj: The PHPP_Window object to calculate the values for
+        _shading_objs: (list) A list of possible shading objects to test against
+        _limit: (float) A number (m) to limit the shading search to. Default = 99m
+        _index: (ShadingIndex) Optional. A spatial index of the _shading_objs. If
+            given, only the objects near each test line / surface are intersected.
+        _analytic_reveal: (bool) Set True to take the reveal dimensions straight from
+            the window's install depth and frame widths (see find_reveal_shading_analytic)
+    Returns:
+        shading_dims_obj: (PHPP_Shading_Dims)
+    """
     
     shading_dims_obj = PHPP_Shading_Dims()
     if not _shading_objs:
@@ -112,9 +196,12 @@ def calc_shading_dims_simple(_phpp_window_obj, _shading_objs, _limit=99):
     
     # ----------------------------------------------------------------------
     # Find the relevant geometry in the scene and figures out the critical dimensions from the window
-    h_hori, d_hori, checkline_hori = find_horizon_shading(_phpp_window_obj, _shading_objs, _limit)
-    d_over, o_over, checkline_over = find_overhang_shading(_phpp_window_obj, _shading_objs, _limit)
-    o_reveal, d_reveal, checkline_1, checkline_2 = find_reveal_shading(_phpp_window_obj, _shading_objs, _limit)
+    h_hori, d_hori, checkline_hori = find_horizon_shading(_phpp_window_obj, _shading_objs, _limit, _index)
+    d_over, o_over, checkline_over = find_overhang_shading(_phpp_window_obj, _shading_objs, _limit, _index)
+    if _analytic_reveal:
+        o_reveal, d_reveal, checkline_1, checkline_2 = find_reveal_shading_analytic(_phpp_window_obj, _shading_objs, _limit, _index)
+    else:
+        o_reveal, d_reveal, checkline_1, checkline_2 = find_reveal_shading(_phpp_window_obj, _shading_objs, _limit, _index)
 
     # ----------------------------------------------------------------------
     # Package for output
@@ -124,12 +211,43 @@ def calc_shading_dims_simple(_phpp_window_obj, _shading_objs, _limit=99):
 
     return shading_dims_obj
 
-def find_horizon_shading(_phpp_window_obj, _shadingGeom, _extents=99):
+def calc_shading_dims_simple_batch(_phpp_window_objs, _shading_objs, _limit=99, _index=None, _analytic_reveal=False):
+    """Runs calc_shading_dims_simple() for many windows, one at a time, timing each one
+    
+    The windows are run in order on the calling thread: the search is made from
+    Grasshopper components (ghc), and fills in each PHPP_Window's geometry (with
+    rs.OffsetCurve) as it goes, none of which are thread-safe.
+    
+    Arguments:
+        _phpp_window_objs: (list) The PHPP_Window objects to calculate the values for
+        _shading_objs: (list) A list of possible shading objects to test against
+        _limit: (float) A number (m) to limit the shading search to. Default = 99m
+        _index: (ShadingIndex) Optional. A spatial index of the _shading_objs.
+        _analytic_reveal: (bool) Set True to use the closed-form reveal dimensions
+    Returns:
+        (list: tuple) For each window, in the same order as the input: 
+            (shading_dims_obj, seconds, error). 'error' is None, or the Exception 
+            raised for that window (in which case shading_dims_obj is None)
+    """
+    
+    results = []
+    for phpp_window_obj in _phpp_window_objs:
+        start = time.time()
+        try:
+            dims = calc_shading_dims_simple(phpp_window_obj, _shading_objs, _limit, _index, _analytic_reveal)
+            results.append( (dims, time.time() - start, None) )
+        except Exception as e:
+            results.append( (None, time.time() - start, e) )
+    
+    return results
+
+def find_horizon_shading(_phpp_window_obj, _shadingGeom, _extents=99, _index=None):
     """
     Arguments:
         _phpp_winddow_obj: The PHPP_Window object to calcualte the values for
         _shadingGeom: (list) A list of possible shading objects to test against
         _extents: (float) A number (m) to limit the shading search to. Default = 99m
+        _index: (ShadingIndex) Optional. A spatial index of the _shadingGeom
     Returns:
         h_hori: Distance (m) out from the glazing surface of any horizontal shading objects found
         d_hori: Distance (m) up from the base of the window to the top of any horizontal shading objects found
@@ -149,7 +267,7 @@ def find_horizon_shading(_phpp_window_obj, _shadingGeom, _extents=99):
     
     HorizontalLine = ghc.LineSDL(ShadingOrigin, surface_normal, _extents)
     VerticalLine = ghc.LineSDL(ShadingOrigin, UpVector, _extents)
-    for shadingObj in _shadingGeom:
+    for shadingObj in _nearby(_shadingGeom, _index, HorizontalLine):
         if ghc.BrepXCurve(shadingObj, HorizontalLine).points != None:
             HorizonShading.append( shadingObj )
     
@@ -167,31 +285,15 @@ def find_horizon_shading(_phpp_window_obj, _shadingGeom, _extents=99):
     
     #-----------------------------------------------------------------------
     # Run the "Top-Corner-Finder" if there are any intersecting objects...
-    if len(IntersectionPoints) != 0:
-        # Find the top/closets point for each of the objects that could possibly shade
-        KeyPoints = []
-        for pnt in IntersectionPoints:
-            Rays = []
-            Angles = []
-            if pnt:
-                for k in range(len(pnt)):
-                    Rays.append(ghc.Vector2Pt(ShadingOrigin,pnt[k], False).vector)
-                    Angles.append(ghc.Angle(surface_normal , Rays[k]).angle)
-                KeyPoints.append(pnt[Angles.index(max(Angles))])
-    
-        # Find the relevant highest / closest point
-        Rays = []
-        Angles = []
-        for i in range(len(KeyPoints)):
-            Rays.append(ghc.Vector2Pt(surface_normal, KeyPoints[i], False).vector)
-            Angles.append(ghc.Angle(surface_normal, Rays[i]).angle)
-        KeyPoint = KeyPoints[Angles.index(max(Angles))]
+    # The key point is the highest / closest one: at the largest angle up from the normal
+    candidate_points = [pt for pnt in IntersectionPoints if pnt for pt in pnt]
+    key = LBT2PH.shading_geometry.horizon_key_point(ShadingOrigin, surface_normal, candidate_points)
     
+    if key is not None:
         # Use the point it finds to deliver the Height and Distance for the PHPP Shading Calculator
-        h_hori = KeyPoint.Z - ShadingOrigin.Z #Vertical distance
-        Hypot = ghc.Length(ghc.Line(ShadingOrigin, KeyPoint))
-        d_hori = math.sqrt(Hypot**2 - h_hori**2)
-        CheckLine = ghc.Line(ShadingOrigin, KeyPoint)
+        h_hori = key.height     # Vertical distance
+        d_hori = key.distance   # Horizontal distance
+        CheckLine = ghc.Line(ShadingOrigin, candidate_points[key.index])
     else:
         h_hori = None
         d_hori = None
@@ -199,7 +301,7 @@ def find_horizon_shading(_phpp_window_obj, _shadingGeom, _extents=99):
     
     return h_hori, d_hori, CheckLine
 
-def find_overhang_shading(_phpp_window_obj, _shadingGeom, _extents=99):
+def find_overhang_shading(_phpp_window_obj, _shadingGeom, _extents=99, _index=None):
     # Figure out the glass surface (inset a bit) and then
     # find the origin point for all the subsequent shading calcs (top, middle)
     glzgCenter = ghc.Area(_phpp_window_obj.glazing_surface).centroid
@@ -221,7 +323,7 @@ def find_overhang_shading(_phpp_window_obj, _shadingGeom, _extents=99):
     edge2 = ghc.LineSDL(ShadingOrigin, _phpp_window_obj.surface_normal, depth)
     intersectionTestPlane = ghc.SumSurface(edge1, edge2)
     
-    OverhangShadingObjs = (x for x in _shadingGeom 
+    OverhangShadingObjs = (x for x in _nearby(_shadingGeom, _index, edge1, edge2)
                     if ghc.BrepXBrep(intersectionTestPlane, x).curves != None)
     
     #-----------------------------------------------------------------------
@@ -233,42 +335,23 @@ def find_overhang_shading(_phpp_window_obj, _shadingGeom, _extents=99):
     VerticalLine = ghc.LineSDL(ShadingOrigin, UpVector, _extents)
     
     IntersectionSurface = ghc.SumSurface(HorizontalLine, VerticalLine)
-    IntersectionCurves = (ghc.BrepXBrep(obj, IntersectionSurface).curves 
-                            for obj in OverhangShadingObjs
-                            if ghc.BrepXBrep(obj, IntersectionSurface).curves != None)
-    IntersectionPointsList = (ghc.ControlPoints(crv).points for crv in IntersectionCurves)
-    IntersectionPoints = (pt for list_of_pts in IntersectionPointsList for pt in list_of_pts)
+    IntersectionCurves = (ghc.BrepXBrep(obj, IntersectionSurface).curves for obj in OverhangShadingObjs)
+    IntersectionPointsList = (ghc.ControlPoints(crv).points for crv in IntersectionCurves if crv != None)
+    IntersectionPoints = [pt for list_of_pts in IntersectionPointsList for pt in list_of_pts if pt != None]
     
     #-----------------------------------------------------------------------
     # If there are any intersection Points found, choose the right one to use to calc shading....
-    # Find the top/closets point for each of the objects that could possibly shade
-    smallest_angle_found = 2 * math.pi
-    key_point = None
-    
-    for pt in IntersectionPoints:
-        if pt == None:
-            continue
-        
-        # Protect against Zero-Length error
-        ray = ghc.Vector2Pt(ShadingOrigin, pt, False).vector
-        if ray.Length < 0.001:
-            continue
-        
-        this_ray_angle = ghc.Angle(_phpp_window_obj.surface_normal , ray).angle
-        if this_ray_angle < 0.001:
-            continue
-        
-        if this_ray_angle <= smallest_angle_found:
-            smallest_angle_found = this_ray_angle
-            key_point = pt
+    # The key point is the one at the smallest angle from the normal (ignoring any
+    # right at the origin, or straight out along the normal)
+    key = LBT2PH.shading_geometry.overhang_key_point(ShadingOrigin,
+                _phpp_window_obj.surface_normal, IntersectionPoints, 0.001, 0.001)
     
     #-----------------------------------------------------------------------
     # Use the 'key point' found to deliver the Height and Distance for the PHPP Shading Calculator
-    if key_point is not None:
-        d_over = key_point.Z - ShadingOrigin.Z                              # Vertical distance
-        Hypot = ghc.Length(ghc.Line(ShadingOrigin, key_point))              # Hypot
-        o_over = math.sqrt(Hypot**2 - d_over**2)                            # Horizontal distance
-        CheckLine = ghc.Line(ShadingOrigin, key_point)
+    if key is not None:
+        d_over = key.height         # Vertical distance
+        o_over = key.distance       # Horizontal distance
+        CheckLine = ghc.Line(ShadingOrigin, IntersectionPoints[key.index])
     else:
         d_over = None
         o_over = None
@@ -276,7 +359,7 @@ def find_overhang_shading(_phpp_window_obj, _shadingGeom, _extents=99):
     
     return d_over, o_over, CheckLine
 
-def find_reveal_shading(_phpp_window_obj, _shadingGeom, _extents=99):
+def find_reveal_shading(_phpp_window_obj, _shadingGeom, _extents=99, _index=None):
     
     WinCenter = ghc.Area(_phpp_window_obj.glazing_surface).centroid
     edges = _phpp_window_obj._get_edges_in_order(_phpp_window_obj.glazing_surface)
@@ -300,22 +383,20 @@ def find_reveal_shading(_phpp_window_obj, _shadingGeom, _extents=99):
     Side1_RevealShaderObjs = []
     testStartPt = ghc.Move(WinCenter, ghc.Amplitude(surface_normal, 0.1)).geometry #Offsets the test line just a bit
     Side1_TesterLine = ghc.LineSDL(testStartPt, Side1_Direction, _extents) #extend a line off to side 1
-    for i in range(len(_shadingGeom)):
-        if ghc.BrepXCurve(_shadingGeom[i],Side1_TesterLine).points != None:
-            Side1_RevealShaderObjs.append(_shadingGeom[i])
+    for shadingObj in _nearby(_shadingGeom, _index, Side1_TesterLine):
+        if ghc.BrepXCurve(shadingObj,Side1_TesterLine).points != None:
+            Side1_RevealShaderObjs.append(shadingObj)
     
     Side2_RevealShaderObjs = []
     Side2_TesterLine = ghc.LineSDL(testStartPt, Side2_Direction, _extents) #extend a line off to side 2
-    for i in range(len(_shadingGeom)):
-        if ghc.BrepXCurve(_shadingGeom[i],Side2_TesterLine).points != None:
-            Side2_RevealShaderObjs.append(_shadingGeom[i])
+    for shadingObj in _nearby(_shadingGeom, _index, Side2_TesterLine):
+        if ghc.BrepXCurve(shadingObj,Side2_TesterLine).points != None:
+            Side2_RevealShaderObjs.append(shadingObj)
     
-    NumShadedSides = 0
     if len(Side1_RevealShaderObjs) != 0:
         Side1_o_reveal = CalcRevealDims(_phpp_window_obj, Side1_RevealShaderObjs, Side1_IntersectionSurface, Side1_OriginPt, Side1_Direction)[0]
         Side1_d_reveal = CalcRevealDims(_phpp_window_obj, Side1_RevealShaderObjs, Side1_IntersectionSurface, Side1_OriginPt, Side1_Direction)[1]
         Side1_CheckLine = CalcRevealDims(_phpp_window_obj, Side1_RevealShaderObjs, Side1_IntersectionSurface, Side1_OriginPt, Side1_Direction)[2]
-        NumShadedSides = NumShadedSides + 1
     else:
         Side1_o_reveal =  None
         Side1_d_reveal = None
@@ -325,17 +406,81 @@ def find_reveal_shading(_phpp_window_obj, _shadingGeom, _extents=99):
         Side2_o_reveal = CalcRevealDims(_phpp_window_obj, Side2_RevealShaderObjs, Side2_IntersectionSurface, Side2_OriginPt, Side2_Direction)[0]
         Side2_d_reveal = CalcRevealDims(_phpp_window_obj, Side2_RevealShaderObjs, Side2_IntersectionSurface, Side2_OriginPt, Side2_Direction)[1]
         Side2_CheckLine = CalcRevealDims(_phpp_window_obj, Side2_RevealShaderObjs, Side2_IntersectionSurface, Side2_OriginPt, Side2_Direction)[2]
-        NumShadedSides = NumShadedSides + 1
     else:
         Side2_o_reveal =  None
         Side2_d_reveal = None
         Side2_CheckLine = Side2_HorizLine
     
-    o_reveal = (Side1_o_reveal + Side2_o_reveal )/ max(1,NumShadedSides)
-    d_reveal = (Side1_d_reveal + Side2_d_reveal )/ max(1,NumShadedSides)
+    # Average only the sides which found a reveal
+    Side1 = (Side1_o_reveal, Side1_d_reveal) if Side1_o_reveal is not None else None
+    Side2 = (Side2_o_reveal, Side2_d_reveal) if Side2_o_reveal is not None else None
+    o_reveal, d_reveal = LBT2PH.shading_geometry.average_reveal([Side1, Side2])
     
     return o_reveal, d_reveal, Side1_CheckLine, Side2_CheckLine
 
+def find_reveal_shading_analytic(_phpp_window_obj, _shadingGeom, _extents=99, _index=None):
+    """Reveal shading dimensions from the window's install depth and frame widths
+    
+    For a window set back into the wall, the reveal's outer corner is the key point
+    and the dimensions follow directly: o_reveal = install depth, d_reveal = frame
+    width. Only if some other object sticks out into the zone in front of a reveal
+    (closer to the window normal than that corner) does the Brep intersection
+    search (find_reveal_shading) need to be run.
+    
+    Arguments:
+        _phpp_window_obj: The PHPP_Window object to calculate the values for
+        _shadingGeom: (list) A list of possible shading objects to test against
+        _extents: (float) A number (m) to limit the shading search to. Default = 99m
+        _index: (ShadingIndex) Optional. A spatial index of the _shadingGeom
+    Returns:
+        o_reveal: Average reveal depth of the sides with a reveal, or None
+        d_reveal: Average distance from the glazing edge to the reveal, or None
+        checkline1: Left side check line
+        checkline2: Right side check line
+    """
+    
+    install_depth = float(_phpp_window_obj.install_depth or 0)
+    edges = _phpp_window_obj.window_edges
+    frame = _phpp_window_obj.frame
+    installs = _phpp_window_obj.installs
+    normal = _phpp_window_obj.surface_normal
+    center = _phpp_window_obj.aperture.geometry.center
+    
+    sides = ( (edges.Left, frame.fLeft, installs.install_L),
+              (edges.Right, frame.fRight, installs.install_R) )
+    
+    dims = []
+    checklines = []
+    for edge, frame_width, has_reveal in sides:
+        side = LBT2PH.shading_geometry.reveal_side(center, normal, edge.midpoint,
+                                                   float(frame_width), install_depth)
+        origin = Rhino.Geometry.Point3d(*side.origin)
+        direction = Rhino.Geometry.Vector3d(*side.direction)
+        
+        if not has_reveal or install_depth <= 0:
+            dims.append( None )
+            checklines.append( ghc.LineSDL(origin, direction, _extents) )
+            continue
+        
+        #-----------------------------------------------------------------------
+        # Is anything sticking out in front of the reveal? Check the object's bounding-box,
+        # in the side's own plane (x=sideways, y=outward, z=along the edge)
+        normal_line = ghc.LineSDL(origin, normal, _extents)
+        side_line = ghc.LineSDL(origin, direction, _extents)
+        plane = Rhino.Geometry.Plane(origin, direction, normal)
+        for shadingObj in _nearby(_shadingGeom, _index, normal_line, side_line):
+            bb = shadingObj.GetBoundingBox(plane)
+            local_box = ((bb.Min.X, bb.Min.Y, bb.Min.Z), (bb.Max.X, bb.Max.Y, bb.Max.Z))
+            if LBT2PH.shading_geometry.reveal_zone_hit(local_box, side.o_reveal, side.d_reveal, _extents):
+                return find_reveal_shading(_phpp_window_obj, _shadingGeom, _extents, _index)
+        
+        dims.append( (side.o_reveal, side.d_reveal) )
+        checklines.append( ghc.Line(origin, Rhino.Geometry.Point3d(*side.corner)) )
+    
+    o_reveal, d_reveal = LBT2PH.shading_geometry.average_reveal(dims)
+    
+    return o_reveal, d_reveal, checklines[0], checklines[1]
+
 def CalcRevealDims(_phpp_window_obj, RevealShaderObjs_input, SideIntersectionSurface, Side_OriginPt, Side_Direction):
     #Test shading objects for their edge points
     Side_IntersectionCurve = []
@@ -0,0 +1,273 @@
+"""On-disk JSON cache of each window's seasonal radiation results.
+
+Files are named by a fingerprint of everything the result depends on (window
+mesh, nearby context, grid size, skies). The folder is kept under a size limit
+by deleting the least-recently-used files.
+"""
+
+from array import array
+import hashlib
+import json
+import numbers
+import os
+
+try:
+    string_types = basestring
+except NameError:  # Python 3
+    string_types = str
+
+CACHE_VERSION = 2
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+PRECISION = 6
+_EXT = '.json'
+
+
+def fingerprint(*_parts):
+    """Builds a stable hash (hex string) from any nested numbers / strings / lists
+
+    Floats are rounded (see PRECISION) so that tiny floating-point noise between
+    runs does not change the fingerprint.
+    """
+
+    hasher = hashlib.sha1()
+    hasher.update(('v{}'.format(CACHE_VERSION)).encode('utf-8'))
+    for part in _parts:
+        _update(hasher, part)
+    return hasher.hexdigest()
+
+
+def triangles_fingerprint(_vertices, _faces):
+    """Hash of a triangle mesh's geometry, independent of the triangle / vertex order
+
+    Only the triangle coordinates are used, not the indices. So adding or removing
+    geometry elsewhere in the joined context mesh (which re-numbers everything)
+    does not change the fingerprint of the triangles near a window.
+
+    Arguments:
+        _vertices: (list: float) Flat vertex coordinates [x0, y0, z0, x1, ...]
+        _faces: (list: int) Flat triangle vertex indices [a0, b0, c0, a1, ...]
+    Returns:
+        (str) The hex fingerprint
+    """
+
+    return ContextFingerprints(_vertices).fingerprint(_faces)
+
+
+class ContextFingerprints(object):
+    """The triangles_fingerprint of many subsets of the same context mesh
+
+    Each triangle's (rounded, sorted) coordinates are only worked out once, and
+    the fingerprint of each different set of triangles is only hashed once. So
+    use one of these for all the windows in a run.
+
+    Arguments:
+        _vertices: (list: float) The context mesh's flat vertex coordinates
+    """
+
+    def __init__(self, _vertices):
+        self.vertices = _vertices
+        self._triangles = {}
+        self._fingerprints = {}
+
+    def _triangle(self, _a, _b, _c):
+        key = (_a, _b, _c)
+        triangle = self._triangles.get(key)
+        if triangle is None:
+            verts = self.vertices
+            # + 0.0 so that -0.0 and 0.0 pack the same
+            corners = sorted(tuple(round(float(c), PRECISION) + 0.0 for c in verts[3 * v:3 * v + 3])
+                             for v in key)
+            triangle = self._triangles[key] = corners[0] + corners[1] + corners[2]
+        return triangle
+
+    def fingerprint(self, _faces):
+        """Arguments:
+            _faces: (list: int) Flat triangle vertex indices of the triangles to use
+        Returns:
+            (str) The hex fingerprint, as for triangles_fingerprint()
+        """
+
+        faces = tuple(int(f) for f in _faces)
+        result = self._fingerprints.get(faces)
+        if result is None:
+            packed = array('d')
+            for triangle in sorted(self._triangle(*faces[i:i + 3]) for i in range(0, len(faces), 3)):
+                packed.extend(triangle)
+
+            hasher = hashlib.sha1()
+            hasher.update(packed.tobytes() if hasattr(packed, 'tobytes') else packed.tostring())
+            result = self._fingerprints[faces] = hasher.hexdigest()
+        return result
+
+    def __repr__(self):
+        return "{}(vertices={!r}, fingerprints={!r})".format(self.__class__.__name__,
+                    len(self.vertices) // 3, len(self._fingerprints))
+
+
+class ShadingCache(object):
+    """A folder of cached per-window results, with size-based LRU eviction
+
+    Arguments:
+        _folder: (str) The folder to store the cache files in. Created if needed.
+        _max_bytes: (int) Optional. When the folder grows past this size, the
+            least-recently-used results are deleted. Default 100MB.
+    """
+
+    def __init__(self, _folder, _max_bytes=DEFAULT_MAX_BYTES):
+        self.folder = _folder
+        self.max_bytes = int(_max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self._total = None  # Running total size (bytes) of the entries
+
+        if not os.path.isdir(self.folder):
+            os.makedirs(self.folder)
+
+    def _path(self, _key):
+        return os.path.join(self.folder, _key + _EXT)
+
+    def get(self, _key):
+        """Returns the cached value for the key, or None if it is not in the cache """
+
+        path = self._path(_key)
+        try:
+            with open(path, 'r') as f:
+                value = json.load(f)
+        except (IOError, OSError, ValueError):
+            # Missing, or a partial / corrupt file
+            self.misses += 1
+            return None
+
+        try:
+            os.utime(path, None)  # Mark as recently used
+        except OSError:
+            pass
+
+        self.hits += 1
+        return value
+
+    def put(self, _key, _value):
+        """Stores a (JSON serializable) value, then evicts old entries if over the size limit """
+
+        if self._total is None:
+            self._total = self.size()
+
+        path = self._path(_key)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(_value, f)
+        self._total += os.path.getsize(tmp_path)
+
+        # os.rename will not overwrite on Windows
+        if os.path.exists(path):
+            self._total -= os.path.getsize(path)
+            os.remove(path)
+        os.rename(tmp_path, path)
+
+        if self._total > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Deletes the least-recently-used entries until the folder is under max_bytes
+
+        Returns:
+            (int) The number of entries deleted
+        """
+
+        entries = []
+        total = 0
+        for name in os.listdir(self.folder):
+            if not name.endswith(_EXT):
+                continue
+            path = os.path.join(self.folder, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path, stat.st_size))
+            total += stat.st_size
+
+        deleted = 0
+        entries.sort()
+        for _, path, size in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            deleted += 1
+
+        self._total = total
+        return deleted
+
+    def invalidate(self, _key=None):
+        """Removes a single entry, or everything in the cache if no key is given
+
+        Returns:
+            (int) The number of entries removed
+        """
+
+        if _key is not None:
+            names = [_key + _EXT]
+        else:
+            names = [n for n in os.listdir(self.folder) if n.endswith(_EXT) or n.endswith(_EXT + '.tmp')]
+
+        removed = 0
+        for name in names:
+            try:
+                os.remove(os.path.join(self.folder, name))
+                removed += 1
+            except OSError:
+                pass
+
+        self._total = None
+        return removed
+
+    def size(self):
+        """The total size (bytes) of all the entries in the cache folder """
+
+        total = 0
+        for name in os.listdir(self.folder):
+            if name.endswith(_EXT):
+                try:
+                    total += os.path.getsize(os.path.join(self.folder, name))
+                except OSError:
+                    pass
+        return total
+
+    def __len__(self):
+        return len([n for n in os.listdir(self.folder) if n.endswith(_EXT)])
+
+    def __repr__(self):
+        return "{}(_folder={!r}, _max_bytes={!r})".format(self.__class__.__name__, self.folder, self.max_bytes)
+
+
+# ------------------------------------------------------------------------------
+def _update(_hasher, _part):
+    if _part is None or isinstance(_part, bool):
+        _hasher.update(repr(_part).encode('utf-8'))
+    elif isinstance(_part, numbers.Integral):
+        _hasher.update(str(int(_part)).encode('utf-8'))
+    elif isinstance(_part, numbers.Real):
+        _hasher.update(('{:.%df}' % PRECISION).format(float(_part)).encode('utf-8'))
+    elif isinstance(_part, string_types):
+        _hasher.update(_part.encode('utf-8'))
+    elif isinstance(_part, dict):
+        for k in sorted(_part):
+            _update(_hasher, k)
+            _update(_hasher, _part[k])
+    else:
+        try:
+            items = list(_part)
+        except TypeError:
+            _hasher.update(str(_part).encode('utf-8'))
+            return
+        _hasher.update(b'[')
+        for item in items:
+            _update(_hasher, item)
+            _hasher.update(b',')
+        _hasher.update(b']')
+        return
+    _hasher.update(b'|')
@@ -0,0 +1,228 @@
+"""Vector math for the 'simple' PHPP window shading dimensions.
+
+LBT2PH.shading finds the intersection points with the shading geometry in Rhino;
+picking the key point and measuring the PHPP height / distance to it is done
+here on plain (x, y, z) tuples.
+"""
+
+import math
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from LBT2PH.vectors import xyz, unit
+
+KeyPoint = namedtuple('KeyPoint', ['index', 'point', 'height', 'distance'])
+RevealSide = namedtuple('RevealSide', ['origin', 'direction', 'corner', 'o_reveal', 'd_reveal'])
+
+
+def angles_from(_origin, _direction, _points):
+    """The angle (radians) between the direction and the vector from the origin to each point
+
+    Arguments:
+        _origin: The start point (tuple, or Ladybug / Rhino point)
+        _direction: The direction to measure the angles from (ie: the window normal)
+        _points: (list) The points
+    Returns: (tuple)
+        angles: (list: float) The angle for each point, 0 to pi. 0 for any point at the origin.
+        lengths: (list: float) The distance from the origin to each point
+    """
+
+    ox, oy, oz = xyz(_origin)
+    dx, dy, dz = xyz(_direction)
+    d_len = math.sqrt(dx * dx + dy * dy + dz * dz)
+    pts = [xyz(pt) for pt in _points]
+    if not pts:
+        return [], []
+
+    if np is not None:
+        rays = np.asarray(pts, dtype=float) - (ox, oy, oz)
+        lengths = np.sqrt((rays * rays).sum(axis=1))
+        denom = lengths * d_len
+        cos = np.divide(rays.dot((dx, dy, dz)), denom, out=np.ones_like(lengths), where=denom > 0)
+        return np.arccos(np.clip(cos, -1.0, 1.0)).tolist(), lengths.tolist()
+
+    angles, lengths = [], []
+    for x, y, z in pts:
+        rx, ry, rz = x - ox, y - oy, z - oz
+        length = math.sqrt(rx * rx + ry * ry + rz * rz)
+        if length and d_len:
+            cos = (rx * dx + ry * dy + rz * dz) / (length * d_len)
+            angles.append(math.acos(max(-1.0, min(1.0, cos))))
+        else:
+            angles.append(0.0)
+        lengths.append(length)
+    return angles, lengths
+
+
+def height_and_distance(_origin, _point):
+    """The PHPP (vertical height, horizontal distance) from the origin to the point """
+
+    ox, oy, oz = xyz(_origin)
+    x, y, z = xyz(_point)
+    return z - oz, math.sqrt((x - ox) ** 2 + (y - oy) ** 2)
+
+
+def horizon_key_point(_origin, _normal, _points):
+    """Finds the horizon key point: the one at the largest angle up from the window normal
+
+    Arguments:
+        _origin: The horizon shading origin (bottom-middle of the glazing)
+        _normal: The window's surface normal
+        _points: (list) The intersection points between the shading geometry
+            and the window's horizon test plane
+    Returns:
+        (KeyPoint) namedtuple with:
+            index: (int) The index of the key point in _points
+            point: (tuple) The key point (x, y, z)
+            height: (float) h_hori: vertical distance from the origin up to the point
+            distance: (float) d_hori: horizontal distance from the origin out to the point
+        Or None if there are no points.
+    """
+
+    angles, _ = angles_from(_origin, _normal, _points)
+    if not angles:
+        return None
+
+    # First one found wins any ties
+    index = angles.index(max(angles))
+    return _key_point(_origin, _points, index)
+
+
+def overhang_key_point(_origin, _normal, _points, _min_length=0.001, _min_angle=0.001):
+    """Finds the overhang key point: the one at the smallest angle from the window normal
+
+    Points closer to the origin than _min_length, or at less than _min_angle from
+    the normal, are ignored.
+
+    Arguments:
+        _origin: The overhang shading origin (top-middle of the glazing)
+        _normal: The window's surface normal
+        _points: (list) The intersection points between the shading geometry
+            and the window's overhang test plane
+        _min_length: (float) Ignore points this close to the origin
+        _min_angle: (float) Ignore points at less than this angle (radians) from the normal
+    Returns:
+        (KeyPoint) namedtuple with:
+            index: (int) The index of the key point in _points
+            point: (tuple) The key point (x, y, z)
+            height: (float) d_over: vertical distance from the origin up to the point
+            distance: (float) o_over: horizontal distance from the origin out to the point
+        Or None if no points are found.
+    """
+
+    angles, lengths = angles_from(_origin, _normal, _points)
+
+    index = None
+    smallest = 2 * math.pi
+    for i, (angle, length) in enumerate(zip(angles, lengths)):
+        if length < _min_length or angle < _min_angle:
+            continue
+        # Last one found wins any ties
+        if angle <= smallest:
+            smallest = angle
+            index = i
+
+    if index is None:
+        return None
+    return _key_point(_origin, _points, index)
+
+
+def reveal_side(_center, _normal, _edge_midpoint, _frame_width, _install_depth):
+    """The reveal shading dimensions for one side of a window, in closed form
+
+    The glass sits _install_depth back from the wall face, and its edge is
+    _frame_width in from the window (reveal) edge. With nothing else in the way,
+    the reveal's outer corner is the key point and so:
+        o_reveal = the install depth (glass edge out to the wall face)
+        d_reveal = the frame width (glass edge across to the reveal)
+
+    Arguments:
+        _center: The window's center point (in the wall face)
+        _normal: The window's outward normal
+        _edge_midpoint: The midpoint of the window's side edge (in the wall face)
+        _frame_width: (float) The frame width on that side
+        _install_depth: (float) The distance the window is set back from the wall face
+    Returns:
+        (RevealSide) namedtuple with:
+            origin: (tuple) The glass edge point the dimensions are measured from
+            direction: (tuple) Unit vector from the window center out toward the side
+            corner: (tuple) The reveal's outer corner (the 'key point')
+            o_reveal: (float)
+            d_reveal: (float)
+    """
+
+    nx, ny, nz = unit(xyz(_normal))
+    cx, cy, cz = xyz(_center)
+    mx, my, mz = xyz(_edge_midpoint)
+
+    # Sideways (in the window's plane) direction out to the edge
+    sx, sy, sz = mx - cx, my - cy, mz - cz
+    along = sx * nx + sy * ny + sz * nz
+    direction = unit((sx - along * nx, sy - along * ny, sz - along * nz))
+
+    depth, width = float(_install_depth), float(_frame_width)
+    origin = tuple(m - d * width - n * depth for m, d, n in zip((mx, my, mz), direction, (nx, ny, nz)))
+    return RevealSide(origin, direction, (mx, my, mz), depth, width)
+
+
+def reveal_zone_hit(_local_box, _o_reveal, _d_reveal, _extents=99, _tolerance=0.01):
+    """True if an object could be closer to the window normal than the reveal's corner
+
+    The box is in the side's local coordinates (see reveal_side):
+        s: sideways, out from the glass edge (the 'direction')
+        t: outward, along the window normal, from the glass plane
+        u: along the side edge, from its midpoint
+    The 'reveal zone' is the wedge, in the u=0 plane, between the window normal
+    and the line out through the reveal's corner, beyond the wall face. Anything
+    at or behind the wall face (the host wall, the window's own reveals) is ignored.
+
+    Arguments:
+        _local_box: (tuple) ((s0, t0, u0), (s1, t1, u1)) The object's box in local coordinates
+        _o_reveal: (float) The reveal depth
+        _d_reveal: (float) The distance from the glass edge across to the reveal
+        _extents: (float) How far out to look
+        _tolerance: (float)
+    Returns:
+        (bool)
+    """
+
+    (s0, t0, u0), (s1, t1, u1) = _local_box
+    if u0 > _tolerance or u1 < -_tolerance:
+        return False    # Does not cross the side's section plane
+    if t1 <= _o_reveal + _tolerance or t0 > _extents:
+        return False    # At or behind the wall face, or too far out
+    if s1 < -_tolerance or s0 > _extents:
+        return False
+
+    # The wedge gets wider further out, so test its widest part the box reaches
+    t = min(t1, _extents)
+    return max(s0, 0.0) * _o_reveal < _d_reveal * t - _tolerance
+
+
+def average_reveal(_sides):
+    """The average reveal dimensions of the sides which have a reveal
+
+    Arguments:
+        _sides: (list) For each side: (o_reveal, d_reveal), or None if the side has no reveal
+    Returns:
+        (tuple) (o_reveal, d_reveal), or (None, None) if none of the sides have a reveal
+    """
+
+    found = [side for side in _sides if side is not None]
+    if not found:
+        return None, None
+
+    o_reveal = sum(float(o) for o, d in found) / len(found)
+    d_reveal = sum(float(d) for o, d in found) / len(found)
+    return o_reveal, d_reveal
+
+
+# ------------------------------------------------------------------------------
+def _key_point(_origin, _points, _index):
+    point = xyz(_points[_index])
+    height, distance = height_and_distance(_origin, point)
+    return KeyPoint(_index, point, height, distance)
@@ -1,20 +1,48 @@
 from itertools import izip
 import math
+import os
+import tempfile
 import Rhino
+import scriptcontext as sc
 import Grasshopper.Kernel as ghK
+import ghpythonlib.parallel
+from System import Array
+from System.Collections.Generic import List
+from System.Drawing import Color
+
+import LBT2PH
+import LBT2PH.radiation
+import LBT2PH.occlusion
+import LBT2PH.shading_cache
+import LBT2PH.adaptive_grid
+import LBT2PH.sky_matrix
+import LBT2PH.visibility
+import LBT2PH.radiation_stream
+import LBT2PH.mesh_cache
+
+reload(LBT2PH.radiation)
+reload(LBT2PH.occlusion)
+reload(LBT2PH.shading_cache)
+reload(LBT2PH.adaptive_grid)
+reload(LBT2PH.sky_matrix)
+reload(LBT2PH.visibility)
+reload(LBT2PH.radiation_stream)
+reload(LBT2PH.mesh_cache)
 
 try:
     from ladybug.viewsphere import view_sphere
     from ladybug.graphic import GraphicContainer
+    from ladybug.legend import LegendParameters
 except ImportError as e:
     raise ImportError('\nFailed to import ladybug:\n\t{}'.format(e))
 
 try:
     from ladybug_rhino.config import conversion_to_meters
-    from ladybug_rhino.togeometry import to_joined_gridded_mesh3d
+    from ladybug_rhino.togeometry import to_joined_gridded_mesh3d, to_face3d
     from ladybug_rhino.fromgeometry import from_mesh3d, from_point3d, from_vector3d
-    from ladybug_geometry.geometry3d import Mesh3D
+    from ladybug_geometry.geometry3d import Mesh3D, Point3D
     from ladybug_rhino.fromobjects import legend_objects
+    from ladybug_rhino.color import color_to_color
     from ladybug_rhino.text import text_objects
     from ladybug_rhino.intersect import intersect_mesh_rays
     from ladybug_rhino.grasshopper import de_objectify_output
@@ -24,12 +52,60 @@ except ImportError as e:
 
 # Cacl Radiation
 #-------------------------------------------------------------------------------
+MESH_PARAM_NAMES = ('GridAngle', 'GridAspectRatio', 'GridAmplification', 'GridMaxCount',
+    'GridMinCount', 'MaximumEdgeLength', 'MinimumEdgeLength', 'MinimumTolerance', 'RefineAngle',
+    'RefineGrid', 'RelativeTolerance', 'SimplePlanes', 'Tolerance', 'JaggedSeams', 'ClosedObjectPostProcess')
+
+def context_mesh_cache():
+    """The MeshCache of context meshes, kept (in sc.sticky) for the whole Rhino session """
+    
+    cache = sc.sticky.get('LBT2PH_context_mesh_cache')
+    if cache is None:
+        cache = LBT2PH.mesh_cache.MeshCache()
+        sc.sticky['LBT2PH_context_mesh_cache'] = cache
+    return cache
+
+def mesh_params_key(_mesh_params):
+    """The meshing parameters settings, as a list of values (for the cache key) """
+    
+    return [getattr(_mesh_params, name, None) for name in MESH_PARAM_NAMES]
+
+def brep_fingerprint(_brep):
+    """A fingerprint of the Brep's geometry. Changes if the Brep is edited or moved
+    
+    The 32-bit CRC alone could clash, so the Brep's bounding box corners and
+    face / edge counts are included with it.
+    """
+    
+    try:
+        crc = _brep.DataCRC(0)
+    except AttributeError:
+        crc = None
+    
+    if crc is not None:
+        bbox = _brep.GetBoundingBox(False)
+        corners = [(pt.X, pt.Y, pt.Z) for pt in (bbox.Min, bbox.Max)]
+        return LBT2PH.shading_cache.fingerprint('crc', crc, corners, _brep.Faces.Count, _brep.Edges.Count)
+    
+    # No CRC available: use the Brep's vertices and the middle of each edge instead
+    vertices = [(v.Location.X, v.Location.Y, v.Location.Z) for v in _brep.Vertices]
+    edge_mids = []
+    for edge in _brep.Edges:
+        pt = edge.PointAt(edge.Domain.Mid)
+        edge_mids.append( (pt.X, pt.Y, pt.Z) )
+    
+    return LBT2PH.shading_cache.fingerprint(vertices, edge_mids, _brep.Faces.Count)
+
 def create_shading_mesh(_envelope_surfaces_punched, additional_shading_surfaces_,
-                        _window_surrounds, _mesh_params, _ghenv ):
+                        _window_surrounds, _mesh_params, _ghenv, _parallel=False, _cache=None ):
     """Creates a single joined mesh from all the shading surfaces 
     
     Adapted from Ladybug 'IncidentRadiation' Component
-
+    
+    Each Brep's meshes are cached by its geometry and the mesh parameters (see
+    context_mesh_cache()), so only new or changed Breps are meshed. These are
+    meshed in parallel, if set, and all the meshes are appended in a single join.
+    
     Arguments:
         _envelope_surfaces_punched: The building surfaces with holes 'punched'
             for each aperture
@@ -37,37 +113,155 @@ def create_shading_mesh(_envelope_surfaces_punched, additional_shading_surfaces_
             envelope / surround ones
         _window_surrounds: The window 'surround' surfaces (top/bottom/left/right)
         _mesh_params: (Rhino.Geometry.MeshParameters)
+        _parallel: (bool) Optional. Set True to mesh the Breps on multiple threads.
+        _cache: (LBT2PH.mesh_cache.MeshCache) Optional. Default is the one from
+            context_mesh_cache()
     Returns:
         shade_mesh: (Mesh) A 'joined' mesh of all the shading / context surfaces
             in a single mesh.
     """
     
-    shade_mesh = Rhino.Geometry.Mesh()
-    for srfc in _envelope_surfaces_punched or []:
-        if srfc:
-            new_mesh = Rhino.Geometry.Mesh.CreateFromBrep( srfc, _mesh_params )            
-            if new_mesh:
-                shade_mesh.Append( new_mesh )
-            else:
-                srfc_name = srfc.GetUserStrings().Get('display_name')
-                msg = 'Error: Something is wrong with surface: {}.\n'\
-                    'Cannot create a mesh properly for some reason.\n'\
-                    'Check that all your geometry is correct with no overlaps or voids\n'\
-                    'and check that the Honeybee surfaces are all being created correctly?\n'\
-                    'If that surface has windows hosted on it, be sure they are not overlapping\n'\
-                    'and that they are being generated correctly?'.format( srfc_name )
-                _ghenv.Component.AddRuntimeMessage( ghK.GH_RuntimeMessageLevel.Error, msg ) 
-    for srfc in additional_shading_surfaces_ or []:
-        if srfc:
-            shade_mesh.Append( Rhino.Geometry.Mesh.CreateFromBrep( srfc, _mesh_params ) )
+    if _cache is None:
+        _cache = context_mesh_cache()
+    
+    envelope = [srfc for srfc in _envelope_surfaces_punched or [] if srfc]
+    others = [srfc for srfc in additional_shading_surfaces_ or [] if srfc]
     for branch in _window_surrounds.Branches or []:
         if branch:
-            for srfc in branch:
-                if srfc:
-                    shade_mesh.Append( Rhino.Geometry.Mesh.CreateFromBrep( srfc, _mesh_params ) )
-
+            others.extend( srfc for srfc in branch if srfc )
+    breps = envelope + others
+    
+    params_key = mesh_params_key(_mesh_params)
+    keys = [LBT2PH.shading_cache.fingerprint(brep_fingerprint(brep), params_key) for brep in breps]
+    
+    def build(_brep):
+        return Rhino.Geometry.Mesh.CreateFromBrep( _brep, _mesh_params ) or None
+    
+    def parallel_map(_func, _breps):
+        return ghpythonlib.parallel.run(_func, _breps, False)
+    
+    meshes_by_brep = _cache.get_many(keys, breps, build, parallel_map if _parallel else None)
+    
+    all_meshes = List[Rhino.Geometry.Mesh]()
+    for i, (srfc, meshes) in enumerate(izip(breps, meshes_by_brep)):
+        if meshes:
+            all_meshes.AddRange( meshes )
+        elif i < len(envelope):
+            srfc_name = srfc.GetUserStrings().Get('display_name')
+            msg = 'Error: Something is wrong with surface: {}.\n'\
+                'Cannot create a mesh properly for some reason.\n'\
+                'Check that all your geometry is correct with no overlaps or voids\n'\
+                'and check that the Honeybee surfaces are all being created correctly?\n'\
+                'If that surface has windows hosted on it, be sure they are not overlapping\n'\
+                'and that they are being generated correctly?'.format( srfc_name )
+            _ghenv.Component.AddRuntimeMessage( ghK.GH_RuntimeMessageLevel.Error, msg ) 
+    
+    # A single join, rather than one Append per Brep
+    shade_mesh = Rhino.Geometry.Mesh()
+    shade_mesh.Append( all_meshes )
+    
     return shade_mesh
 
+def mesh_to_arrays(_rh_mesh):
+    """Converts a Rhino Mesh to flat vertex and triangle-face arrays
+    
+    Arguments:
+        _rh_mesh: (Rhino.Geometry.Mesh) The mesh to convert
+    Returns: (tuple)
+        vertices: (list: float) [x0, y0, z0, x1, y1, z1, ...]
+        faces: (list: int) [a0, b0, c0, a1, b1, c1, ...] Quads are split into two triangles.
+    """
+    
+    vertices = []
+    for v in _rh_mesh.Vertices:
+        vertices.extend( (v.X, v.Y, v.Z) )
+    
+    faces = []
+    for f in _rh_mesh.Faces:
+        faces.extend( (f.A, f.B, f.C) )
+        if f.IsQuad:
+            faces.extend( (f.A, f.C, f.D) )
+    
+    return vertices, faces
+
+def arrays_to_mesh(_vertices, _faces):
+    """Builds a Rhino Mesh from flat vertex and triangle-face arrays (see mesh_to_arrays)
+    
+    Only the vertices which the faces use are added (the faces are renumbered
+    to match), so a window's culled context doesn't copy the whole context's vertices.
+    """
+    
+    remap = {}
+    points = List[Rhino.Geometry.Point3d]()
+    faces = []
+    for i in _faces:
+        i = int(i)
+        j = remap.get(i)
+        if j is None:
+            j = remap[i] = points.Count
+            points.Add( Rhino.Geometry.Point3d(_vertices[3*i], _vertices[3*i+1], _vertices[3*i+2]) )
+        faces.append(j)
+    
+    mesh = Rhino.Geometry.Mesh()
+    mesh.Vertices.AddVertices(points)
+    for i in range(0, len(faces), 3):
+        mesh.Faces.AddFace(faces[i], faces[i+1], faces[i+2])
+    
+    return mesh
+
+def create_shading_context(_shade_mesh):
+    """Prepares the joined context shading mesh for per-window culling
+    
+    Arguments:
+        _shade_mesh: (Rhino.Geometry.Mesh) The context shading joined mesh
+    Returns:
+        context: (LBT2PH.occlusion.ShadingContext)
+    """
+    
+    vertices, faces = mesh_to_arrays(_shade_mesh)
+    return LBT2PH.occlusion.ShadingContext(vertices, faces)
+
+def window_shading_context(_context, _window_mesh, _search_radius=None, _solver='Rhino'):
+    """Gets the (lazily) culled context shading geometry for a single window
+    
+    Only the triangles in front of the window, above its lowest point and (optionally)
+    within the search radius are kept. The result can be passed to
+    generate_shaded_intersection_data() in place of the full shade mesh, and re-used for
+    each season so the culling and meshing is only done once per window.
+    
+    Arguments:
+        _context: (LBT2PH.occlusion.ShadingContext) From create_shading_context()
+        _window_mesh: (ladybug_geometry.geometry3d.Mesh3D) The window
+        _search_radius: (float) Optional. Ignore any shading geometry further away than this.
+        _solver: (str) 'Rhino' or 'BVH'. The ray intersection solver to build the mesh for.
+    Returns:
+        window_context: (LBT2PH.occlusion.WindowContext)
+    """
+    
+    if str(_solver).upper() == 'BVH':
+        builder = LBT2PH.occlusion.MeshBVH
+    else:
+        builder = arrays_to_mesh
+    
+    window_normal = _window_mesh.face_normals[0]
+    
+    return LBT2PH.occlusion.WindowContext(_context, _window_mesh.vertices,
+                window_normal, _search_radius, builder)
+
+def sky_matrix_cache():
+    """The SkyMatrixCache kept (in sc.sticky) for the whole Rhino session """
+    
+    cache = sc.sticky.get('LBT2PH_sky_matrix_cache')
+    if cache is None:
+        cache = LBT2PH.sky_matrix.SkyMatrixCache()
+        sc.sticky['LBT2PH_sky_matrix_cache'] = cache
+    return cache
+
+def _decode_sky_matrix(_sky_mtx):
+    mtx = de_objectify_output(_sky_mtx)
+    total_sky_rad = LBT2PH.sky_matrix.total_radiation(mtx[1], mtx[2])
+    return LBT2PH.sky_matrix.DecodedSky(float(mtx[0][0]), len(total_sky_rad), total_sky_rad)
+
 def deconstruct_sky_matrix(_sky_mtx):
     """Copied from Ladybug 'IncidentRadiation' Component
     
@@ -75,19 +269,64 @@ def deconstruct_sky_matrix(_sky_mtx):
         _sky_mtx: A Ladybug Sky Matrix for the season
     Returns: (tuple)
         sky_vecs: (list: _ )
-        total_sky_rad: (list: _ )
+        total_sky_rad: (list: float)
     """
     
-    mtx = de_objectify_output(_sky_mtx)
-    total_sky_rad = [dir_rad + dif_rad for dir_rad, dif_rad in izip(mtx[1], mtx[2])]
-    lb_vecs = view_sphere.tregenza_dome_vectors if len(total_sky_rad) == 145 \
-        else view_sphere.reinhart_dome_vectors
-    if mtx[0][0] != 0:  # there is a north input for sky; rotate vectors
-        north_angle = math.radians(mtx[0][0])
-        lb_vecs = [vec.rotate_xy(north_angle) for vec in lb_vecs]
-    sky_vecs = [from_vector3d(vec) for vec in lb_vecs]
+    sky_vecs, total_sky_rad, _ = decode_sky_matrix(_sky_mtx)
+    
+    return sky_vecs, list(total_sky_rad)
 
-    return sky_vecs, total_sky_rad
+def decode_sky_matrix(_sky_mtx, _cache=None):
+    """Same as deconstruct_sky_matrix(), but also returns the sky's dome_key
+    
+    The decoded radiation and the rotated dome vectors are cached (see
+    LBT2PH.sky_matrix) so that re-running with the same sky, or with another
+    sky on the same dome, skips the rebuild.
+    
+    Arguments:
+        _sky_mtx: A Ladybug Sky Matrix for the season
+        _cache: (SkyMatrixCache) Optional. Default is the one from sky_matrix_cache()
+    Returns: (tuple)
+        sky_vecs: (list: _ )
+        total_sky_rad: (array: float)
+        dome_key: (tuple) The (number of patches, north angle) of the sky. Two skies
+            with the same dome_key have identical patch vectors. See skies_share_geometry()
+    """
+    
+    if _cache is None:
+        _cache = sky_matrix_cache()
+    
+    sky = _cache.sky(_sky_mtx, _decode_sky_matrix)
+    
+    def base_vectors():
+        return view_sphere.tregenza_dome_vectors if sky.patch_count == 145 \
+            else view_sphere.reinhart_dome_vectors
+    
+    flat_vecs = _cache.dome_vectors(sky.patch_count, sky.north, base_vectors)
+    sky_vecs = [Rhino.Geometry.Vector3d(x, y, z) for x, y, z in LBT2PH.sky_matrix.iter_xyz(flat_vecs)]
+    dome_key = LBT2PH.sky_matrix.dome_key(sky.patch_count, sky.north)
+    
+    return sky_vecs, sky.total_sky_rad, dome_key
+
+def skies_share_geometry(_dome_key_a, _dome_key_b, _tolerance=1e-6):
+    """True if two skies use the same dome (Tregenza / Reinhart) and north angle
+    
+    When they do, the ray intersection matrix for a window is identical for both
+    skies and only needs to be computed once. Only the radiation weights differ.
+    
+    Arguments:
+        _dome_key_a: (tuple) The 'dome_key' from decode_sky_matrix()
+        _dome_key_b: (tuple) The 'dome_key' from decode_sky_matrix()
+    Returns:
+        (bool)
+    """
+    
+    patches_a, north_a = _dome_key_a
+    patches_b, north_b = _dome_key_b
+    if patches_a != patches_b:
+        return False
+    
+    return abs(((north_a - north_b) + 180.0) % 360.0 - 180.0) < _tolerance
 
 def build_window_meshes(_window_surface, _grid_size, _mesh_params ):
     """Create the Ladybug Mesh3D grided mesh for the window being analysed
@@ -102,14 +341,10 @@ def build_window_meshes(_window_surface, _grid_size, _mesh_params ):
         window_mesh: (ladybug_geometry.geometry3d.Mesh3D) The window
         window_back_mesh: (ladybug_geometry.geometry3d.Mesh3D) A copy of the window shifted 'back'
         just a little bit (0.1 units). Used when solving the 'unshaded' situation.
+        window_rh_mesh: (Rhino.Geometry.Mesh) The window, as a Rhino mesh
     """
     
-    # create the gridded mesh for the window surface
-    #---------------------------------------------------------------------------
-    offset_dist = 0.001
-    window_mesh = to_joined_gridded_mesh3d([_window_surface], _grid_size, offset_dist)
-    window_rh_mesh = from_mesh3d(window_mesh)
-    points = [from_point3d(pt) for pt in window_mesh.face_centroids]
+    points, normals, window_mesh, window_rh_mesh = build_window_analysis_meshes(_window_surface, _grid_size)
     
     # Create a 'back' for the window
     #---------------------------------------------------------------------------
@@ -125,9 +360,33 @@ def build_window_meshes(_window_surface, _grid_size, _mesh_params ):
         window_back.Translate(window_normal)
         window_back_mesh = Rhino.Geometry.Mesh.CreateFromBrep(window_back, _mesh_params)[0]
     
+    return points, normals, window_mesh, window_back_mesh, window_rh_mesh
+
+def build_window_analysis_meshes(_window_surface, _grid_size):
+    """Same as build_window_meshes(), without the 'back' mesh
+    
+    The 'unshaded' radiation does not need any ray-casting (see
+    calc_win_radiation_unshaded), so the window's 'back' mesh is not needed.
+    
+    Arguments:
+        _window_surface: (Brep) A single window Brep from the scene
+        _grid_size: (float)
+    Returns: (tuple)
+        points: (list: Ladybug Point3D) All the analysis points on the window
+        normals: (list: Ladybug Normal) All the normals for the analysis points
+        window_mesh: (ladybug_geometry.geometry3d.Mesh3D) The window
+        window_rh_mesh: (Rhino.Geometry.Mesh) The window, as a Rhino mesh
+    """
+    
+    # create the gridded mesh for the window surface
+    #---------------------------------------------------------------------------
+    offset_dist = 0.001
+    window_mesh = to_joined_gridded_mesh3d([_window_surface], _grid_size, offset_dist)
+    window_rh_mesh = from_mesh3d(window_mesh)
+    points = [from_point3d(pt) for pt in window_mesh.face_centroids]
     normals = [from_vector3d(vec) for vec in window_mesh.face_normals]
 
-    return points, normals, window_mesh, window_back_mesh, window_rh_mesh
+    return points, normals, window_mesh, window_rh_mesh
 
 def generate_intersection_data(_shade_mesh, _win_mesh_back, _points, _sky_vecs, _normals, _parallel):
     """Creates all the Intersection Matrix data for both the Shaded and the UNShaded conditions
@@ -152,15 +411,188 @@ def generate_intersection_data(_shade_mesh, _win_mesh_back, _points, _sky_vecs,
         angles_u: UN-Shaded
     """
 
+    int_matrix_init_shaded, angles_s = generate_shaded_intersection_data(
+        _shade_mesh, _points, _sky_vecs, _normals, _parallel)
+
+    int_matrix_init_unshaded, angles_u = intersect_mesh_rays(
+        _win_mesh_back, _points, _sky_vecs, _normals, parallel=_parallel)
+
+    return int_matrix_init_shaded, int_matrix_init_unshaded, angles_s, angles_u
+
+def generate_shaded_intersection_data(_shade_mesh, _points, _sky_vecs, _normals, _parallel):
+    """Creates the Intersection Matrix data for the Shaded condition only
+
+    The 'Unshaded' condition does not need any ray-casting, see calc_win_radiation_unshaded()
+    
+    Adapted from Ladybug 'IncidentRadiation' Component
+    
+    Arguments:
+        _shade_mesh: (Mesh | LBT2PH.occlusion.WindowContext) The context shading joined mesh,
+            or the culled context for the window (see window_shading_context). If the
+            context was built for the 'BVH' solver, the rays are intersected without Rhino.
+        _points: (_)     
+        _sky_vecs: (_)
+        _normals: (list: Ladybug Normals)
+        _parallel: (bool)
+    Returns: (tuple)
+        int_matrix_init_shaded: Intersection Matrix for window WITH shading
+        angles_s: Shaded
+    """
+
     # intersect the rays with the mesh
     #---------------------------------------------------------------------------
+    if isinstance(_shade_mesh, LBT2PH.occlusion.WindowContext):
+        _shade_mesh = _shade_mesh.mesh
+    
+    if isinstance(_shade_mesh, LBT2PH.occlusion.MeshBVH):
+        return LBT2PH.occlusion.intersect_mesh_rays(_shade_mesh, _points, _sky_vecs, _normals)
+
     int_matrix_init_shaded, angles_s = intersect_mesh_rays(
         _shade_mesh, _points, _sky_vecs, _normals, parallel=_parallel)
 
-    int_matrix_init_unshaded, angles_u = intersect_mesh_rays(
-        _win_mesh_back, _points, _sky_vecs, _normals, parallel=_parallel)
+    return int_matrix_init_shaded, angles_s
 
-    return int_matrix_init_shaded, int_matrix_init_unshaded, angles_s, angles_u
+def batch_shading_mesh(_context, _shade_mesh, _solver='Rhino'):
+    """Gets the full (un-culled) shading geometry to ray-cast all the windows against at once
+    
+    Arguments:
+        _context: (LBT2PH.occlusion.ShadingContext) From create_shading_context()
+        _shade_mesh: (Rhino.Geometry.Mesh) The context shading joined mesh
+        _solver: (str) 'Rhino' or 'BVH'. The ray intersection solver to use.
+    Returns:
+        (Rhino.Geometry.Mesh | LBT2PH.occlusion.MeshBVH)
+    """
+    
+    if str(_solver).upper() == 'BVH':
+        return LBT2PH.occlusion.MeshBVH(_context.vertices, _context.faces)
+    
+    return _shade_mesh
+
+def generate_intersection_data_batched(_shade_mesh, _points_by_window, _sky_vecs, _normals_by_window, _parallel):
+    """Same as generate_shaded_intersection_data() but for many windows in a single call
+    
+    The points and normals of all the windows are joined together and intersected
+    in one call, so the setup (and parallel fan-out) cost is only paid once rather
+    than once per window. The resulting matrix is then split back up by window.
+    
+    Arguments:
+        _shade_mesh: (Mesh | LBT2PH.occlusion.MeshBVH) The full shading geometry, 
+            from batch_shading_mesh()
+        _points_by_window: (list: list) The analysis points for each window
+        _sky_vecs: (_)
+        _normals_by_window: (list: list) The analysis point normals for each window
+        _parallel: (bool)
+    Returns:
+        (list: tuple) An (int_matrix, angles) tuple for each window, in input order
+    """
+    
+    points, normals, ranges = [], [], []
+    for window_points, window_normals in izip(_points_by_window, _normals_by_window):
+        start = len(points)
+        points.extend(window_points)
+        normals.extend(window_normals)
+        ranges.append( (start, len(points)) )
+    
+    if not points:
+        return [([], []) for _ in ranges]
+    
+    int_matrix, angles = generate_shaded_intersection_data(_shade_mesh, points, _sky_vecs, normals, _parallel)
+    
+    return [(int_matrix[start:end], angles[start:end]) for start, end in ranges]
+
+def adaptive_window_radiation(_window_surface, _window_context, _skies, _shared_dome,
+                              _grid_size, _tolerance, _parallel, _max_depth=4):
+    """Solves a window's radiation on an adaptive grid, refined where the shading changes
+    
+    Starts with a coarse grid (_grid_size) and splits the cells where the shading
+    factor differs between neighbouring cells, until the estimated error of the
+    window's seasonal shading factor is under the tolerance. See LBT2PH.adaptive_grid
+    
+    Each refinement pass ray-casts all of its new points in a single call.
+    
+    Arguments:
+        _window_surface: (Brep) A single window Brep from the scene
+        _window_context: (LBT2PH.occlusion.WindowContext) The culled shading for the window
+        _skies: (list: tuple) The (sky_vecs, total_sky_rad) for each sky (winter, summer)
+        _shared_dome: (bool) True if the skies share the same patch vectors. See skies_share_geometry()
+        _grid_size: (float) The starting (coarsest) cell size
+        _tolerance: (float) Target error of each season's shading factor (0-1). ie: 0.02
+        _parallel: (bool)
+        _max_depth: (int) The max number of times a starting cell can be split
+    Returns: (tuple)
+        window_mesh: (ladybug_geometry.geometry3d.Mesh3D) The final, refined window mesh
+        window_rh_mesh: (Rhino.Geometry.Mesh) The window, as a Rhino mesh
+        results: (dict) The (results_kWh, window_face_areas, average_window_kWh) for
+            'winter_shaded', 'summer_shaded', 'winter_unshaded' and 'summer_unshaded'
+        point_count: (int) The total number of analysis points ray-cast
+        error: (float) The estimated error of the shading factors
+    """
+    
+    faces = to_face3d(_window_surface)
+    normal = faces[0].normal
+    grid = LBT2PH.adaptive_grid.AdaptiveGrid([f.boundary for f in faces], normal, _grid_size, 0.001)
+    
+    # With no shading, the radiation (kWh/m2) is the same everywhere on a flat window
+    unshaded = []
+    for sky_vecs, total_sky_rad in _skies:
+        cos_matrix = LBT2PH.radiation.unshaded_matrix([normal], sky_vecs)
+        unshaded.append( LBT2PH.radiation.matrix_vector(cos_matrix, total_sky_rad)[0] )
+    
+    rh_normal = from_vector3d(normal)
+    def shading_factors(_points):
+        rh_points = [Rhino.Geometry.Point3d(*pt) for pt in _points]
+        rh_normals = [rh_normal] * len(rh_points)
+        
+        point_rads = []
+        if _shared_dome:
+            int_matrix, angles = generate_shaded_intersection_data(_window_context, rh_points, _skies[0][0], rh_normals, _parallel)
+            rel_matrix = LBT2PH.radiation.relative_matrix(int_matrix, angles)
+            point_rads = LBT2PH.radiation.matrix_matrix(rel_matrix, [rad for _, rad in _skies])
+        else:
+            for sky_vecs, total_sky_rad in _skies:
+                int_matrix, angles = generate_shaded_intersection_data(_window_context, rh_points, sky_vecs, rh_normals, _parallel)
+                rel_matrix = LBT2PH.radiation.relative_matrix(int_matrix, angles)
+                point_rads.append( LBT2PH.radiation.matrix_vector(rel_matrix, total_sky_rad) )
+        
+        return [tuple(rad / u if u else 1.0 for rad, u in izip(rads, unshaded)) for rads in izip(*point_rads)]
+    
+    result = grid.refine(shading_factors, _tolerance, _max_depth)
+    
+    # Build the mesh. Cells clipped to a non-rectangular window are split into triangles.
+    vertices, mesh_faces, face_factors = [], [], []
+    for cell, factors in izip(result.cells, result.values):
+        for piece in grid.cell_polygons_3d(cell):
+            start = len(vertices)
+            vertices.extend( Point3D(*pt) for pt in piece )
+            if len(piece) <= 4:
+                mesh_faces.append( tuple(range(start, start + len(piece))) )
+                face_factors.append( factors )
+            else:
+                for k in range(1, len(piece) - 1):
+                    mesh_faces.append( (start, start + k, start + k + 1) )
+                    face_factors.append( factors )
+    
+    window_mesh = Mesh3D(vertices, mesh_faces)
+    window_rh_mesh = from_mesh3d(window_mesh)
+    face_areas = [float(a) for a in window_mesh.face_areas]
+    total_area = sum(face_areas)
+    
+    results = {}
+    for k, season in enumerate(('winter', 'summer')):
+        face_kWh = [f[k] * unshaded[k] * area for f, area in izip(face_factors, face_areas)]
+        results[season + '_shaded'] = (face_kWh, face_areas, sum(face_kWh) / total_area if total_area else 0.0)
+        results[season + '_unshaded'] = ([unshaded[k] * area for area in face_areas], face_areas, unshaded[k])
+    
+    results['adaptive'] = {'vertices': [(v.x, v.y, v.z) for v in vertices], 'faces': mesh_faces,
+                           'point_count': result.point_count, 'error': result.error}
+    
+    return window_mesh, window_rh_mesh, results, result.point_count, result.error
+
+def adaptive_mesh_from_cache(_adaptive):
+    """Rebuilds the (Mesh3D, Rhino Mesh) from the cached 'adaptive' results data """
+    
+    window_mesh = Mesh3D([Point3D(*v) for v in _adaptive['vertices']], [tuple(f) for f in _adaptive['faces']])
+    return window_mesh, from_mesh3d(window_mesh)
 
 def calc_win_radiation(_int_matrix_init, _angles, _total_sky_rad, _window_mesh):
     """Computes total kWh per window based on the int_matrix and sky vec angles 
@@ -171,27 +603,214 @@ def calc_win_radiation(_int_matrix_init, _angles, _total_sky_rad, _window_mesh):
         _total_sky_rad: (_)
         _window_mesh: (ladybug_geometry.geometry3d.Mesh3D)
     Returns: (tuple)
+        results_kWh: (list: float) The total kWh for each face of the window mesh
+        window_face_areas: (list: float) The area of each face of the window mesh
+    """
+    
+    results_kWh, window_face_areas, _ = calc_win_radiation_shaded(_int_matrix_init, _angles,
+                                            _total_sky_rad, _window_mesh)
+    
+    return results_kWh, window_face_areas
+
+def calc_win_radiation_shaded(_int_matrix_init, _angles, _total_sky_rad, _window_mesh):
+    """Same as calc_win_radiation(), but also returns the window's average kWh
+    
+    The intersection values and cos(angles) are packed into a single dense matrix
+    and the per-point radiation is found with one matrix-vector product. See
+    LBT2PH.radiation for the NumPy / IronPython implementations.
+
+    Arguments:
+        _int_matrix_init: (_)
+        _angles: (_)
+        _total_sky_rad: (_)
+        _window_mesh: (ladybug_geometry.geometry3d.Mesh3D)
+    Returns: (tuple)
+        results_kWh: (list: float) The total kWh for each face of the window mesh
+        window_face_areas: (list: float) The area of each face of the window mesh
         average_window_kWh: (float) The area-weighted average total kWh radiation
         for the window over the analysis period specified.
     """
     
-    results_kWh = []
-    window_face_areas = []
-    int_matrix = []
+    rel_matrix = LBT2PH.radiation.relative_matrix(_int_matrix_init, _angles)
+    result = LBT2PH.radiation.window_radiation(rel_matrix, _total_sky_rad, _window_mesh.face_areas)
     
-    count = (k for k in range(len(_angles)*2 )) # just a super large counter
+    return result.face_kWh, result.face_areas, result.average_kWh
+
+def calc_win_radiation_unshaded(_sky_vecs, _total_sky_rad, _window_mesh):
+    """Computes the kWh per window with NO shading at all, without any ray-casting
     
-    for c, int_vals, angs in izip(count, _int_matrix_init, _angles):
-        pt_rel = (ival * math.cos(ang) for ival, ang in izip(int_vals, angs))
-        rad_result = sum(r * w for r, w in izip(pt_rel, _total_sky_rad))
-        
-        int_matrix.append(pt_rel)
-        results_kWh.append( rad_result * _window_mesh.face_areas[c] )
-        window_face_areas.append( _window_mesh.face_areas[c] )
+    A sky patch is 'seen' by an analysis point if it is in front of the point's
+    normal, weighted by the cosine of the angle between them. This gives the same
+    result as ray-casting against a surface which can never shade the window.
     
-    return results_kWh, window_face_areas
+    Arguments:
+        _sky_vecs: (list) The sky patch vectors
+        _total_sky_rad: (_)
+        _window_mesh: (ladybug_geometry.geometry3d.Mesh3D)
+    Returns: (tuple)
+        results_kWh: (list: float) The total kWh for each face of the window mesh
+        window_face_areas: (list: float) The area of each face of the window mesh
+        average_window_kWh: (float) The area-weighted average total kWh radiation
+    """
+    
+    cos_matrix = LBT2PH.radiation.unshaded_matrix(_window_mesh.face_normals, _sky_vecs)
+    result = LBT2PH.radiation.window_radiation(cos_matrix, _total_sky_rad, _window_mesh.face_areas)
+    
+    return result.face_kWh, result.face_areas, result.average_kWh
+
+def calc_win_radiation_multi(_int_matrix_init, _angles, _sky_rads, _window_mesh):
+    """Same as calc_win_radiation_shaded() but for several skies which share one int_matrix
+    
+    Only valid when the skies share the same patch geometry, see skies_share_geometry()
+    
+    Arguments:
+        _int_matrix_init: (_)
+        _angles: (_)
+        _sky_rads: (list: list) The 'total_sky_rad' for each of the skies
+        _window_mesh: (ladybug_geometry.geometry3d.Mesh3D)
+    Returns:
+        (list: tuple) A (results_kWh, window_face_areas, average_window_kWh) tuple
+        for each sky, in the same order as the _sky_rads input.
+    """
+    
+    rel_matrix = LBT2PH.radiation.relative_matrix(_int_matrix_init, _angles)
+    results = LBT2PH.radiation.window_radiation_multi(rel_matrix, _sky_rads, _window_mesh.face_areas)
+    
+    return [(r.face_kWh, r.face_areas, r.average_kWh) for r in results]
 
 
+# Visibility / Analysis Periods
+#-------------------------------------------------------------------------------
+def window_visibility(_int_matrix_init, _window_mesh, _dome_key):
+    """Stores which sky patches each of the window's analysis points can see
+    
+    Arguments:
+        _int_matrix_init: (_) The intersection matrix from generate_shaded_intersection_data()
+        _window_mesh: (ladybug_geometry.geometry3d.Mesh3D)
+        _dome_key: (tuple) The dome_key of the sky the rays were cast to
+    Returns:
+        visibility: (LBT2PH.visibility.VisibilityMatrix)
+    """
+    
+    normals = [(v.x, v.y, v.z) for v in _window_mesh.face_normals]
+    return LBT2PH.visibility.VisibilityMatrix.from_int_matrix(_int_matrix_init,
+                normals, _window_mesh.face_areas, _dome_key)
+
+def decode_period_skies(_sky_mtxs):
+    """Deconstructs the sky matrix for each analysis period (ie: one per month)
+    
+    Returns:
+        (list: tuple) The (sky_vecs, total_sky_rad, dome_key) for each sky, in order
+    """
+    
+    return [decode_sky_matrix(sky_mtx) for sky_mtx in _sky_mtxs]
+
+def period_shading_factors(_visibility, _period_skies):
+    """The window's shading factor for each analysis period, without any new ray-casting
+    
+    Arguments:
+        _visibility: (LBT2PH.visibility.VisibilityMatrix) The window's stored visibility
+        _period_skies: (list: tuple) From decode_period_skies()
+    Returns:
+        (list: float) The shading factor for each sky, in order. None for any sky
+        which is not on the same dome (patches and north) the rays were cast to.
+    """
+    
+    factors = [None] * len(_period_skies)
+    matching = [i for i, (_, _, dome_key) in enumerate(_period_skies)
+                if skies_share_geometry(dome_key, _visibility.dome_key)]
+    if not matching:
+        return factors
+    
+    sky_vecs = _period_skies[matching[0]][0]
+    sky_rads = [_period_skies[i][1] for i in matching]
+    for i, factor in izip(matching, _visibility.shading_factors(sky_vecs, sky_rads)):
+        factors[i] = factor
+    
+    return factors
+
+# Results Cache
+#-------------------------------------------------------------------------------
+def open_results_cache(_folder=None, _clear=False):
+    """Opens (or creates) the on-disk cache of per-window radiation results
+    
+    Arguments:
+        _folder: (str) Optional. The folder to store the cache in. Default is
+            an 'LBT2PH/shading_cache' folder in the system's temp folder.
+        _clear: (bool) Optional. If True, all the existing cached results are deleted.
+    Returns:
+        cache: (LBT2PH.shading_cache.ShadingCache)
+    """
+    
+    if not _folder:
+        _folder = os.path.join(tempfile.gettempdir(), 'LBT2PH', 'shading_cache')
+    
+    cache = LBT2PH.shading_cache.ShadingCache(_folder)
+    if _clear:
+        cache.invalidate()
+    
+    return cache
+
+def window_cache_key(_window_mesh, _window_context, _grid_size, _sky_keys, _solver, _options=None,
+                     _fingerprints=None):
+    """Builds the cache key for a single window's results
+    
+    The key changes if anything which could change the window's results changes:
+    the window mesh, the (culled) shading geometry near the window, the grid size,
+    the skies or the solver. Changes to shading geometry which was culled away
+    for this window do not change its key.
+    
+    Arguments:
+        _window_mesh: (ladybug_geometry.geometry3d.Mesh3D) The window
+        _window_context: (LBT2PH.occlusion.WindowContext) The culled shading for the window
+        _grid_size: (float)
+        _sky_keys: (list) For each sky: the (dome_key, total_sky_rad) 
+        _solver: (str) 'Rhino' or 'BVH'
+        _options: Optional. Any other settings which change the results (ie: the
+            adaptive grid tolerance). Must be numbers / strings / lists of them.
+        _fingerprints: (LBT2PH.shading_cache.ContextFingerprints) Optional. Made once
+            from the full context and shared by all the windows, so that each context
+            triangle is only prepared once per run.
+    Returns:
+        key: (str)
+    """
+    
+    if _fingerprints is None:
+        _fingerprints = LBT2PH.shading_cache.ContextFingerprints(_window_context.context.vertices)
+    
+    window_geom = ([(v.x, v.y, v.z) for v in _window_mesh.vertices], _window_mesh.faces)
+    context_geom = _fingerprints.fingerprint(_window_context.faces)
+    
+    return LBT2PH.shading_cache.fingerprint(window_geom, context_geom, float(_grid_size),
+                        _sky_keys, str(_solver).upper(), _options)
+
+def results_to_cache(_results):
+    """(dict) of (results_kWh, window_face_areas, average_window_kWh) tuples to a JSON-able dict 
+    
+    Any dict values (ie: the 'adaptive' grid data) are stored as-is.
+    """
+    
+    cache = {}
+    for k, v in _results.items():
+        if isinstance(v, dict):
+            cache[k] = v
+        else:
+            cache[k] = [list(v[0]), list(v[1]), v[2]]
+    
+    return cache
+
+def results_from_cache(_cached):
+    """Inverse of results_to_cache() """
+    
+    results = {}
+    for k, v in _cached.items():
+        if isinstance(v, dict):
+            results[k] = v
+        else:
+            results[k] = (v[0], v[1], v[2])
+    
+    return results
+
 # Graphics / Mesh
 #-------------------------------------------------------------------------------
 def create_graphic_container(_season, _data, _study_mesh, _legend_par):
@@ -201,7 +820,7 @@ def create_graphic_container(_season, _data, _study_mesh, _legend_par):
     
     Arguments:
         _season: (str) 'Winter' or 'Summer'. Used in the title.
-        _data: (list: float:) A list of the result data to use to color / style the output
+        _data: (list: float:) The result data to use to color / style the output
         _study_mesh: (ladybug_geometry.geometry3d.Mesh3D) The joined Mesh used in the analysis
         _legend_par: Ladybug Legend Parameters
     Returns: (tuple)
@@ -209,16 +828,101 @@ def create_graphic_container(_season, _data, _study_mesh, _legend_par):
         title: The text title
     """
 
+    if not isinstance(_data, (list, tuple)):
+        _data = list(_data)     # ie: an array('d') read back from a stream file
+    
     graphic = GraphicContainer(_data, _study_mesh.min, _study_mesh.max, _legend_par)
     graphic.legend_parameters.title = 'kWh'
     
-    title = text_objects(
-        '{} Incident Radiation'.format(_season), graphic.lower_title_location,
-        graphic.legend_parameters.text_height * 1.5,
-        graphic.legend_parameters.font)
+    title = graphic_title(_season, graphic)
 
     return graphic, title
 
+def graphic_title(_season, _graphic):
+    """The 'Winter / Summer Incident Radiation' title text for a Ladybug Graphic Object """
+    
+    return text_objects(
+        '{} Incident Radiation'.format(_season), _graphic.lower_title_location,
+        _graphic.legend_parameters.text_height * 1.5,
+        _graphic.legend_parameters.font)
+
+def streamed_legend_parameters(_legend_par, _range):
+    """Legend Parameters with the min / max found while streaming the results to disk
+    
+    So the legend does not need to scan all the values again. Any min / max already
+    set on the _legend_par by the user are kept.
+    
+    Arguments:
+        _legend_par: Ladybug Legend Parameters, or None
+        _range: (LBT2PH.radiation_stream.RunningRange) The range of the values
+    Returns:
+        legend_par: (ladybug.legend.LegendParameters)
+    """
+    
+    legend_par = _legend_par.duplicate() if _legend_par else LegendParameters()
+    if legend_par.min is None:
+        legend_par.min = _range.min
+    if legend_par.max is None:
+        legend_par.max = _range.max
+    
+    return legend_par
+
+def streamed_radiation_mesh(_season, _path, _column, _lb_meshes, _legend_par, _range):
+    """The coloured window mesh, legend and title, read from a stream file a window at a time
+    
+    The values are never all held in memory: each window's rows are read from the
+    file, turned into colours and added to the Rhino mesh, then dropped.
+    
+    Arguments:
+        _season: (str) 'Winter' or 'Summer'. Used in the title.
+        _path: (str) The CSV file written by a LBT2PH.radiation_stream.RadiationWriter
+        _column: (str) The value column to colour the mesh by
+        _lb_meshes: (list: Mesh3D) Each window's analysis mesh, in the same order as
+            the windows were written to the file
+        _legend_par: Ladybug Legend Parameters, or None
+        _range: (LBT2PH.radiation_stream.RunningRange) The range of the column's values,
+            found while writing the file
+    Returns: (tuple)
+        mesh: (Rhino.Geometry.Mesh) The coloured mesh of all the windows
+        legend: (_)
+        title: The text title
+    """
+    
+    pts = [pt for lb_mesh in _lb_meshes for pt in (lb_mesh.min, lb_mesh.max)]
+    min_pt = Point3D(min(p.x for p in pts), min(p.y for p in pts), min(p.z for p in pts)) if pts else Point3D()
+    max_pt = Point3D(max(p.x for p in pts), max(p.y for p in pts), max(p.z for p in pts)) if pts else Point3D()
+    
+    # The legend only needs the range, not the values themselves
+    legend_range = [val for val in (_range.min, _range.max) if val is not None] or [0.0]
+    legend_par = streamed_legend_parameters(_legend_par, _range)
+    graphic = GraphicContainer(legend_range, min_pt, max_pt, legend_par)
+    graphic.legend_parameters.title = 'kWh'
+    color_range = graphic.legend.color_range
+    
+    rh_mesh = Rhino.Geometry.Mesh()
+    values = LBT2PH.radiation_stream.iter_column(_path, _column)
+    for lb_mesh in _lb_meshes:
+        # Each face gets its own vertices, so it can be a single colour
+        verts = lb_mesh.vertices
+        start = rh_mesh.Vertices.Count
+        face_pts = List[Rhino.Geometry.Point3d]()
+        colors = []
+        faces = []
+        for face, value in izip(lb_mesh.faces, values):
+            color = color_to_color( color_range.color(value) )
+            first = start + face_pts.Count
+            for i in face:
+                face_pts.Add( Rhino.Geometry.Point3d(verts[i].x, verts[i].y, verts[i].z) )
+                colors.append( color )
+            faces.append( [first + k for k in range(len(face))] )
+        
+        rh_mesh.Vertices.AddVertices(face_pts)
+        rh_mesh.VertexColors.AppendColors(Array[Color](colors))
+        for face in faces:
+            rh_mesh.Faces.AddFace(*face)
+    
+    return rh_mesh, legend_objects(graphic.legend), graphic_title(_season, graphic)
+
 def create_window_mesh( _lb_meshes ):
     return Mesh3D.join_meshes( _lb_meshes )
 
@@ -0,0 +1,136 @@
+"""Decoded Ladybug sky matrices (patch vectors and radiation), kept between runs.
+
+The rotated dome patch vectors are kept by (number of patches, north angle) and
+each sky's summed direct + diffuse patch radiation by the sky matrix object, both
+as flat array('d').
+"""
+
+import math
+from array import array
+from collections import OrderedDict, namedtuple
+
+try:
+    from itertools import izip
+except ImportError:  # Python 3
+    izip = zip
+
+from LBT2PH.vectors import xyz
+
+DecodedSky = namedtuple('DecodedSky', ['north', 'patch_count', 'total_sky_rad'])
+
+PRECISION = 6
+
+
+def dome_key(_patch_count, _north):
+    """The (number of patches, north angle) key for a sky's dome. North is in degrees, 0 to 360 """
+
+    return (int(_patch_count), round(float(_north) % 360.0, PRECISION) % 360.0)
+
+
+def total_radiation(_direct, _diffuse):
+    """The total (direct + diffuse) radiation for each sky patch, as an array('d') """
+
+    return array('d', [float(dir_rad) + float(dif_rad) for dir_rad, dif_rad in izip(_direct, _diffuse)])
+
+
+def rotate_xy(_vectors, _north):
+    """Rotates the vectors counterclockwise, in the XY plane, by the north angle
+
+    Arguments:
+        _vectors: (list) The vectors (tuples, or Ladybug / Rhino vectors)
+        _north: (float) The angle, in degrees
+    Returns:
+        (array) The rotated vectors, flat: [x0, y0, z0, x1, ...]
+    """
+
+    angle = math.radians(float(_north))
+    cos, sin = math.cos(angle), math.sin(angle)
+
+    flat = array('d')
+    for vec in _vectors:
+        x, y, z = xyz(vec)
+        if angle:
+            x, y = x * cos - y * sin, x * sin + y * cos
+        flat.extend((x, y, z))
+    return flat
+
+
+def iter_xyz(_flat):
+    """Yields an (x, y, z) tuple for each vector in the flat array """
+
+    for i in range(0, len(_flat), 3):
+        yield (_flat[i], _flat[i + 1], _flat[i + 2])
+
+
+class SkyMatrixCache(object):
+    """Decoded sky matrices and rotated dome vectors, re-used from run to run
+
+    The skies are looked up by identity: Grasshopper passes the same sky matrix
+    object along until something upstream changes it. The object is held on to
+    while it is cached, so its id() cannot be re-used by some other sky.
+
+    Arguments:
+        _max_skies: (int) Optional. The most sky matrices to keep. The least
+            recently used ones are dropped first.
+    """
+
+    def __init__(self, _max_skies=16):
+        self.max_skies = _max_skies
+        self.hits = 0
+        self.misses = 0
+        self._domes = {}
+        self._skies = OrderedDict()
+
+    def dome_vectors(self, _patch_count, _north, _base_vectors):
+        """The dome's patch vectors, rotated for north
+
+        Arguments:
+            _patch_count: (int) The number of sky patches (145=Tregenza, 577=Reinhart, ...)
+            _north: (float) The north angle, in degrees
+            _base_vectors: (callable) Returns the un-rotated patch vectors. Only
+                called if the dome is not already cached.
+        Returns:
+            (array) The rotated vectors, flat: [x0, y0, z0, x1, ...]
+        """
+
+        key = dome_key(_patch_count, _north)
+        flat = self._domes.get(key)
+        if flat is None:
+            self.misses += 1
+            flat = rotate_xy(_base_vectors(), key[1])
+            self._domes[key] = flat
+        else:
+            self.hits += 1
+        return flat
+
+    def sky(self, _sky_mtx, _decode):
+        """The decoded sky matrix
+
+        Arguments:
+            _sky_mtx: The sky matrix object
+            _decode: (callable) Takes the _sky_mtx and returns its DecodedSky. Only
+                called if the sky is not already cached.
+        Returns:
+            (DecodedSky)
+        """
+
+        key = id(_sky_mtx)
+        entry = self._skies.pop(key, None)
+        if entry is None or entry[0] is not _sky_mtx:
+            self.misses += 1
+            entry = (_sky_mtx, _decode(_sky_mtx))
+        else:
+            self.hits += 1
+
+        self._skies[key] = entry
+        while len(self._skies) > self.max_skies:
+            self._skies.popitem(last=False)
+
+        return entry[1]
+
+    def clear(self):
+        self._domes.clear()
+        self._skies.clear()
+
+    def __repr__(self):
+        return "{}(_max_skies={!r})".format(self.__class__.__name__, self.max_skies)
@@ -14,9 +14,13 @@ except ImportError as e:
 
 import LBT2PH
 import LBT2PH.ventilation
+import LBT2PH.spatial
+import LBT2PH.tfa_groups
 
 reload(LBT2PH)
 reload(LBT2PH.ventilation)
+reload(LBT2PH.spatial)
+reload(LBT2PH.tfa_groups)
 
 class TFA_Surface(Object):
     ''' Represents an individual TFA Surface floor element '''
@@ -849,26 +853,61 @@ def get_tfa_surface_data_from_Rhino(_guid):
 
     return (geom, params)
 
-def find_tfa_host_room(_tfa_srfc_geom, _hb_rooms):
-    """Evaluates the Centoid of a TFA srf to see if it is inside an HB-Room """
+def _hb_room_bounding_box(_hb_room):
+    """The HB-Room's World-axis bounding box as (mins, maxs), or None """
     
-    srfc_centroid_a = Rhino.Geometry.AreaMassProperties.Compute(_tfa_srfc_geom).Centroid
+    try:
+        mins, maxs = _hb_room.geometry.min, _hb_room.geometry.max
+    except AttributeError:
+        return None
+    
+    return (mins.x, mins.y, mins.z), (maxs.x, maxs.y, maxs.z)
+
+def find_tfa_host_rooms(_tfa_srfc_geoms, _hb_rooms, _tolerance=0.001):
+    """Finds the HB-Room each of the TFA surfaces is in, by testing their centroids
+    
+    The rooms' bounding boxes are worked out (and indexed) once. Each centroid is
+    then only tested against the few rooms whose box it is in, in the order the
+    rooms were input, so the first matching room still wins.
+    
+    Args:
+        _tfa_srfc_geoms (list: Brep): The TFA surfaces
+        _hb_rooms (list: Room): The Honeybee Rooms
+        _tolerance (float): Boxes are grown by this much
+    Returns:
+        (list: tuple): For each TFA surface, in order: (centroid, host room name). The
+            host room name is None if it isn't inside any room.
+    """
+    
+    hb_rooms = list(_hb_rooms)
+    room_index = LBT2PH.spatial.BoxTree( [_hb_room_bounding_box(room) for room in hb_rooms] )
     
     # Note: move the centroid 'up' just a tiny bit, otherwise 'is_point_inside'
     # test will return False. Must not work if point is 'on' a surface...
     move_distance = 0.01
-    srfc_centroid_b = Rhino.Geometry.Point3d(srfc_centroid_a.X, srfc_centroid_a.Y, srfc_centroid_a.Z + move_distance)
-
-    # Also, to use 'is_point_inside' need to convert the Point to a Ladybug Point3D
-    srfc_centroid_c = Point3D(srfc_centroid_b.X, srfc_centroid_b.Y, srfc_centroid_b.Z)
-
-    host_room = None
-    for room in _hb_rooms:
-        if room.geometry.is_point_inside( srfc_centroid_c ):
-            host_room = room.display_name
-            break
+    
+    results = []
+    for tfa_srfc_geom in _tfa_srfc_geoms:
+        srfc_centroid_a = Rhino.Geometry.AreaMassProperties.Compute(tfa_srfc_geom).Centroid
+        
+        # Also, to use 'is_point_inside' need to convert the Point to a Ladybug Point3D
+        srfc_centroid_c = Point3D(srfc_centroid_a.X, srfc_centroid_a.Y, srfc_centroid_a.Z + move_distance)
+        
+        pt = (srfc_centroid_c.x, srfc_centroid_c.y, srfc_centroid_c.z)
+        host_room = None
+        for i in room_index.query_box( (pt, pt), _tolerance ):
+            if hb_rooms[i].geometry.is_point_inside( srfc_centroid_c ):
+                host_room = hb_rooms[i].display_name
+                break
+        
+        results.append( (srfc_centroid_a, host_room) )
+    
+    return results
 
-    return srfc_centroid_a, host_room
+def find_tfa_host_room(_tfa_srfc_geom, _hb_rooms):
+    """Evaluates the Centoid of a TFA srf to see if it is inside an HB-Room """
+    
+    return find_tfa_host_rooms([_tfa_srfc_geom], _hb_rooms)[0]
 
 def get_hb_room_floor_surfaces(_room):
     hb_floor_surfaces = []
@@ -878,32 +917,155 @@ def get_hb_room_floor_surfaces(_room):
 
     return hb_floor_surfaces
 
-def find_neighbors(_dict_of_TFA_objs):
-    for tfa_a in _dict_of_TFA_objs.values():
-        for tfa_b in _dict_of_TFA_objs.values():
-            if ghc.BrepXBrep(tfa_a.surface, tfa_b.surface).curves:
-                tfa_a.set_neighbors(tfa_b.neighbors)
-                tfa_b.set_neighbors(tfa_a.neighbors)
+def _tfa_bounding_box(_tfa_obj):
+    """The TFA surface's World-axis bounding box as (mins, maxs), or None """
+    
+    try:
+        bbox = _tfa_obj.surface.GetBoundingBox(True)
+    except AttributeError:
+        return None
+    
+    if not bbox.IsValid:
+        return None
+    
+    return (bbox.Min.X, bbox.Min.Y, bbox.Min.Z), (bbox.Max.X, bbox.Max.Y, bbox.Max.Z)
+
+def _tfa_outline_2d(_tfa_obj, _tolerance):
+    """The TFA surface's outline as a list of (x, y) points, if it is a flat, horizontal polygon with no holes
+    
+    Returns None for anything else (curved edges, sloped, holes...) so those get the full Brep test.
+    """
+    
+    try:
+        if _tfa_obj.surface.Faces.Count != 1 or _tfa_obj.surface.Loops.Count != 1:
+            return None
+        ok, polyline = _tfa_obj.surface.Loops[0].To3dCurve().TryGetPolyline()
+    except AttributeError:
+        return None
+    
+    if not ok:
+        return None
+    
+    pts = list(polyline)
+    if pts[0].DistanceTo(pts[-1]) <= _tolerance:
+        pts = pts[:-1]
+    if len(pts) < 3:
+        return None
+    
+    zs = [pt.Z for pt in pts]
+    if max(zs) - min(zs) > _tolerance:
+        return None
+    
+    return [(pt.X, pt.Y) for pt in pts]
+
+def find_neighbors(_dict_of_TFA_objs, _tolerance=0.01):
+    """Finds which of the TFA surfaces touch each other, and sets their 'neighbors'
+    
+    Only the pairs whose bounding boxes touch (within the tolerance) are tested.
+    Flat, level floor surfaces are tested in 2D (shared edges, or overlapping), the
+    rest with a full Brep / Brep intersection.
+    
+    Args:
+        _dict_of_TFA_objs (dict): The TFA_Surface objects, by id
+        _tolerance (float): Surfaces closer than this are touching
+    Returns:
+        None
+    """
+    
+    tfa_objs = list(_dict_of_TFA_objs.values())
+    boxes = [_tfa_bounding_box(tfa_obj) for tfa_obj in tfa_objs]
+    outlines = {}
+    
+    for i, j in LBT2PH.spatial.overlapping_pairs(boxes, _tolerance):
+        tfa_a, tfa_b = tfa_objs[i], tfa_objs[j]
+        
+        for k, tfa_obj in ((i, tfa_a), (j, tfa_b)):
+            if k not in outlines:
+                outlines[k] = _tfa_outline_2d(tfa_obj, _tolerance)
+        
+        if outlines[i] and outlines[j]:
+            touching = LBT2PH.spatial.polygons_touch(outlines[i], outlines[j], _tolerance)
+        else:
+            touching = ghc.BrepXBrep(tfa_a.surface, tfa_b.surface).curves
+        
+        if touching:
+            tfa_a.set_neighbors(tfa_b.neighbors)
+            tfa_b.set_neighbors(tfa_a.neighbors)
 
     return None
 
 def bin_tfa_srfcs_by_neighbor(_tfa_srfc_objs):
+    """Groups each room's TFA surfaces into sets of connected (touching) surfaces
+    
+    Uses the 'neighbors' found by find_neighbors(). Surfaces which touch through
+    any chain of others end up in the same group, whatever order they come in.
+    
+    Args:
+        _tfa_srfc_objs (dict): The TFA_Surface objects: {room key: {id: TFA_Surface}}
+    Returns:
+        srfcSets (dict): The groups: {(room key, id of first surface): [TFA_Surface, ...]}
+    """
+    
     srfcSets = {}
     for room_name, room in _tfa_srfc_objs.items():
-        for k2, v2 in room.items():
-            if len(v2.neighbors) == 1:
-                srfcSets[v2.id] = [v2]
-            else:
-                for id_num in v2.neighbors:
-                    if id_num in srfcSets.keys():
-                        srfcSets[id_num].append(v2)
-                        break
-                else:
-                    srfcSets[v2.id] = [v2]
+        pairs = [(tfa_obj.id, id_num) for tfa_obj in room.values() for id_num in tfa_obj.neighbors]
+        
+        for group in LBT2PH.tfa_groups.group_connected(list(room.keys()), pairs):
+            srfcSets[(room_name, group[0])] = [room[id_num] for id_num in group]
     
     return srfcSets
 
+def _union_tfa_surfaces(_group, _tolerance=0.01):
+    """Joins the group's TFA surfaces into a single planar Brep, or None if they won't join
+    
+    Flat, level surfaces with straight edges are joined with a single 2D polygon
+    union. Anything else (or if that fails) uses a Rhino region union of the perimeters.
+    """
+    
+    outlines = [_tfa_outline_2d(tfa_obj, _tolerance) for tfa_obj in _group]
+    heights = [box[0][2] for box in (_tfa_bounding_box(tfa_obj) for tfa_obj in _group) if box]
+    
+    if all(outlines) and len(heights) == len(_group) and max(heights) - min(heights) <= _tolerance:
+        union = LBT2PH.tfa_groups.union_outlines(outlines, _tolerance)
+        if union:
+            boundary, holes = union
+            z = heights[0]
+            curves = []
+            for pts in [boundary] + holes:
+                polyline = Rhino.Geometry.Polyline([Rhino.Geometry.Point3d(x, y, z) for x, y in pts + pts[:1]])
+                curves.append( polyline.ToPolylineCurve() )
+            
+            breps = Rhino.Geometry.Brep.CreatePlanarBreps(curves, _tolerance)
+            if breps and len(breps) == 1:
+                return breps[0]
+    
+    try:
+        perim_curve = ghc.RegionUnion([tfa_obj.surface_perimeter for tfa_obj in _group])
+        breps = Rhino.Geometry.Brep.CreatePlanarBreps(perim_curve, _tolerance)
+    except Exception as e:
+        print(e)
+        return None
+    
+    if breps:
+        return breps[0]
+    return None
+
 def join_touching_tfa_groups(_tfa_surface_groups, _ghenv=None):
+    """Joins each group of touching TFA surfaces into a single TFA surface
+    
+    The new surface's parameters are combined from the group's surfaces: the TFA
+    factor and ventilation flow rates are weighted by each surface's gross area,
+    and the Non-Res types are the ones covering the most area. If a group's
+    surfaces can't be joined, they are passed through as they are (with a warning)
+    and the other groups carry on.
+    
+    Args:
+        _tfa_surface_groups (dict): The groups, as from bin_tfa_srfcs_by_neighbor()
+        _ghenv (ghenv): Optional. The Grasshopper component, for any warnings
+    Returns:
+        tfa_srfcs_joined (list: TFA_Surface): The joined TFA surfaces
+    """
+    
     tfa_srfcs_joined = []
     
     for group in _tfa_surface_groups.values():
@@ -912,77 +1074,58 @@ def join_touching_tfa_groups(_tfa_surface_groups, _ghenv=None):
         
         if len(group) == 1:
             tfa_srfcs_joined.append(group[0])
-        else:
-            ventFlowRates_Sup = []
-            ventFlowRates_Eta = []
-            ventFlowRates_Tran = []
-            areas_tfa = []
-            areas_gross = []
-            srfc_exterior_perimeters = []
-            sub_surfaces = []
-            usage = []
-            lighting = []
-            motion = []
-            for tfa_srfc in group:
-                # Get the ventilation flow rates
-                ventFlowRates_Sup.append( tfa_srfc.get_vent_flow_rate('V_sup') )
-                ventFlowRates_Eta.append( tfa_srfc.get_vent_flow_rate('V_eta') )
-                ventFlowRates_Tran.append( tfa_srfc.get_vent_flow_rate('V_trans') )
-
-                # Get the geometric information
-                areas_tfa.append(tfa_srfc.area_tfa)
-                areas_gross.append(tfa_srfc.area_gross)
-                srfc_exterior_perimeters.append(tfa_srfc.surface_perimeter)
-                sub_surfaces.append(tfa_srfc)
-
-                # Get the Non-Res params
-                usage.append(tfa_srfc.non_res_usage)
-                lighting.append(tfa_srfc.non_res_lighting)
-                motion.append(tfa_srfc.non_res_motion)
-
-            # Build the new TFA surface
-            perim_curve = ghc.RegionUnion(srfc_exterior_perimeters)
-            unioned_surface = Rhino.Geometry.Brep.CreatePlanarBreps(perim_curve, 0.01)
-            if len(unioned_surface) != 0:
-                unioned_surface = unioned_surface[0]
-            else:
-                break
-
-            host_room_name = group[0].host_room_name
-            params = group[0].params
-            unionedTFAObj = TFA_Surface(unioned_surface, host_room_name, params, sub_surfaces)
-
-            # Set the new TFA Surface's param properties
-            unionedTFAObj.area_gross = sum(areas_gross)
-            unionedTFAObj.tfa_factor = sum(areas_tfa) / sum(areas_gross)
-            unionedTFAObj.space_number = group[0].space_number
-            unionedTFAObj.space_name = group[0].space_name
-            unionedTFAObj.set_surface_param('V_sup', max(ventFlowRates_Sup) )
-            unionedTFAObj.set_surface_param('V_eta', max(ventFlowRates_Eta) )
-            unionedTFAObj.set_surface_param('V_trans', max(ventFlowRates_Tran) )
-
-            # Set the new TFA Surface's Non-Res params
-            usage = sorted(list(set(filter(None, usage))))
-            lighting = sorted(list(set(filter(None, lighting))))
-            motion = sorted(list(set(filter(None, motion))))
-            
-            unionedTFAObj.non_res_usage = usage[0]
-            unionedTFAObj.non_res_lighting = lighting[0]
-            unionedTFAObj.non_res_motion = motion[0]
+            continue
+        
+        # Build the new TFA surface
+        unioned_surface = _union_tfa_surfaces(group)
+        if unioned_surface is None:
+            msg = 'Warning: Could not join the {} touching TFA surfaces in room "{}". '\
+                'Using them as separate surfaces instead.'.format( len(group), group[0].space_name )
+            print(msg)
+            if _ghenv:
+                _ghenv.Component.AddRuntimeMessage( ghK.GH_RuntimeMessageLevel.Warning, msg )
+            tfa_srfcs_joined.extend(group)
+            continue
+        
+        areas_gross = [tfa_srfc.area_gross for tfa_srfc in group]
+        areas_tfa = [tfa_srfc.area_tfa for tfa_srfc in group]
+        
+        host_room_name = group[0].host_room_name
+        params = group[0].params
+        unionedTFAObj = TFA_Surface(unioned_surface, host_room_name, params, list(group))
+
+        # Set the new TFA Surface's param properties
+        unionedTFAObj.area_gross = sum(areas_gross)
+        unionedTFAObj.tfa_factor = sum(areas_tfa) / sum(areas_gross)
+        unionedTFAObj.space_number = group[0].space_number
+        unionedTFAObj.space_name = group[0].space_name
+        for flow_type in ('V_sup', 'V_eta', 'V_trans'):
+            flow_rates = [tfa_srfc.get_vent_flow_rate(flow_type) for tfa_srfc in group]
+            unionedTFAObj.set_surface_param(flow_type, LBT2PH.tfa_groups.weighted_mean(flow_rates, areas_gross) )
+
+        # Set the new TFA Surface's Non-Res params
+        usage, usages = LBT2PH.tfa_groups.dominant_value([t.non_res_usage for t in group], areas_gross)
+        lighting, lightings = LBT2PH.tfa_groups.dominant_value([t.non_res_lighting for t in group], areas_gross)
+        motion, motions = LBT2PH.tfa_groups.dominant_value([t.non_res_motion for t in group], areas_gross)
+        
+        if usage is not None: unionedTFAObj.non_res_usage = usage
+        if lighting is not None: unionedTFAObj.non_res_lighting = lighting
+        if motion is not None: unionedTFAObj.non_res_motion = motion
 
-            # Give Warnings if needed
-            if len(usage) > 1:
+        # Give Warnings if needed
+        if _ghenv:
+            if len(usages) > 1:
                 msg = 'Warning: Found more than one Non-Res. "Usage" type on room "{}"?'.format( unionedTFAObj.space_name )
                 _ghenv.Component.AddRuntimeMessage( ghK.GH_RuntimeMessageLevel.Warning, msg )
-            if len(lighting) > 1:
+            if len(lightings) > 1:
                 msg = 'Warning: Found more than one Non-Res. "Lighting" type on room "{}"?'.format( unionedTFAObj.space_name )
                 _ghenv.Component.AddRuntimeMessage( ghK.GH_RuntimeMessageLevel.Warning, msg ) 
-            if len(motion) > 1:
+            if len(motions) > 1:
                 msg = 'Warning: Found more than one Non-Res. "Motion Detector" type on room "{}"?'.format( unionedTFAObj.space_name )
                 _ghenv.Component.AddRuntimeMessage( ghK.GH_RuntimeMessageLevel.Warning, msg ) 
 
-            # Pass back the new Joined TFA surface
-            tfa_srfcs_joined.append(unionedTFAObj)
+        # Pass back the new Joined TFA surface
+        tfa_srfcs_joined.append(unionedTFAObj)
 
     return tfa_srfcs_joined
 
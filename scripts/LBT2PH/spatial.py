@@ -0,0 +1,391 @@
+"""Bounding boxes, union-find grouping, a box tree and 2D polygon tests on plain tuples.
+
+Used to find the geometry near each window, and which surfaces touch, without
+testing every pair of objects.
+"""
+
+from LBT2PH.vectors import as_tuple
+
+
+class UnionFind(object):
+    """Disjoint-set (union-find) with path compression and union by rank.
+
+    Arguments:
+        _items: (iterable) Optional. Any hashable keys to register up front.
+    """
+
+    __slots__ = ('_parent', '_rank', '_order')
+
+    def __init__(self, _items=None):
+        self._parent = {}
+        self._rank = {}
+        self._order = []
+        for item in _items or []:
+            self.add(item)
+
+    def add(self, _item):
+        if _item not in self._parent:
+            self._parent[_item] = _item
+            self._rank[_item] = 0
+            self._order.append(_item)
+
+    def find(self, _item):
+        self.add(_item)
+
+        root = _item
+        while self._parent[root] != root:
+            root = self._parent[root]
+
+        # Path compression
+        while self._parent[_item] != root:
+            self._parent[_item], _item = root, self._parent[_item]
+
+        return root
+
+    def union(self, _a, _b):
+        root_a = self.find(_a)
+        root_b = self.find(_b)
+        if root_a == root_b:
+            return root_a
+
+        if self._rank[root_a] < self._rank[root_b]:
+            root_a, root_b = root_b, root_a
+        self._parent[root_b] = root_a
+        if self._rank[root_a] == self._rank[root_b]:
+            self._rank[root_a] += 1
+
+        return root_a
+
+    def groups(self):
+        """Returns a list of lists of the items, grouped by their set.
+
+        Groups (and the items within them) are ordered by the order the items
+        were first added, so the result does not depend on the order of the
+        union calls.
+        """
+
+        groups = {}
+        group_order = []
+        for item in self._order:
+            root = self.find(item)
+            if root not in groups:
+                groups[root] = []
+                group_order.append(root)
+            groups[root].append(item)
+
+        return [groups[root] for root in group_order]
+
+
+def bounding_box(_points):
+    """Returns the axis-aligned bounding box of a set of points.
+
+    Arguments:
+        _points: (iterable) Point-like items (tuples, or objects with x/y[/z])
+    Returns: (tuple)
+        mins: (tuple) The minimum value along each axis
+        maxs: (tuple) The maximum value along each axis
+    """
+
+    pts = [as_tuple(pt) for pt in _points]
+    if not pts:
+        return None
+
+    mins = tuple(min(axis) for axis in zip(*pts))
+    maxs = tuple(max(axis) for axis in zip(*pts))
+    return mins, maxs
+
+
+def boxes_overlap(_box_a, _box_b, _tolerance=0.0):
+    """True if the two (mins, maxs) boxes touch or overlap within the tolerance """
+
+    mins_a, maxs_a = _box_a
+    mins_b, maxs_b = _box_b
+    for lo_a, hi_a, lo_b, hi_b in zip(mins_a, maxs_a, mins_b, maxs_b):
+        if lo_a > hi_b + _tolerance or lo_b > hi_a + _tolerance:
+            return False
+    return True
+
+
+def overlapping_pairs(_boxes, _tolerance=0.0):
+    """Finds every pair of boxes which touch or overlap (sweep-and-prune).
+
+    The boxes are sorted along their first axis and each box is only compared
+    against the boxes whose first-axis interval is still 'open', so for
+    typical building layouts this is close to O(n log n) instead of O(n^2).
+
+    Arguments:
+        _boxes: (list) (mins, maxs) tuples, as returned by bounding_box()
+        _tolerance: (float) Boxes closer than this are considered touching
+    Returns:
+        pairs: (list) Tuples of (i, j) indices into _boxes, with i < j
+    """
+
+    order = sorted((i for i, box in enumerate(_boxes) if box is not None),
+                    key=lambda i: _boxes[i][0][0])
+
+    pairs = []
+    active = []
+    for i in order:
+        lo_i = _boxes[i][0][0]
+        active = [j for j in active if _boxes[j][1][0] + _tolerance >= lo_i]
+        for j in active:
+            if boxes_overlap(_boxes[i], _boxes[j], _tolerance):
+                pairs.append((min(i, j), max(i, j)))
+        active.append(i)
+
+    return pairs
+
+
+def group_overlapping(_boxes, _tolerance=0.0):
+    """Groups box indices into clusters which are connected by overlaps.
+
+    Arguments:
+        _boxes: (list) (mins, maxs) tuples, as returned by bounding_box()
+        _tolerance: (float) Boxes closer than this are considered touching
+    Returns:
+        groups: (list) Lists of indices into _boxes, in input order
+    """
+
+    uf = UnionFind(range(len(_boxes)))
+    for i, j in overlapping_pairs(_boxes, _tolerance):
+        uf.union(i, j)
+
+    return uf.groups()
+
+
+class BoxTree(object):
+    """A static AABB tree (bounding volume hierarchy) over a list of boxes.
+
+    Used to find the few objects which could possibly intersect a test line or
+    plane, before running the (slow) exact Rhino intersection on just those.
+    All the queries are conservative: they may return a box which does not
+    actually hit, but never miss one which does.
+
+    Arguments:
+        _boxes: (list) (mins, maxs) tuples, as returned by bounding_box(). Any
+            None items are skipped (never returned).
+        _leaf_size: (int) Optional. The max number of boxes in each leaf node.
+    """
+
+    def __init__(self, _boxes, _leaf_size=4):
+        self.boxes = list(_boxes)
+        self._nodes = []  # (mins, maxs, left, right, items): leaf nodes have 'items'
+
+        indices = [i for i, box in enumerate(self.boxes) if box is not None]
+        self._root = self._build(indices, max(1, int(_leaf_size))) if indices else None
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def _build(self, _indices, _leaf_size):
+        mins = tuple(min(self.boxes[i][0][ax] for i in _indices) for ax in range(3))
+        maxs = tuple(max(self.boxes[i][1][ax] for i in _indices) for ax in range(3))
+
+        node = len(self._nodes)
+        self._nodes.append(None)
+        if len(_indices) <= _leaf_size:
+            self._nodes[node] = (mins, maxs, None, None, _indices)
+            return node
+
+        # Median split along the longest axis of the box centres
+        centre = lambda i, ax: self.boxes[i][0][ax] + self.boxes[i][1][ax]
+        spans = [max(centre(i, ax) for i in _indices) - min(centre(i, ax) for i in _indices) for ax in range(3)]
+        axis = spans.index(max(spans))
+        ordered = sorted(_indices, key=lambda i: centre(i, axis))
+        half = len(ordered) // 2
+
+        left = self._build(ordered[:half], _leaf_size)
+        right = self._build(ordered[half:], _leaf_size)
+        self._nodes[node] = (mins, maxs, left, right, None)
+        return node
+
+    def query(self, _test):
+        """Finds every box which passes the test
+
+        Arguments:
+            _test: (callable) Called as _test(mins, maxs) for the tree nodes and
+                then the boxes themselves. Must return True if the box could hit.
+        Returns:
+            indices: (list: int) Indices into the input boxes, in ascending order
+        """
+
+        if self._root is None:
+            return []
+
+        found = []
+        stack = [self._root]
+        while stack:
+            mins, maxs, left, right, items = self._nodes[stack.pop()]
+            if not _test(mins, maxs):
+                continue
+            if items is None:
+                stack.append(left)
+                stack.append(right)
+                continue
+            for i in items:
+                if _test(*self.boxes[i]):
+                    found.append(i)
+
+        found.sort()
+        return found
+
+    def query_box(self, _box, _tolerance=0.0):
+        """Indices of the boxes which touch or overlap the (mins, maxs) box """
+
+        return self.query(lambda mins, maxs: boxes_overlap(_box, (mins, maxs), _tolerance))
+
+    def query_segment(self, _start, _end, _tolerance=0.0):
+        """Indices of the boxes which the line segment passes through """
+
+        start, end = as_tuple(_start), as_tuple(_end)
+        return self.query(lambda mins, maxs: segment_hits_box(start, end, (mins, maxs), _tolerance))
+
+    def query_parallelogram(self, _origin, _edge_a, _edge_b, _tolerance=0.0):
+        """Indices of the boxes which could intersect the planar parallelogram
+
+        Arguments:
+            _origin: The parallelogram corner point
+            _edge_a: (vector) The first edge, from the origin
+            _edge_b: (vector) The second edge, from the origin
+        """
+
+        origin, a, b = as_tuple(_origin), as_tuple(_edge_a), as_tuple(_edge_b)
+        return self.query(lambda mins, maxs: parallelogram_hits_box(origin, a, b, (mins, maxs), _tolerance))
+
+
+def segment_hits_box(_start, _end, _box, _tolerance=0.0):
+    """True if the line segment passes within the tolerance of the box (slab test) """
+
+    mins, maxs = _box
+    t0, t1 = 0.0, 1.0
+    for ax in range(3):
+        lo, hi = mins[ax] - _tolerance, maxs[ax] + _tolerance
+        d = _end[ax] - _start[ax]
+        if d == 0:
+            if _start[ax] < lo or _start[ax] > hi:
+                return False
+            continue
+        ta, tb = (lo - _start[ax]) / d, (hi - _start[ax]) / d
+        if ta > tb:
+            ta, tb = tb, ta
+        t0, t1 = max(t0, ta), min(t1, tb)
+        if t0 > t1:
+            return False
+    return True
+
+
+def parallelogram_hits_box(_origin, _edge_a, _edge_b, _box, _tolerance=0.0):
+    """True if the planar parallelogram could intersect the box
+
+    Conservative: the box must overlap the parallelogram's bounding box and
+    straddle (or touch) its plane.
+    """
+
+    corners = [_origin,
+               tuple(o + a for o, a in zip(_origin, _edge_a)),
+               tuple(o + b for o, b in zip(_origin, _edge_b)),
+               tuple(o + a + b for o, a, b in zip(_origin, _edge_a, _edge_b))]
+    if not boxes_overlap(bounding_box(corners), _box, _tolerance):
+        return False
+
+    ax, ay, az = _edge_a
+    bx, by, bz = _edge_b
+    normal = (ay * bz - az * by, az * bx - ax * bz, ax * by - ay * bx)
+    length = (normal[0] ** 2 + normal[1] ** 2 + normal[2] ** 2) ** 0.5
+    if length == 0:
+        return True
+
+    # Signed distance of the box centre to the plane vs. the box's 'radius' along the normal
+    mins, maxs = _box
+    centre = [(lo + hi) / 2.0 for lo, hi in zip(mins, maxs)]
+    radius = sum(abs(n) * (hi - lo) / 2.0 for n, lo, hi in zip(normal, mins, maxs)) / length
+    dist = sum(n * (c - o) for n, c, o in zip(normal, centre, _origin)) / length
+    return abs(dist) <= radius + _tolerance
+
+def point_in_polygon(_point, _polygon):
+    """True if the (x, y) point is inside the 2D polygon (even-odd rule). Points on the edge may go either way. """
+
+    x, y = _point[0], _point[1]
+    inside = False
+    count = len(_polygon)
+    for i in range(count):
+        ax, ay = _polygon[i][0], _polygon[i][1]
+        bx, by = _polygon[(i + 1) % count][0], _polygon[(i + 1) % count][1]
+        if (ay > y) != (by > y):
+            if x < ax + (y - ay) * (bx - ax) / (by - ay):
+                inside = not inside
+    return inside
+
+
+def segments_share_length(_a0, _a1, _b0, _b1, _tolerance=0.0):
+    """True if the two 2D segments lie along the same line and overlap by more than the tolerance """
+
+    dx, dy = _a1[0] - _a0[0], _a1[1] - _a0[1]
+    length = (dx * dx + dy * dy) ** 0.5
+    if length <= _tolerance:
+        return False
+    ux, uy = dx / length, dy / length
+
+    # Both ends of b must be on a's line
+    for pt in (_b0, _b1):
+        if abs((pt[0] - _a0[0]) * uy - (pt[1] - _a0[1]) * ux) > _tolerance:
+            return False
+
+    # ... and overlap a's extent along it
+    t0 = (_b0[0] - _a0[0]) * ux + (_b0[1] - _a0[1]) * uy
+    t1 = (_b1[0] - _a0[0]) * ux + (_b1[1] - _a0[1]) * uy
+    lo, hi = max(0.0, min(t0, t1)), min(length, max(t0, t1))
+    return hi - lo > _tolerance
+
+
+def segments_cross(_a0, _a1, _b0, _b1, _tolerance=0.0):
+    """True if the two 2D segments cross each other at a single point away from their ends """
+
+    def _side(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    d1, d2 = _side(_b0, _b1, _a0), _side(_b0, _b1, _a1)
+    d3, d4 = _side(_a0, _a1, _b0), _side(_a0, _a1, _b1)
+
+    len_a = ((_a1[0] - _a0[0]) ** 2 + (_a1[1] - _a0[1]) ** 2) ** 0.5
+    len_b = ((_b1[0] - _b0[0]) ** 2 + (_b1[1] - _b0[1]) ** 2) ** 0.5
+    tol_a, tol_b = _tolerance * len_b, _tolerance * len_a
+
+    return ((d1 > tol_b and d2 < -tol_b) or (d1 < -tol_b and d2 > tol_b)) and \
+           ((d3 > tol_a and d4 < -tol_a) or (d3 < -tol_a and d4 > tol_a))
+
+
+def polygons_touch(_polygon_a, _polygon_b, _tolerance=0.0):
+    """True if the two 2D polygons share some length of edge, or overlap
+
+    This is the 2D version of testing two flat surfaces (ie: floor surfaces at
+    the same height) for intersection curves: touching at a single corner only
+    does not count.
+
+    Arguments:
+        _polygon_a: (list) The (x, y) points of the first polygon's outline
+        _polygon_b: (list) The (x, y) points of the second polygon's outline
+        _tolerance: (float)
+    Returns:
+        (bool)
+    """
+
+    edges_a = [(pt, _polygon_a[(i + 1) % len(_polygon_a)]) for i, pt in enumerate(_polygon_a)]
+    edges_b = [(pt, _polygon_b[(i + 1) % len(_polygon_b)]) for i, pt in enumerate(_polygon_b)]
+
+    for a0, a1 in edges_a:
+        for b0, b1 in edges_b:
+            if segments_share_length(a0, a1, b0, b1, _tolerance):
+                return True
+            if segments_cross(a0, a1, b0, b1, _tolerance):
+                return True
+
+    # No shared or crossing edges, so either one is inside the other, or they are apart
+    mid_a = _edge_midpoint(edges_a[0])
+    mid_b = _edge_midpoint(edges_b[0])
+    return point_in_polygon(mid_a, _polygon_b) or point_in_polygon(mid_b, _polygon_a)
+
+
+def _edge_midpoint(_edge):
+    (ax, ay), (bx, by) = _edge[0][:2], _edge[1][:2]
+    return ((ax + bx) / 2.0, (ay + by) / 2.0)
@@ -0,0 +1,65 @@
+import unittest
+
+import LBT2PH.adaptive_grid
+
+
+def _shadow_line(points):
+    """Fully shaded above z=1.3, unshaded below. Two 'seasons', the same shadow """
+    return [(0.0, 0.0) if pt[2] > 1.3 else (1.0, 1.0) for pt in points]
+
+
+def _average(result):
+    area = sum(c.area for c in result.cells)
+    return sum(c.area * v[0] for c, v in zip(result.cells, result.values)) / area
+
+
+class Test_adaptive_grid(unittest.TestCase):
+    def setUp(self):
+        # A 4m x 2m south facing window
+        self.window = [[(0, 0, 0), (4, 0, 0), (4, 0, 2), (0, 0, 2)]]
+        self.normal = (0, -1, 0)
+
+    def test_clip_polygon(self):
+        triangle = [(0, 0), (2, 0), (0, 2)]
+        clipped = LBT2PH.adaptive_grid.clip_polygon(triangle, 0, 0, 1, 1)
+        area, _ = LBT2PH.adaptive_grid.area_centroid(clipped)
+        self.assertAlmostEqual(area, 1.0)
+        self.assertEqual(LBT2PH.adaptive_grid.clip_polygon(triangle, 5, 5, 6, 6), [])
+
+    def test_refines_to_tolerance(self):
+        grid = LBT2PH.adaptive_grid.AdaptiveGrid(self.window, self.normal, 1.0)
+        result = grid.refine(_shadow_line, 0.01, _max_depth=6)
+
+        self.assertTrue(result.converged)
+        self.assertLessEqual(result.error, 0.01)
+        self.assertAlmostEqual(_average(result), 0.65, delta=0.01)
+        self.assertAlmostEqual(sum(c.area for c in result.cells), 8.0)
+
+        # A uniform grid at the finest cell size used would need far more points
+        finest = min(c.bounds[2] - c.bounds[0] for c in result.cells)
+        self.assertLess(result.point_count, (4.0 / finest) * (2.0 / finest) / 2)
+
+    def test_no_shading_gradient(self):
+        grid = LBT2PH.adaptive_grid.AdaptiveGrid(self.window, self.normal, 0.5)
+        result = grid.refine(lambda pts: [(1.0,)] * len(pts), 0.001)
+
+        self.assertEqual(result.point_count, 32)
+        self.assertEqual(result.error, 0.0)
+
+    def test_depth_limit(self):
+        grid = LBT2PH.adaptive_grid.AdaptiveGrid(self.window, self.normal, 1.0)
+        result = grid.refine(_shadow_line, 1e-6, _max_depth=2)
+
+        self.assertFalse(result.converged)
+        self.assertLessEqual(max(c.depth for c in result.cells), 2)
+
+    def test_non_rectangular_window(self):
+        triangle = [[(0, 0, 0), (2, 0, 0), (0, 0, 2)]]
+        grid = LBT2PH.adaptive_grid.AdaptiveGrid(triangle, self.normal, 0.5)
+        result = grid.refine(lambda pts: [(1.0,)] * len(pts), 0.01)
+
+        self.assertAlmostEqual(sum(c.area for c in result.cells), 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
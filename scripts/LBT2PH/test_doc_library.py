@@ -0,0 +1,77 @@
+import json
+import unittest
+
+import LBT2PH.doc_library
+
+
+def _glazing(_dict):
+    return _dict['Name'], ('glazing', _dict['Name'], _dict['uValue'])
+
+
+def _frame(_dict):
+    return _dict.get('Name', 'Unnamed Frame'), ('frame', _dict.get('Name', 'Unnamed Frame'))
+
+
+CATEGORIES = [
+    LBT2PH.doc_library.Category('lib_GlazingTypes', 'PHPP_lib_Glazing', _glazing),
+    LBT2PH.doc_library.Category('lib_FrameTypes', 'PHPP_lib_Frame', _frame),
+    ]
+
+
+class Test_doc_library(unittest.TestCase):
+    def setUp(self):
+        self.index = LBT2PH.doc_library.LibraryIndex(CATEGORIES)
+        self.entries = [
+            ('PHPP_lib_Glazing_01', json.dumps({'Name': 'Triple', 'uValue': 0.6})),
+            ('PHPP_lib_Glazing_02', json.dumps({'Name': 'Double', 'uValue': 1.1})),
+            ('PHPP_lib_Frame_01', json.dumps({'Name': 'Wood'})),
+            ('Some_Other_Key', 'not json'),
+            ]
+
+    def test_parses_by_category(self):
+        self.assertTrue(self.index.refresh(self.entries))
+        self.assertEqual(self.index.parse_count, 3)
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(sorted(self.index.get('lib_GlazingTypes')), ['Double', 'Triple'])
+        self.assertEqual(self.index.get('lib_FrameTypes'), {'Wood': ('frame', 'Wood')})
+        self.assertEqual(self.index.errors, {})
+
+    def test_unchanged_is_not_parsed_again(self):
+        self.index.refresh(self.entries)
+        self.assertFalse(self.index.refresh(list(reversed(self.entries))))
+        self.assertEqual(self.index.parse_count, 3)
+
+    def test_only_changed_entries_parsed_again(self):
+        self.index.refresh(self.entries)
+        self.entries[0] = ('PHPP_lib_Glazing_01', json.dumps({'Name': 'Triple', 'uValue': 0.5}))
+        self.assertTrue(self.index.refresh(self.entries))
+        self.assertEqual(self.index.parse_count, 4)
+        self.assertEqual(self.index.get('lib_GlazingTypes')['Triple'], ('glazing', 'Triple', 0.5))
+
+    def test_removed_entries_dropped(self):
+        self.index.refresh(self.entries)
+        self.index.refresh(self.entries[1:])
+        self.assertEqual(list(self.index.get('lib_GlazingTypes')), ['Double'])
+        self.assertEqual(len(self.index), 2)
+
+    def test_bad_entries_recorded(self):
+        self.entries.append(('PHPP_lib_Glazing_03', '{not json'))
+        self.entries.append(('PHPP_lib_Glazing_04', json.dumps({'uValue': 1.0})))
+        self.index.refresh(self.entries)
+        self.assertEqual(sorted(self.index.errors), ['PHPP_lib_Glazing_03', 'PHPP_lib_Glazing_04'])
+        self.assertEqual(len(self.index.get('lib_GlazingTypes')), 2)
+
+    def test_later_entry_wins_name_clash(self):
+        self.entries.append(('PHPP_lib_Glazing_03', json.dumps({'Name': 'Triple', 'uValue': 0.7})))
+        self.index.refresh(self.entries)
+        self.assertEqual(self.index.get('lib_GlazingTypes')['Triple'], ('glazing', 'Triple', 0.7))
+
+    def test_library_dict_is_a_copy(self):
+        self.index.refresh(self.entries)
+        library = self.index.to_library_dict()
+        library['lib_GlazingTypes'].clear()
+        self.assertEqual(len(self.index.get('lib_GlazingTypes')), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+
+from ladybug_geometry.geometry3d.pointvector import Point3D
+from ladybug_geometry.geometry3d.face import Face3D
+
+import LBT2PH.footprint
+import LBT2PH.spatial
+
+
+def _rectangle(x0, y0, x1, y1, z=0):
+    return Face3D([Point3D(x0, y0, z), Point3D(x1, y0, z), Point3D(x1, y1, z), Point3D(x0, y1, z)])
+
+
+class Test_spatial(unittest.TestCase):
+    def test_group_overlapping(self):
+        boxes = [((0, 0), (1, 1)), ((5, 5), (6, 6)), ((1, 1), (2, 2)), ((5.5, 0), (7, 5.5))]
+        groups = LBT2PH.spatial.group_overlapping(boxes, 0.001)
+
+        self.assertEqual(groups, [[0, 2], [1, 3]])
+
+    def test_union_find_order_independent(self):
+        uf_a = LBT2PH.spatial.UnionFind(['a', 'b', 'c', 'd'])
+        uf_a.union('a', 'c')
+        uf_a.union('d', 'b')
+
+        uf_b = LBT2PH.spatial.UnionFind(['a', 'b', 'c', 'd'])
+        uf_b.union('b', 'd')
+        uf_b.union('c', 'a')
+
+        self.assertEqual(uf_a.groups(), uf_b.groups())
+
+
+class Test_footprint(unittest.TestCase):
+    def test_overlapping_floors_and_walls(self):
+        wall = Face3D([Point3D(0, 0, 0), Point3D(10, 0, 0), Point3D(10, 0, 3), Point3D(0, 0, 3)])
+        faces = [
+            _rectangle(0, 0, 10, 10),
+            _rectangle(0, 0, 10, 10, 3),
+            _rectangle(5, 5, 15, 15, 3),
+            wall,
+        ]
+        fp = LBT2PH.footprint.footprint_from_faces(faces)
+
+        self.assertAlmostEqual(fp.Footprint_area, 175.0, places=3)
+        self.assertEqual(len(fp.Footprint_surface), 1)
+        self.assertAlmostEqual(fp.Footprint_surface[0].min.z, 0.0)
+
+    def test_courtyard_hole(self):
+        faces = [
+            _rectangle(0, 0, 10, 2),
+            _rectangle(0, 8, 10, 10),
+            _rectangle(0, 0, 2, 10),
+            _rectangle(8, 0, 10, 10),
+        ]
+        fp = LBT2PH.footprint.footprint_from_faces(faces)
+
+        self.assertAlmostEqual(fp.Footprint_area, 64.0, places=3)
+        self.assertEqual(len(fp.Footprint_surface[0].holes), 1)
+
+    def test_island_in_courtyard(self):
+        # The same courtyard, with a separate block standing in the middle of it
+        faces = [
+            _rectangle(0, 0, 10, 2),
+            _rectangle(0, 8, 10, 10),
+            _rectangle(0, 0, 2, 10),
+            _rectangle(8, 0, 10, 10),
+            _rectangle(4, 4, 6, 6),
+        ]
+        fp = LBT2PH.footprint.footprint_from_faces(faces)
+
+        self.assertAlmostEqual(fp.Footprint_area, 68.0, places=3)
+        self.assertEqual(len(fp.Footprint_surface), 2)
+        self.assertEqual(sorted(len(srfc.holes or []) for srfc in fp.Footprint_surface), [0, 1])
+
+    def test_no_faces(self):
+        fp = LBT2PH.footprint.footprint_from_faces([])
+
+        self.assertIsNone(fp.Footprint_surface)
+        self.assertIsNone(fp.Footprint_area)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+
+from ladybug_geometry.geometry2d.pointvector import Point2D
+from ladybug_geometry.geometry2d.polygon import Polygon2D
+from ladybug_geometry.geometry3d.pointvector import Point3D, Vector3D
+from ladybug_geometry.geometry3d.face import Face3D
+
+import LBT2PH.glazing_geometry
+
+
+def _widths(left=0.1, right=0.1, bottom=0.1, top=0.1):
+    return {'Left': left, 'Right': right, 'Bottom': bottom, 'Top': top}
+
+
+class Test_glazing_geometry(unittest.TestCase):
+    def setUp(self):
+        # A 2m wide x 1.5m tall South (-Y) facing window
+        self.window = Face3D([Point3D(0, 0, 1), Point3D(2, 0, 1), Point3D(2, 0, 2.5), Point3D(0, 0, 2.5)])
+
+    def test_per_side_widths(self):
+        glazing = LBT2PH.glazing_geometry.glazing_geometry(self.window, _widths(0.1, 0.2, 0.15, 0.05))
+
+        self.assertAlmostEqual(glazing.area, (2 - 0.3) * (1.5 - 0.2))
+        self.assertAlmostEqual(glazing.edge_lengths['Left'], 1.3)
+        self.assertAlmostEqual(glazing.edge_lengths['Bottom'], 1.7)
+
+        xs = [pt.x for pt in glazing.face.vertices]
+        zs = [pt.z for pt in glazing.face.vertices]
+        self.assertAlmostEqual(min(xs), 0.1)
+        self.assertAlmostEqual(max(xs), 1.8)
+        self.assertAlmostEqual(min(zs), 1.15)
+        self.assertAlmostEqual(max(zs), 2.45)
+
+    def test_depth_and_normal(self):
+        glazing = LBT2PH.glazing_geometry.glazing_geometry(self.window, _widths(), _depth=0.2)
+
+        self.assertAlmostEqual(glazing.face.normal.dot(self.window.normal), 1.0)
+        for pt in glazing.face.vertices:
+            self.assertAlmostEqual(pt.y, 0.2 * self.window.normal.y * -1)
+
+    def test_sides_follow_world_x_or_y(self):
+        # Facing along -X: Left is the lower Y
+        window = Face3D([Point3D(0, 0, 0), Point3D(0, 0, 1), Point3D(0, 2, 1), Point3D(0, 2, 0)])
+        glazing = LBT2PH.glazing_geometry.glazing_geometry(window, _widths(left=0.5))
+
+        self.assertAlmostEqual(min(pt.y for pt in glazing.face.vertices), 0.5)
+
+        right, up = LBT2PH.glazing_geometry.local_axes(Vector3D(0, 1, 0))
+        self.assertAlmostEqual(right.x, 1.0)
+        self.assertAlmostEqual(up.z, 1.0)
+
+    def test_concave(self):
+        # L-shape
+        poly = Polygon2D([Point2D(0, 0), Point2D(2, 0), Point2D(2, 1), Point2D(1, 1), Point2D(1, 2), Point2D(0, 2)])
+        inset = LBT2PH.glazing_geometry.inset_polygon(poly, [0.1] * 6)
+
+        self.assertAlmostEqual(inset.area, 1.8 * 0.8 + 0.8 * 1.0)
+
+    def test_window_edges(self):
+        left, right, bottom, top = LBT2PH.glazing_geometry.window_edges(self.window)
+
+        self.assertAlmostEqual(max(bottom.p.z, bottom.p2.z), 1.0)
+        self.assertAlmostEqual(min(top.p.z, top.p2.z), 2.5)
+        self.assertAlmostEqual(max(left.p.x, left.p2.x), 0.0)
+        self.assertAlmostEqual(min(right.p.x, right.p2.x), 2.0)
+
+        triangle = Face3D([Point3D(0, 0, 0), Point3D(2, 0, 0), Point3D(1, 0, 1)])
+        self.assertIsNone(LBT2PH.glazing_geometry.window_edges(triangle))
+
+    def test_too_small(self):
+        self.assertIsNone(LBT2PH.glazing_geometry.glazing_geometry(self.window, _widths(1.0, 1.0)))
+
+
+if __name__ == '__main__':
+    unittest.main()
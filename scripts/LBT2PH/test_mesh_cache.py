@@ -0,0 +1,54 @@
+import unittest
+
+import LBT2PH.mesh_cache
+
+
+class Test_mesh_cache(unittest.TestCase):
+    def setUp(self):
+        self.cache = LBT2PH.mesh_cache.MeshCache(_max_items=3)
+        self.built = []
+
+    def _build(self, _source):
+        self.built.append(_source)
+        return None if _source == 'bad' else 'mesh-' + _source
+
+    def test_only_builds_missing(self):
+        keys = ['a', 'b', 'a']
+        items = self.cache.get_many(keys, ['a', 'b', 'a'], self._build)
+        self.assertEqual(items, ['mesh-a', 'mesh-b', 'mesh-a'])
+        self.assertEqual(self.built, ['a', 'b'])
+
+        items = self.cache.get_many(['b', 'c'], ['b', 'c'], self._build)
+        self.assertEqual(items, ['mesh-b', 'mesh-c'])
+        self.assertEqual(self.built, ['a', 'b', 'c'])
+
+    def test_failed_builds_not_cached(self):
+        self.assertEqual(self.cache.get_many(['x'], ['bad'], self._build), [None])
+        self.assertEqual(len(self.cache), 0)
+        self.cache.get_many(['x'], ['bad'], self._build)
+        self.assertEqual(self.built, ['bad', 'bad'])
+
+    def test_custom_map(self):
+        calls = []
+
+        def _map(func, sources):
+            calls.append(list(sources))
+            return [func(source) for source in sources]
+
+        self.cache.get_many(['a', 'b'], ['a', 'b'], self._build, _map)
+        self.cache.get_many(['a', 'b'], ['a', 'b'], self._build, _map)
+        self.assertEqual(calls, [['a', 'b']])
+
+    def test_lru(self):
+        for key in 'abc':
+            self.cache.put(key, key)
+        self.cache.get('a')
+        self.cache.put('d', 'd')
+
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), 'a')
+        self.assertEqual(len(self.cache), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
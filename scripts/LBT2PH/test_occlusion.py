@@ -0,0 +1,174 @@
+import math
+import os
+import random
+import time
+import unittest
+
+import LBT2PH.occlusion
+
+
+def _random_mesh(rand, n_tris, extent=20.0, size=1.0):
+    verts, faces = [], []
+    for i in range(n_tris):
+        cx, cy, cz = (rand.uniform(-extent, extent) for _ in range(3))
+        for _ in range(3):
+            verts.extend((cx + rand.uniform(-size, size), cy + rand.uniform(-size, size), cz + rand.uniform(-size, size)))
+        faces.extend((3 * i, 3 * i + 1, 3 * i + 2))
+    return verts, faces
+
+
+def _random_rays(rand, n_rays, extent=20.0):
+    origins, directions = [], []
+    for _ in range(n_rays):
+        origins.append(tuple(rand.uniform(-extent, extent) for _ in range(3)))
+        d = [rand.gauss(0, 1) for _ in range(3)]
+        # Some axis-aligned rays, to exercise the zero-direction slab cases
+        if rand.random() < 0.1:
+            d = [0.0, 0.0, 1.0]
+        directions.append(tuple(d))
+    return origins, directions
+
+
+def _brute_force_hit(verts, faces, origin, direction):
+    ox, oy, oz = origin
+    dx, dy, dz = direction
+    for i in range(len(faces) // 3):
+        a, b, c = faces[3 * i:3 * i + 3]
+        v0 = verts[3 * a:3 * a + 3]
+        e1 = [verts[3 * b + k] - v0[k] for k in range(3)]
+        e2 = [verts[3 * c + k] - v0[k] for k in range(3)]
+        p = (dy * e2[2] - dz * e2[1], dz * e2[0] - dx * e2[2], dx * e2[1] - dy * e2[0])
+        det = sum(e1[k] * p[k] for k in range(3))
+        if abs(det) < 1e-9:
+            continue
+        t = (ox - v0[0], oy - v0[1], oz - v0[2])
+        u = sum(t[k] * p[k] for k in range(3)) / det
+        if u < 0 or u > 1:
+            continue
+        q = (t[1] * e1[2] - t[2] * e1[1], t[2] * e1[0] - t[0] * e1[2], t[0] * e1[1] - t[1] * e1[0])
+        v = (dx * q[0] + dy * q[1] + dz * q[2]) / det
+        if v < 0 or u + v > 1:
+            continue
+        if sum(e2[k] * q[k] for k in range(3)) / det > 1e-6:
+            return True
+    return False
+
+
+class Test_occlusion(unittest.TestCase):
+    def setUp(self):
+        rand = random.Random(7)
+        self.verts, self.faces = _random_mesh(rand, 300)
+        self.origins, self.directions = _random_rays(rand, 400)
+        self.expected = [_brute_force_hit(self.verts, self.faces, o, d)
+                            for o, d in zip(self.origins, self.directions)]
+
+    def _check_against_brute_force(self):
+        bvh = LBT2PH.occlusion.MeshBVH(self.verts, self.faces)
+        hits = bvh.any_hit(self.origins, self.directions)
+
+        self.assertEqual(hits, self.expected)
+        self.assertTrue(any(hits) and not all(hits))
+
+    def test_any_hit_matches_brute_force(self):
+        self._check_against_brute_force()
+
+    def test_any_hit_matches_brute_force_without_numpy(self):
+        np = LBT2PH.occlusion.np
+        LBT2PH.occlusion.np = None
+        try:
+            self._check_against_brute_force()
+        finally:
+            LBT2PH.occlusion.np = np
+
+    def test_intersect_mesh_rays_overhang(self):
+        # A 2x2 overhang 1m above and in front of a south (-Y) facing point
+        verts = [(-1, -1, 1), (1, -1, 1), (1, 0, 1), (-1, 0, 1)]
+        faces = [(0, 1, 2, 3)]
+        bvh = LBT2PH.occlusion.MeshBVH(verts, faces)
+
+        points = [(0, -0.01, 0)]
+        normals = [(0, -1, 0)]
+        vectors = [(0, 0, 1), (0, -1, 0.1), (0, 1, 1), (0, -1, 2)]
+        int_matrix, angles = LBT2PH.occlusion.intersect_mesh_rays(bvh, points, vectors, normals)
+
+        self.assertEqual(int_matrix, [[0, 1, 0, 0]])
+        self.assertAlmostEqual(angles[0][0], math.pi / 2)
+        self.assertGreater(angles[0][2], math.pi / 2)
+
+
+class Test_culling(unittest.TestCase):
+    def setUp(self):
+        rand = random.Random(3)
+        self.verts, self.faces = _random_mesh(rand, 400, extent=10.0)
+        # A 2m x 2m south (-Y) facing window at the origin
+        self.points = [(x * 0.25 - 0.875, -0.001, z * 0.25 + 0.125) for x in range(8) for z in range(8)]
+        self.normal = (0, -1, 0)
+        self.vectors = [(rand.gauss(0, 1), rand.gauss(0, 1), abs(rand.gauss(0, 1))) for _ in range(60)]
+
+    def _check_culling_is_exact(self):
+        full = LBT2PH.occlusion.MeshBVH(self.verts, self.faces)
+        expected = LBT2PH.occlusion.intersect_mesh_rays(full, self.points, self.vectors, [self.normal] * 64)
+
+        context = LBT2PH.occlusion.ShadingContext(self.verts, self.faces)
+        window = LBT2PH.occlusion.WindowContext(context, self.points, self.normal)
+        result = LBT2PH.occlusion.intersect_mesh_rays(window.mesh, self.points, self.vectors, [self.normal] * 64)
+
+        self.assertLess(window.triangle_count, len(context))
+        self.assertEqual(result, expected)
+
+    def test_culling_is_exact(self):
+        self._check_culling_is_exact()
+
+    def test_culling_is_exact_without_numpy(self):
+        np = LBT2PH.occlusion.np
+        LBT2PH.occlusion.np = None
+        try:
+            self._check_culling_is_exact()
+        finally:
+            LBT2PH.occlusion.np = np
+
+    def test_search_radius(self):
+        context = LBT2PH.occlusion.ShadingContext(self.verts, self.faces)
+        near = LBT2PH.occlusion.WindowContext(context, self.points, self.normal, 3.0)
+        far = LBT2PH.occlusion.WindowContext(context, self.points, self.normal)
+
+        self.assertLess(near.triangle_count, far.triangle_count)
+
+
+@unittest.skipUnless(os.environ.get('LBT2PH_BENCHMARK'), 'Set LBT2PH_BENCHMARK=1 to run the benchmarks')
+class Benchmark_occlusion(unittest.TestCase):
+    """Window-like query (100 points x 145 Tregenza patches) against random context """
+
+    def _run(self, n_tris):
+        rand = random.Random(1)
+        verts, faces = _random_mesh(rand, n_tris, extent=100.0, size=0.5)
+
+        start = time.time()
+        bvh = LBT2PH.occlusion.MeshBVH(verts, faces)
+        build_time = time.time() - start
+
+        points = [(rand.uniform(-5, 5), -0.01, rand.uniform(0, 3)) for _ in range(100)]
+        vectors = []
+        for _ in range(145):
+            d = (rand.gauss(0, 1), rand.gauss(0, 1), abs(rand.gauss(0, 1)))
+            vectors.append(d)
+
+        start = time.time()
+        LBT2PH.occlusion.intersect_mesh_rays(bvh, points, vectors, [(0, -1, 0)] * len(points))
+        query_time = time.time() - start
+
+        print('\n{:>9,} triangles: build {:.2f}s | 14,500 rays {:.2f}s (numpy={})'.format(
+            n_tris, build_time, query_time, LBT2PH.occlusion.np is not None))
+
+    def test_10k(self):
+        self._run(10000)
+
+    def test_100k(self):
+        self._run(100000)
+
+    def test_1M(self):
+        self._run(1000000)
+
+
+if __name__ == '__main__':
+    unittest.main()
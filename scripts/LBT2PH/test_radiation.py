@@ -0,0 +1,82 @@
+import math
+import random
+import unittest
+
+import LBT2PH.radiation
+
+
+def _reference(int_matrix, angles, sky_rad, face_areas):
+    """The original per-point generator loop from shading_lbt.calc_win_radiation """
+
+    results = []
+    for c, (int_vals, angs) in enumerate(zip(int_matrix, angles)):
+        pt_rel = (ival * math.cos(ang) for ival, ang in zip(int_vals, angs))
+        results.append(sum(r * w for r, w in zip(pt_rel, sky_rad)) * face_areas[c])
+    return results
+
+
+class Test_radiation(unittest.TestCase):
+    def setUp(self):
+        rand = random.Random(42)
+        self.n_pts, self.n_patches = 12, 145
+        self.int_matrix = [[rand.randint(0, 1) for _ in range(self.n_patches)] for _ in range(self.n_pts)]
+        self.angles = [[rand.uniform(0, math.pi) for _ in range(self.n_patches)] for _ in range(self.n_pts)]
+        self.sky_rad = [rand.uniform(0, 50) for _ in range(self.n_patches)]
+        self.areas = [rand.uniform(0.1, 0.3) for _ in range(self.n_pts)]
+
+    def _check(self):
+        expected = _reference(self.int_matrix, self.angles, self.sky_rad, self.areas)
+
+        mtx = LBT2PH.radiation.relative_matrix(self.int_matrix, self.angles)
+        result = LBT2PH.radiation.window_radiation(mtx, self.sky_rad, self.areas)
+
+        for a, b in zip(result.face_kWh, expected):
+            self.assertAlmostEqual(a, b, places=6)
+        self.assertAlmostEqual(result.total_kWh, sum(expected), places=6)
+        self.assertAlmostEqual(result.average_kWh, sum(expected) / sum(self.areas), places=6)
+
+    def test_matches_reference(self):
+        self._check()
+
+    def test_multi_sky_matches_single(self):
+        summer_rad = [r * 0.5 + 1.0 for r in self.sky_rad]
+        mtx = LBT2PH.radiation.relative_matrix(self.int_matrix, self.angles)
+
+        winter, summer = LBT2PH.radiation.window_radiation_multi(mtx, [self.sky_rad, summer_rad], self.areas)
+        self.assertAlmostEqual(winter.total_kWh, LBT2PH.radiation.window_radiation(mtx, self.sky_rad, self.areas).total_kWh)
+        self.assertAlmostEqual(summer.total_kWh, LBT2PH.radiation.window_radiation(mtx, summer_rad, self.areas).total_kWh)
+
+    def test_unshaded_matrix(self):
+        normals = [(0, -1, 0), (0, 0, 1)]
+        sky_vecs = [(0, -1, 0), (0, 1, 0), (0, -1, 1), (1, 0, 0)]
+        mtx = LBT2PH.radiation.unshaded_matrix(normals, sky_vecs)
+
+        expected = [[1.0, 0.0, math.sqrt(0.5), 0.0], [0.0, 0.0, math.sqrt(0.5), 0.0]]
+        for row, expected_row in zip(mtx, expected):
+            for a, b in zip(row, expected_row):
+                self.assertAlmostEqual(a, b)
+
+    def test_unshaded_matches_ray_cast_convention(self):
+        """No blocking (int=1) in front, 0 behind: same as ray-casting against nothing """
+        normals = [(0, -1, 0)]
+        sky_vecs = [(math.sin(a), -math.cos(a), 0) for a in (0.0, 0.5, 1.5, 2.0, 3.0)]
+        angles = [[math.acos(max(-1.0, min(1.0, -v[1]))) for v in sky_vecs]]
+        int_matrix = [[1 if a <= math.pi / 2 else 0 for a in angles[0]]]
+
+        ray_cast = LBT2PH.radiation.relative_matrix(int_matrix, angles)
+        analytic = LBT2PH.radiation.unshaded_matrix(normals, sky_vecs)
+        for a, b in zip(ray_cast[0], analytic[0]):
+            self.assertAlmostEqual(a, b)
+
+    def test_matches_reference_without_numpy(self):
+        np = LBT2PH.radiation.np
+        LBT2PH.radiation.np = None
+        try:
+            self._check()
+            self.test_unshaded_matrix()
+        finally:
+            LBT2PH.radiation.np = np
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import LBT2PH.radiation_stream
+
+
+class Test_radiation_stream(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'results.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_write_and_read_back(self):
+        windows = [([0.5, 0.5], [10.0, 12.5], [3.0, 4.0]),
+                   ([0.25, 0.25, 0.25], [1.0 / 3.0, 20.0, 0.0], [5.0, -1.0, 2.0])]
+
+        with LBT2PH.radiation_stream.RadiationWriter(self.path, _chunk_rows=2) as writer:
+            for i, (areas, winter, summer) in enumerate(windows):
+                writer.write_window(i, 'Window_{}'.format(i), areas, winter, summer)
+
+        winter = LBT2PH.radiation_stream.read_column(self.path, 'winter_shaded_kWh')
+        self.assertEqual(list(winter), [10.0, 12.5, 1.0 / 3.0, 20.0, 0.0])
+        self.assertEqual(len(LBT2PH.radiation_stream.read_column(self.path, 'area')), 5)
+
+        values = LBT2PH.radiation_stream.iter_column(self.path, 'summer_shaded_kWh')
+        self.assertEqual(next(values), 3.0)
+        self.assertEqual(list(values), [4.0, 5.0, -1.0, 2.0])
+
+        self.assertEqual(writer.window_count, 2)
+        self.assertEqual(writer.ranges['winter_shaded_kWh'].min, 0.0)
+        self.assertEqual(writer.ranges['winter_shaded_kWh'].max, 20.0)
+        self.assertEqual(writer.ranges['summer_shaded_kWh'].min, -1.0)
+        self.assertEqual(writer.ranges['summer_shaded_kWh'].count, 5)
+
+    def test_non_ascii_name(self):
+        name = u'Fen\u00eatre_\u00c4'
+        with LBT2PH.radiation_stream.RadiationWriter(self.path) as writer:
+            writer.write_window(0, name, [1.0], [2.0], [3.0])
+
+        with io.open(self.path, encoding='utf-8') as f:
+            self.assertIn(name, f.read())
+        self.assertEqual(list(LBT2PH.radiation_stream.read_column(self.path, 'winter_shaded_kWh')), [2.0])
+
+    def test_empty(self):
+        writer = LBT2PH.radiation_stream.RadiationWriter(self.path)
+        writer.close()
+
+        self.assertEqual(len(LBT2PH.radiation_stream.read_column(self.path, 'area')), 0)
+        self.assertIsNone(writer.ranges['area'].min)
+
+
+if __name__ == '__main__':
+    unittest.main()
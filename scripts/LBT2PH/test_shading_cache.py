@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import LBT2PH.shading_cache
+
+
+class Test_fingerprint(unittest.TestCase):
+    def test_triangles_fingerprint_ignores_order(self):
+        verts_a = [0, 0, 0, 1, 0, 0, 0, 1, 0, 5, 5, 5, 6, 5, 5, 5, 6, 5]
+        faces_a = [0, 1, 2, 3, 4, 5]
+        # Same two triangles, with the vertices and triangles re-numbered
+        verts_b = [6, 5, 5, 5, 6, 5, 5, 5, 5, 0, 1, 0, 1, 0, 0, 0, 0, 0]
+        faces_b = [2, 0, 1, 5, 4, 3]
+
+        fp_a = LBT2PH.shading_cache.triangles_fingerprint(verts_a, faces_a)
+        fp_b = LBT2PH.shading_cache.triangles_fingerprint(verts_b, faces_b)
+        self.assertEqual(fp_a, fp_b)
+        self.assertNotEqual(fp_a, LBT2PH.shading_cache.triangles_fingerprint(verts_a, faces_a[:3]))
+
+    def test_fingerprint_rounding(self):
+        fp = LBT2PH.shading_cache.fingerprint
+        self.assertEqual(fp([1.0, 2.0], 0.5), fp([1.0 + 1e-12, 2.0], 0.5))
+        self.assertNotEqual(fp([1.0, 2.0], 0.5), fp([1.0, 2.0], 0.25))
+
+    def test_context_fingerprints(self):
+        verts = [0, 0, 0, 1, 0, 0, 0, 1, 0, 5, 5, 5, 6, 5, 5, 5, 6, 5]
+        faces = [0, 1, 2, 3, 4, 5]
+        fingerprints = LBT2PH.shading_cache.ContextFingerprints(verts)
+
+        self.assertEqual(fingerprints.fingerprint(faces),
+                         LBT2PH.shading_cache.triangles_fingerprint(verts, faces))
+        self.assertEqual(fingerprints.fingerprint(faces), fingerprints.fingerprint([3, 4, 5, 1, 2, 0]))
+        self.assertNotEqual(fingerprints.fingerprint(faces), fingerprints.fingerprint(faces[3:]))
+        self.assertEqual(fingerprints.fingerprint([]), LBT2PH.shading_cache.triangles_fingerprint(verts, []))
+
+
+class Test_shading_cache(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_get_put_invalidate(self):
+        cache = LBT2PH.shading_cache.ShadingCache(self.folder)
+        self.assertIsNone(cache.get('a'))
+
+        cache.put('a', {'winter_shaded': [[1.0, 2.0], [0.5, 0.5], 1.5]})
+        cache.put('b', {'x': 1})
+        self.assertEqual(cache.get('a'), {'winter_shaded': [[1.0, 2.0], [0.5, 0.5], 1.5]})
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        self.assertEqual(cache.invalidate('a'), 1)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.invalidate(), 1)
+        self.assertEqual(len(cache), 0)
+
+    def test_lru_eviction(self):
+        cache = LBT2PH.shading_cache.ShadingCache(self.folder)
+        value = {'data': list(range(100))}
+        for key in ('a', 'b', 'c'):
+            cache.put(key, value)
+        entry_size = cache.size() // 3
+
+        # Make 'a' the least, and 'b' the most, recently used
+        now = time.time()
+        for age, key in ((300, 'a'), (200, 'c'), (100, 'b')):
+            path = os.path.join(self.folder, key + '.json')
+            os.utime(path, (now - age, now - age))
+
+        cache.max_bytes = entry_size * 2
+        self.assertEqual(cache.evict(), 1)
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+
+    def test_put_evicts_over_limit(self):
+        cache = LBT2PH.shading_cache.ShadingCache(self.folder)
+        value = {'data': list(range(100))}
+        cache.put('a', value)
+        entry_size = cache.size()
+
+        cache.max_bytes = entry_size * 2
+        cache.put('b', value)
+        cache.put('b', value)  # Replacing an entry doesn't grow the cache
+        self.assertEqual(len(cache), 2)
+
+        os.utime(os.path.join(self.folder, 'a.json'), (time.time() - 100, time.time() - 100))
+        cache.put('c', value)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
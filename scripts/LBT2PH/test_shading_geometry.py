@@ -0,0 +1,89 @@
+import math
+import unittest
+
+import LBT2PH.shading_geometry
+
+
+class Test_shading_geometry(unittest.TestCase):
+    def setUp(self):
+        # A south (-Y) facing window, shading origin at the glazing edge
+        self.origin = (0.0, 0.0, 1.0)
+        self.normal = (0.0, -1.0, 0.0)
+
+    def test_horizon_key_point(self):
+        # A neighbouring building 10m away, 6m tall (corner points of its section)
+        points = [(0, -10, 0), (0, -10, 6), (0, -18, 6), (0, -18, 0), (0, -30, 8)]
+        key = LBT2PH.shading_geometry.horizon_key_point(self.origin, self.normal, points)
+
+        self.assertEqual(key.index, 1)
+        self.assertAlmostEqual(key.height, 5.0)
+        self.assertAlmostEqual(key.distance, 10.0)
+
+    def test_overhang_key_point(self):
+        # A 1m deep overhang, 0.5m above the top of the glazing
+        points = [(0, 0, 1.5), (0, -1, 1.5), (0, -1, 1.6), (0, 0, 1.6), self.origin, (0, -5, 1.0)]
+        key = LBT2PH.shading_geometry.overhang_key_point(self.origin, self.normal, points)
+
+        self.assertEqual(key.index, 1)
+        self.assertAlmostEqual(key.height, 0.5)
+        self.assertAlmostEqual(key.distance, 1.0)
+
+    def test_no_points(self):
+        self.assertIsNone(LBT2PH.shading_geometry.horizon_key_point(self.origin, self.normal, []))
+        self.assertIsNone(LBT2PH.shading_geometry.overhang_key_point(self.origin, self.normal, [self.origin]))
+
+    def test_angles_without_numpy(self):
+        points = [(0, -1, 1), (0, -1, 2), (1, 0, 1), self.origin]
+        expected = LBT2PH.shading_geometry.angles_from(self.origin, self.normal, points)
+
+        np = LBT2PH.shading_geometry.np
+        LBT2PH.shading_geometry.np = None
+        try:
+            result = LBT2PH.shading_geometry.angles_from(self.origin, self.normal, points)
+        finally:
+            LBT2PH.shading_geometry.np = np
+
+        for a, b in zip(result[0] + result[1], expected[0] + expected[1]):
+            self.assertAlmostEqual(a, b)
+        self.assertAlmostEqual(result[0][2], math.pi / 2)
+        self.assertEqual(result[0][3], 0.0)
+
+    def test_reveal_side(self):
+        # 1m wide window, 0.1m frame, set 0.2m back from the wall face
+        side = LBT2PH.shading_geometry.reveal_side((0, 0, 1), self.normal, (0.5, 0, 1), 0.1, 0.2)
+
+        self.assertAlmostEqual(side.o_reveal, 0.2)
+        self.assertAlmostEqual(side.d_reveal, 0.1)
+        for a, b in zip(side.direction, (1, 0, 0)):
+            self.assertAlmostEqual(a, b)
+        for a, b in zip(side.origin, (0.4, 0.2, 1)):
+            self.assertAlmostEqual(a, b)
+
+    def test_reveal_zone_hit(self):
+        hit = LBT2PH.shading_geometry.reveal_zone_hit
+        o, d = 0.2, 0.1
+
+        # A fin 2m out, 0.5m to the side: inside the widening wedge
+        self.assertTrue(hit(((0.5, 0.3, -1), (0.6, 2.0, 1)), o, d))
+        # The same fin, but only 0.3m out: outside it
+        self.assertFalse(hit(((0.5, 0.25, -1), (0.6, 0.3, 1)), o, d))
+        # The host wall and the reveal itself, flush with the wall face
+        self.assertFalse(hit(((-5, -0.5, -5), (5, 0.2, 5)), o, d))
+        # On the other side of the window, or not level with the side's midpoint
+        self.assertFalse(hit(((-3, 0.3, -1), (-2, 2.0, 1)), o, d))
+        self.assertFalse(hit(((0.5, 0.3, 2), (0.6, 2.0, 3)), o, d))
+
+    def test_average_reveal(self):
+        average = LBT2PH.shading_geometry.average_reveal
+
+        o_reveal, d_reveal = average([(0.2, 0.1), (0.4, 0.3)])
+        self.assertAlmostEqual(o_reveal, 0.3)
+        self.assertAlmostEqual(d_reveal, 0.2)
+        # Only one side finds a reveal: use just that side, don't fail on the other's None
+        self.assertEqual(average([(0.2, 0.1), None]), (0.2, 0.1))
+        self.assertEqual(average([None, (0.4, 0.3)]), (0.4, 0.3))
+        self.assertEqual(average([None, None]), (None, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
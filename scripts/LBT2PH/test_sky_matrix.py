@@ -0,0 +1,61 @@
+import math
+import unittest
+
+import LBT2PH.sky_matrix
+
+
+class Test_sky_matrix(unittest.TestCase):
+    def setUp(self):
+        self.vectors = [(1, 0, 0), (0, 1, 0), (0, 0, 1)]
+        self.cache = LBT2PH.sky_matrix.SkyMatrixCache(_max_skies=2)
+        self.calls = []
+
+    def _base_vectors(self):
+        self.calls.append('dome')
+        return self.vectors
+
+    def _decode(self, _sky):
+        self.calls.append(_sky)
+        return LBT2PH.sky_matrix.DecodedSky(0.0, 3, LBT2PH.sky_matrix.total_radiation(_sky, _sky))
+
+    def test_rotate_xy(self):
+        flat = LBT2PH.sky_matrix.rotate_xy(self.vectors, 90)
+        expected = [(0, 1, 0), (-1, 0, 0), (0, 0, 1)]
+        for vec, exp in zip(LBT2PH.sky_matrix.iter_xyz(flat), expected):
+            for a, b in zip(vec, exp):
+                self.assertAlmostEqual(a, b)
+
+    def test_dome_key(self):
+        self.assertEqual(LBT2PH.sky_matrix.dome_key(145, -90), (145, 270.0))
+        self.assertEqual(LBT2PH.sky_matrix.dome_key(145, 360.0000000001), (145, 0.0))
+
+    def test_dome_vectors_cached(self):
+        a = self.cache.dome_vectors(145, 30, self._base_vectors)
+        b = self.cache.dome_vectors(145, 390, self._base_vectors)
+        c = self.cache.dome_vectors(145, 45, self._base_vectors)
+
+        self.assertIs(a, b)
+        self.assertIsNot(a, c)
+        self.assertEqual(self.calls, ['dome', 'dome'])
+        self.assertAlmostEqual(a[0], math.cos(math.radians(30)))
+
+    def test_skies_cached_by_identity(self):
+        winter, summer, other = [1.0, 2.0, 3.0], [1.0, 2.0, 3.0], [4.0, 5.0, 6.0]
+        first = self.cache.sky(winter, self._decode)
+        self.assertIs(self.cache.sky(winter, self._decode), first)
+        self.assertEqual(list(first.total_sky_rad), [2.0, 4.0, 6.0])
+
+        # Equal, but a different sky object
+        self.cache.sky(summer, self._decode)
+        self.assertEqual(len(self.calls), 2)
+
+        # Over the limit, the least recently used (winter) is dropped
+        self.cache.sky(other, self._decode)
+        self.cache.sky(summer, self._decode)
+        self.cache.sky(winter, self._decode)
+        self.assertEqual(len(self.calls), 4)
+        self.assertEqual(self.cache.hits, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import os
+import random
+import time
+import unittest
+
+import LBT2PH.spatial
+
+
+def _random_boxes(rand, n, extent=100.0, size=3.0):
+    boxes = []
+    for _ in range(n):
+        lo = tuple(rand.uniform(-extent, extent) for _ in range(3))
+        hi = tuple(c + rand.uniform(0.1, size) for c in lo)
+        boxes.append((lo, hi))
+    return boxes
+
+
+def _window_queries(rand, extent=100.0, reach=99.0):
+    """The test lines / surfaces of one window, as in shading.calc_shading_dims_simple """
+    origin = tuple(rand.uniform(-extent, extent) for _ in range(3))
+    normal = rand.choice([(1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0)])
+    up = (0, 0, reach)
+    out = tuple(c * reach for c in normal)
+    side = (normal[1] * reach, -normal[0] * reach, 0)
+    end = lambda v: tuple(o + c for o, c in zip(origin, v))
+    segments = [(origin, end(out)), (origin, end(side)), (origin, end(tuple(-c for c in side)))]
+    surfaces = [(origin, out, up), (origin, tuple(c * 0.6 / reach for c in out), up)]
+    return segments, surfaces
+
+
+class Test_box_tree(unittest.TestCase):
+    def setUp(self):
+        rand = random.Random(11)
+        self.boxes = _random_boxes(rand, 400)
+        self.queries = [_window_queries(rand) for _ in range(20)]
+        self.tree = LBT2PH.spatial.BoxTree(self.boxes)
+
+    def test_matches_brute_force(self):
+        for segments, surfaces in self.queries:
+            for start, end in segments:
+                expected = [i for i, box in enumerate(self.boxes)
+                            if LBT2PH.spatial.segment_hits_box(start, end, box, 0.01)]
+                self.assertEqual(self.tree.query_segment(start, end, 0.01), expected)
+
+            for origin, edge_a, edge_b in surfaces:
+                expected = [i for i, box in enumerate(self.boxes)
+                            if LBT2PH.spatial.parallelogram_hits_box(origin, edge_a, edge_b, box, 0.01)]
+                self.assertEqual(self.tree.query_parallelogram(origin, edge_a, edge_b, 0.01), expected)
+
+    def test_query_box(self):
+        box = ((0, 0, 0), (10, 10, 10))
+        expected = [i for i, b in enumerate(self.boxes) if LBT2PH.spatial.boxes_overlap(box, b)]
+        self.assertEqual(self.tree.query_box(box), expected)
+
+    def test_segment_and_parallelogram_tests(self):
+        box = ((0, 0, 0), (1, 1, 1))
+        self.assertTrue(LBT2PH.spatial.segment_hits_box((-1, 0.5, 0.5), (2, 0.5, 0.5), box))
+        self.assertFalse(LBT2PH.spatial.segment_hits_box((-1, 2, 0.5), (2, 2, 0.5), box))
+        self.assertFalse(LBT2PH.spatial.segment_hits_box((-3, 0.5, 0.5), (-2, 0.5, 0.5), box))
+
+        # A vertical plane at x=0.5 cuts the box, one at x=2 does not
+        self.assertTrue(LBT2PH.spatial.parallelogram_hits_box((0.5, -5, -5), (0, 10, 0), (0, 0, 10), box))
+        self.assertFalse(LBT2PH.spatial.parallelogram_hits_box((2, -5, -5), (0, 10, 0), (0, 0, 10), box))
+
+    def test_empty(self):
+        self.assertEqual(LBT2PH.spatial.BoxTree([]).query_box(((0, 0, 0), (1, 1, 1))), [])
+
+
+def _square(x, y, size=1.0):
+    return [(x, y), (x + size, y), (x + size, y + size), (x, y + size)]
+
+
+class Test_polygons_touch(unittest.TestCase):
+    def test_shared_edge(self):
+        self.assertTrue(LBT2PH.spatial.polygons_touch(_square(0, 0), _square(1, 0), 0.01))
+        self.assertTrue(LBT2PH.spatial.polygons_touch(_square(0, 0), _square(1, 0.5), 0.01))
+
+    def test_corner_only(self):
+        self.assertFalse(LBT2PH.spatial.polygons_touch(_square(0, 0), _square(1, 1), 0.01))
+
+    def test_apart(self):
+        self.assertFalse(LBT2PH.spatial.polygons_touch(_square(0, 0), _square(1.1, 0), 0.01))
+        self.assertTrue(LBT2PH.spatial.polygons_touch(_square(0, 0), _square(1.005, 0), 0.01))
+
+    def test_overlap_and_inside(self):
+        self.assertTrue(LBT2PH.spatial.polygons_touch(_square(0, 0), _square(0.5, 0.5), 0.01))
+        self.assertTrue(LBT2PH.spatial.polygons_touch(_square(0, 0, 3), _square(1, 1), 0.01))
+        self.assertTrue(LBT2PH.spatial.polygons_touch(_square(1, 1), _square(0, 0, 3), 0.01))
+
+    def test_candidate_pairs_on_a_grid(self):
+        squares = [_square(x, y) for x in range(10) for y in range(10)]
+        boxes = [LBT2PH.spatial.bounding_box(sq) for sq in squares]
+        touching = [(i, j) for i, j in LBT2PH.spatial.overlapping_pairs(boxes, 0.01)
+                    if LBT2PH.spatial.polygons_touch(squares[i], squares[j], 0.01)]
+
+        # Each of the 10 rows and 10 columns has 9 shared edges
+        self.assertEqual(len(touching), 2 * 10 * 9)
+
+
+@unittest.skipUnless(os.environ.get('LBT2PH_BENCHMARK'), 'Set LBT2PH_BENCHMARK=1 to run the benchmarks')
+class Benchmark_box_tree(unittest.TestCase):
+    def test_500_windows_2000_objects(self):
+        """The number of (expensive) Brep intersections needed: brute force vs. the index """
+
+        rand = random.Random(5)
+        boxes = _random_boxes(rand, 2000)
+        windows = [_window_queries(rand) for _ in range(500)]
+
+        start = time.time()
+        tree = LBT2PH.spatial.BoxTree(boxes)
+        build_time = time.time() - start
+
+        start = time.time()
+        candidates = 0
+        for segments, surfaces in windows:
+            for seg_start, seg_end in segments:
+                candidates += len(tree.query_segment(seg_start, seg_end, 0.01))
+            for origin, edge_a, edge_b in surfaces:
+                candidates += len(tree.query_parallelogram(origin, edge_a, edge_b, 0.01))
+        query_time = time.time() - start
+
+        brute_force = 500 * 5 * 2000
+        print('\n500 windows x 2,000 objects: build {:.2f}s | queries {:.2f}s | '
+              'intersections {:,} (brute force {:,})'.format(build_time, query_time, candidates, brute_force))
+        self.assertLess(candidates, brute_force / 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+import LBT2PH.tfa_groups
+
+
+def _square(x, y, size=1.0):
+    return [(x, y), (x + size, y), (x + size, y + size), (x, y + size)]
+
+
+class Test_tfa_groups(unittest.TestCase):
+    def test_group_connected_is_order_independent(self):
+        keys = [11, 12, 13, 14, 15]
+        pairs = [(13, 14), (11, 13), (14, 13), (15, 15), (12, 99)]
+        groups = LBT2PH.tfa_groups.group_connected(keys, pairs)
+        self.assertEqual(groups, [[11, 13, 14], [12], [15]])
+
+        groups = LBT2PH.tfa_groups.group_connected(keys, list(reversed(pairs)))
+        self.assertEqual(groups, [[11, 13, 14], [12], [15]])
+
+    def test_weighted_mean(self):
+        self.assertAlmostEqual(LBT2PH.tfa_groups.weighted_mean([10, 20], [3, 1]), 12.5)
+        self.assertAlmostEqual(LBT2PH.tfa_groups.weighted_mean([10, None, 20], [1, 5, 1]), 15.0)
+        self.assertAlmostEqual(LBT2PH.tfa_groups.weighted_mean([10, 20], [0, None]), 15.0)
+        self.assertIsNone(LBT2PH.tfa_groups.weighted_mean([None], [1]))
+
+    def test_dominant_value(self):
+        value, values = LBT2PH.tfa_groups.dominant_value(['b', 'a', 'b', None, ''], [1, 3, 1, 9, 9])
+        self.assertEqual(value, 'a')
+        self.assertEqual(values, ['a', 'b'])
+
+        self.assertEqual(LBT2PH.tfa_groups.dominant_value(['b', 'a'], [2, 2])[0], 'a')
+        self.assertEqual(LBT2PH.tfa_groups.dominant_value([None], [1]), (None, []))
+
+    def test_union_outlines(self):
+        boundary, holes = LBT2PH.tfa_groups.union_outlines([_square(0, 0), _square(1, 0), _square(1, 1)], 0.001)
+        self.assertEqual(len(boundary), 6)
+        self.assertEqual(holes, [])
+
+    def test_union_outlines_with_a_hole(self):
+        ring = [_square(x, y) for x in range(3) for y in range(3) if (x, y) != (1, 1)]
+        boundary, holes = LBT2PH.tfa_groups.union_outlines(ring, 0.001)
+        self.assertEqual(len(holes), 1)
+
+    def test_union_outlines_apart(self):
+        self.assertIsNone(LBT2PH.tfa_groups.union_outlines([_square(0, 0), _square(5, 0)], 0.001))
+
+
+if __name__ == '__main__':
+    unittest.main()
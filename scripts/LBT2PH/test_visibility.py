@@ -0,0 +1,68 @@
+import json
+import random
+import unittest
+
+import LBT2PH.radiation
+import LBT2PH.visibility
+
+
+class Test_visibility(unittest.TestCase):
+    def setUp(self):
+        rand = random.Random(3)
+        self.sky_vecs = [(rand.uniform(-1, 1), rand.uniform(-1, 1), rand.uniform(0.05, 1)) for _ in range(21)]
+        self.normals = [(0, -1, 0)] * 4 + [(0, -0.8, 0.6)] * 3
+        self.areas = [0.25] * 7
+        self.sky_rads = [[rand.uniform(0, 100) for _ in self.sky_vecs] for _ in range(12)]
+
+        cos = LBT2PH.radiation.unshaded_matrix(self.normals, self.sky_vecs)
+        self.int_matrix = [[1 if c > 0 and rand.random() > 0.3 else 0 for c in row] for row in cos]
+        self.visibility = LBT2PH.visibility.VisibilityMatrix.from_int_matrix(
+            self.int_matrix, self.normals, self.areas, (21, 0.0))
+
+    def test_pack_unpack(self):
+        self.assertEqual(len(self.visibility.bits), 7 * 3)
+
+        unpacked = LBT2PH.visibility.unpack_bits(self.visibility.bits, 7, 21)
+        self.assertEqual([[int(v) for v in row] for row in unpacked], self.int_matrix)
+
+    def test_matches_ray_cast_radiation(self):
+        # Same as a full (ray-cast) solve with each sky, via the relative matrix
+        cos = LBT2PH.radiation.unshaded_matrix(self.normals, self.sky_vecs)
+        rel = [[c if v else 0.0 for c, v in zip(c_row, v_row)] for c_row, v_row in zip(cos, self.int_matrix)]
+
+        results = self.visibility.radiation(self.sky_vecs, self.sky_rads)
+        self.assertEqual(len(results), 12)
+        for sky_rad, (shaded, unshaded) in zip(self.sky_rads, results):
+            expected = LBT2PH.radiation.window_radiation(rel, sky_rad, self.areas)
+            self.assertAlmostEqual(shaded.total_kWh, expected.total_kWh)
+
+        for factor in self.visibility.shading_factors(self.sky_vecs, self.sky_rads):
+            self.assertTrue(0.0 <= factor <= 1.0)
+
+    def test_without_numpy(self):
+        expected = self.visibility.shading_factors(self.sky_vecs, self.sky_rads)
+
+        np = LBT2PH.visibility.np
+        rad_np = LBT2PH.radiation.np
+        LBT2PH.visibility.np = LBT2PH.radiation.np = None
+        try:
+            result = self.visibility.shading_factors(self.sky_vecs, self.sky_rads)
+        finally:
+            LBT2PH.visibility.np = np
+            LBT2PH.radiation.np = rad_np
+
+        for a, b in zip(result, expected):
+            self.assertAlmostEqual(a, b)
+
+    def test_to_from_dict(self):
+        d = json.loads(json.dumps(self.visibility.to_dict()))
+        new_obj = LBT2PH.visibility.VisibilityMatrix.from_dict(d)
+
+        self.assertEqual(new_obj.bits, self.visibility.bits)
+        self.assertEqual(new_obj.dome_key, (21, 0.0))
+        self.assertEqual(new_obj.shading_factors(self.sky_vecs, self.sky_rads),
+                         self.visibility.shading_factors(self.sky_vecs, self.sky_rads))
+
+
+if __name__ == '__main__':
+    unittest.main()
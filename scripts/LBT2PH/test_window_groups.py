@@ -0,0 +1,38 @@
+import unittest
+
+import LBT2PH.window_groups
+
+
+class Test_window_groups(unittest.TestCase):
+    def test_groups_within_tolerance(self):
+        items = [
+            ('a', [1.2, 1.5], 1),
+            ('a', [1.2004, 1.4996], 1),
+            ('a', [1.2, 1.6], 1),
+            ('b', [1.2, 1.5], 1),
+            ('a', [1.2, 1.5], 2),
+            ]
+        groups = LBT2PH.window_groups.group_windows(items, 0.001)
+
+        self.assertEqual([g.members for g in groups], [[0, 1, 4], [2], [3]])
+        self.assertEqual([g.quantity for g in groups], [4, 1, 1])
+
+    def test_order_of_first_appearance(self):
+        items = [('b', [1.0], 1), ('a', [1.0], 1), ('b', [1.0], 1)]
+        groups = LBT2PH.window_groups.group_windows(items)
+        self.assertEqual([g.index for g in groups], [0, 1])
+
+    def test_different_lengths_never_match(self):
+        items = [('a', [1.0], 1), ('a', [1.0, 2.0], 1)]
+        self.assertEqual(len(LBT2PH.window_groups.group_windows(items)), 2)
+
+    def test_report(self):
+        items = [('a', [1.0], 1), ('b', [1.0], 1), ('a', [1.0], 1)]
+        groups = LBT2PH.window_groups.group_windows(items)
+        report = LBT2PH.window_groups.group_report(groups, ['w1', 'w2', 'w3'], 24)
+
+        self.assertEqual(report, [('w1', 24, 'w1', 2), ('w2', 25, 'w2', 1), ('w3', 24, 'w1', 2)])
+
+
+if __name__ == '__main__':
+    unittest.main()
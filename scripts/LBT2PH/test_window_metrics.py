@@ -0,0 +1,78 @@
+import unittest
+
+import LBT2PH.window_metrics
+
+
+def _spec(_width=1.2, _height=1.5, _frame_width=0.1, _installs=(1, 1, 1, 1)):
+    return LBT2PH.window_metrics.WindowSpec(
+        [_height, _height, _width, _width], _width * _height, [_frame_width] * 4,
+        [1.0, 1.0, 1.2, 1.2], [0.04] * 4, [0.03] * 4, list(_installs), 0.7)
+
+
+class Test_window_metrics(unittest.TestCase):
+    def test_single_window(self):
+        m = LBT2PH.window_metrics.window_metrics([_spec()])[0]
+
+        self.assertAlmostEqual(m.width, 1.2)
+        self.assertAlmostEqual(m.height, 1.5)
+        self.assertAlmostEqual(m.glazing_area, 1.3 * 1.0)
+        self.assertAlmostEqual(m.glazing_area + m.frame_area, m.window_area)
+        self.assertAlmostEqual(m.glazing_fraction, 1.3 / 1.8)
+
+        # Frame areas: each side's edge * width, less half its shared corners
+        frame_hl = (1.5 * 0.1 - 0.01) * 1.0 * 2 + (1.2 * 0.1 - 0.01) * 1.2 * 2
+        heat_loss = 1.3 * 0.7 + frame_hl + (1.3 + 1.3 + 1.0 + 1.0) * 0.04 + 5.4 * 0.03
+        self.assertAlmostEqual(m.u_w_installed, heat_loss / 1.8)
+
+    def test_installs_off(self):
+        on, off = LBT2PH.window_metrics.window_metrics([_spec(), _spec(_installs=(0, 0, 1, 0))])
+        self.assertAlmostEqual((on.u_w_installed - off.u_w_installed) * 1.8, (1.5 + 1.5 + 1.2) * 0.03)
+
+    def test_no_area(self):
+        m = LBT2PH.window_metrics.window_metrics([_spec(_width=0.0)])[0]
+        self.assertIsNone(m.u_w_installed)
+        self.assertIsNone(m.glazing_fraction)
+
+    def test_fallback_matches_numpy(self):
+        specs = [_spec(), _spec(2.0, 0.8, 0.12), _spec(_installs=(0, 1, 0, 1)), _spec(_width=0.0)]
+        batch = LBT2PH.window_metrics.window_metrics(specs)
+
+        np = LBT2PH.window_metrics.np
+        try:
+            LBT2PH.window_metrics.np = None
+            single = LBT2PH.window_metrics.window_metrics(specs)
+        finally:
+            LBT2PH.window_metrics.np = np
+
+        for a, b in zip(batch, single):
+            for va, vb in zip(a, b):
+                if va is None or vb is None:
+                    self.assertEqual(va, vb)
+                elif isinstance(va, tuple):
+                    for x, y in zip(va, vb):
+                        self.assertAlmostEqual(x, y)
+                else:
+                    self.assertAlmostEqual(va, vb)
+
+    def test_glazing_geometry_used(self):
+        spec = _spec()._replace(glazing_area=1.25, glazing_edge_lengths=[1.3, 1.2, 1.0, 1.0])
+        exact, simple = LBT2PH.window_metrics.window_metrics([spec, _spec()])
+
+        self.assertAlmostEqual(exact.glazing_area, 1.25)
+        self.assertEqual(exact.glazing_edge_lengths, (1.3, 1.2, 1.0, 1.0))
+        self.assertAlmostEqual((simple.u_w_installed - exact.u_w_installed) * 1.8, 0.05 * 0.7 + 0.1 * 0.04)
+
+        np = LBT2PH.window_metrics.np
+        try:
+            LBT2PH.window_metrics.np = None
+            single = LBT2PH.window_metrics.window_metrics([spec])[0]
+        finally:
+            LBT2PH.window_metrics.np = np
+        self.assertAlmostEqual(single.u_w_installed, exact.u_w_installed)
+
+    def test_empty(self):
+        self.assertEqual(LBT2PH.window_metrics.window_metrics([]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+"""Joins the TFA surfaces which touch each other into single surfaces.
+
+Touching surfaces are grouped with a union-find, so the groups do not depend on
+the input order. Each group's outlines are joined with a 2D polygon union, and
+its parameters weighted by each surface's area.
+"""
+
+try:
+    from itertools import izip
+except ImportError:  # Python 3
+    izip = zip
+
+try:
+    from ladybug_geometry.geometry2d.pointvector import Point2D
+    from ladybug_geometry.geometry2d.polygon import Polygon2D
+except ImportError as e:
+    raise ImportError('\nFailed to import ladybug_geometry:\n\t{}'.format(e))
+
+import LBT2PH.spatial
+import LBT2PH.footprint
+
+
+def group_connected(_keys, _pairs):
+    """Groups the keys which are connected (directly or through others) by the pairs
+
+    Arguments:
+        _keys: (list) Any hashable keys, ie: surface ids
+        _pairs: (list: tuple) The (key, key) pairs which touch. Keys which are
+            not in _keys are ignored.
+    Returns:
+        (list: list) The groups of keys, each in the order of _keys. The groups are
+            in the order of their first key.
+    """
+
+    uf = LBT2PH.spatial.UnionFind(_keys)
+    keys = set(_keys)
+    for a, b in _pairs:
+        if a in keys and b in keys:
+            uf.union(a, b)
+    return uf.groups()
+
+
+def weighted_mean(_values, _weights):
+    """The weighted mean of the values, ignoring any None values
+
+    If all the weights are 0 (or None), the plain mean is used instead. Returns
+    None if there are no values at all.
+    """
+
+    pairs = [(float(v), float(w or 0)) for v, w in izip(_values, _weights) if v is not None]
+    if not pairs:
+        return None
+
+    total_weight = sum(w for _, w in pairs)
+    if total_weight <= 0:
+        return sum(v for v, _ in pairs) / len(pairs)
+    return sum(v * w for v, w in pairs) / total_weight
+
+
+def dominant_value(_values, _weights):
+    """The value with the most total weight, ignoring empty / None values
+
+    Arguments:
+        _values: (list) The values, ie: the non-res usage type of each surface
+        _weights: (list: float) The weight (ie: area) of each
+    Returns:
+        (tuple):
+            value: The value with the largest total weight (ties go to the lowest
+                value), or None if there are no values.
+            values: (list) All the different values found, sorted
+    """
+
+    totals = {}
+    for value, weight in izip(_values, _weights):
+        if value:
+            totals[value] = totals.get(value, 0.0) + float(weight or 0)
+
+    values = sorted(totals)
+    if not values:
+        return None, []
+
+    best = values[0]
+    for value in values:
+        if totals[value] > totals[best]:
+            best = value
+    return best, values
+
+
+def union_outlines(_outlines, _tolerance=0.001):
+    """Joins the 2D outlines into a single outline (with any holes) in one union
+
+    Arguments:
+        _outlines: (list: list) The (x, y) points of each outline
+        _tolerance: (float)
+    Returns:
+        (tuple) boundary, holes: The (x, y) points of the joined outline and of each
+            hole in it. Or None if the outlines don't join into a single outline.
+    """
+
+    polygons = []
+    for outline in _outlines:
+        polygon = Polygon2D([Point2D(pt[0], pt[1]) for pt in outline])
+        if polygon.is_clockwise:
+            polygon = polygon.reverse()
+        polygons.append(polygon)
+
+    if len(polygons) == 1:
+        result = polygons
+    else:
+        result = Polygon2D.boolean_union_all(polygons, _tolerance)
+    if not result:
+        return None
+
+    groups = LBT2PH.footprint.group_boundaries_and_holes(result)
+    if len(groups) != 1:
+        return None
+
+    boundary, holes = groups[0]
+    to_points = lambda polygon: [(pt.x, pt.y) for pt in polygon.vertices]
+    return to_points(boundary), [to_points(hole) for hole in holes]
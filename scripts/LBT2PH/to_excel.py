@@ -7,9 +7,13 @@ from System import Object
 
 import LBT2PH
 import LBT2PH.dhw
+import LBT2PH.windows
+import LBT2PH.window_groups
 
 reload( LBT2PH )
 reload( LBT2PH.dhw )
+reload( LBT2PH.windows )
+reload( LBT2PH.window_groups )
 
 class PHPP_XL_Obj:
     """ A holder for an Excel writable datapoint with a worksheet, range and value """
@@ -385,13 +389,97 @@ def build_areas(_surfaces, _hb_room_names, _uValueUIDs):
     areasList.append( PHPP_XL_Obj('Areas', 'L19', 'Suspended Floor') )
     return areasList, surfacesIncluded
 
+WINDOWS_ROW_START = 24
+
+def _window_group_key(_window, _metrics):
+    """ The (exact key, numbers) used to find matching windows. See LBT2PH.window_groups """
+    
+    frame = _window.frame
+    glazing = _window.glazing
+    normal = _window.aperture.normal
+    
+    exact = [_window.host_surface, _window.variant_type, frame.name, glazing.display_name,
+            tuple(_window.installs.values_as_list)]
+    numbers = [_metrics.width, _metrics.height, normal.x, normal.y, normal.z,
+            float(_window.install_depth or 0), glazing.gValue, glazing.uValue]
+    numbers.extend(frame.uValues)
+    numbers.extend(frame.frameWidths)
+    numbers.extend(frame.PsiGVals)
+    numbers.extend(frame.PsiInstalls)
+    
+    # Shading: either the dimensions or the factors are written out, see build_shading()
+    shading_dims = _window.shading_dimensions
+    if shading_dims:
+        dims = (shading_dims.horizon.h_hori, shading_dims.horizon.d_hori,
+                shading_dims.reveal.o_reveal, shading_dims.reveal.d_reveal,
+                shading_dims.overhang.o_over, shading_dims.overhang.d_over)
+        exact.append( tuple(d is None for d in dims) )
+        numbers.extend( float(d or 0) for d in dims )
+    else:
+        exact.append( None )
+        numbers.extend( [_window.shading_factor_winter, _window.shading_factor_summer] )
+    
+    # Monthly (period) factors aren't written out, but are kept on the row's window
+    monthly = _window.shading_factors_monthly or []
+    exact.append( tuple(f is None for f in monthly) )
+    numbers.extend( float(f or 0) for f in monthly )
+    
+    return tuple(exact), numbers
+
+def aggregate_windows(_inputBranch, _surfacesIncluded, _tolerance=0.001):
+    """ Collapses matching windows into a single window (row) with the total quantity
+    
+    Windows match if their host surface, variant, frame, glazing and install
+    conditions are the same, and their size, orientation, install depth and
+    shading (including any monthly shading factors) all match within the tolerance. Only the windows on the included
+    surfaces are used.
+    
+    Args:
+        _inputBranch (list: PHPP_Window): All the PHPP-Style window objects
+        _surfacesIncluded (list: str): The names of the included host surfaces
+        _tolerance (float): The most any of the sizes, factors, etc. may differ by
+    Returns:
+        (tuple):
+            windows (list: PHPP_Window): One window for each group: a copy of the group's
+                first window, with the group's total 'quantity'. The input windows are
+                not changed. Pass these to build_windows() and build_shading().
+            report (list: str): For each original window, which 'Windows' row it is written to
+    """
+    
+    windows = [w for w in _inputBranch if w.host_surface in _surfacesIncluded]
+    all_metrics = LBT2PH.windows.calc_window_metrics(windows)
+    
+    items = []
+    for window, metrics in zip(windows, all_metrics):
+        exact, numbers = _window_group_key(window, metrics)
+        items.append( (exact, numbers, window.quantity or 1) )
+    
+    groups = LBT2PH.window_groups.group_windows(items, _tolerance)
+    names = [w.name for w in windows]
+    
+    grouped_windows = []
+    for group in groups:
+        window = windows[group.index].duplicate()
+        window.quantity = group.quantity
+        grouped_windows.append( window )
+    
+    report = []
+    for name, row, row_name, quantity in LBT2PH.window_groups.group_report(groups, names, WINDOWS_ROW_START):
+        report.append( '{} -> Windows row {}: {} (x{})'.format(name, row, row_name, quantity) )
+    
+    return grouped_windows, report
+
 def build_windows(_inputBranch, _surfacesIncluded, _srfcBranch):
-    windowsRowStart = 24
+    windowsRowStart = WINDOWS_ROW_START
     windowsCount = 0
     winSurfacesList = []
 
     print("Creating the 'Windows' Objects...")
-    for window in _inputBranch:
+    
+    # Work out the sizes (and U-W-Installed) of all the windows in one go
+    all_metrics = LBT2PH.windows.calc_window_metrics(_inputBranch)
+    
+    for window, metrics in zip(_inputBranch, all_metrics):
         # for each Window Surface Object in the model....
         # Get the window's basic params
         # print '>>>', window
@@ -399,8 +487,8 @@ def build_windows(_inputBranch, _surfacesIncluded, _srfcBranch):
         # print json.dumps(window.to_dict(), indent=4)
         quant = window.quantity
         nm = window.name
-        w = window.width
-        h = window.height
+        w = metrics.width
+        h = metrics.height
         host = window.host_surface
         glassType = window.glazing
         frameType = window.frame
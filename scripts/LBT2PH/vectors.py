@@ -0,0 +1,43 @@
+"""Small helpers for working with points / vectors as plain tuples.
+
+Ladybug, Rhino and plain (x, y, z) tuples all come into the pure-Python
+modules (radiation, occlusion, spatial...), so they are all turned into
+tuples first.
+"""
+
+import math
+
+
+def xyz(_vec):
+    """Vector-like (Ladybug, Rhino or tuple) to an (x, y, z) tuple of floats """
+
+    try:
+        return (float(_vec.x), float(_vec.y), float(_vec.z))
+    except AttributeError:
+        try:
+            return (float(_vec.X), float(_vec.Y), float(_vec.Z))
+        except AttributeError:
+            return tuple(float(v) for v in _vec)
+
+
+def unit(_vec):
+    """The tuple vector scaled to a length of 1. A zero-length vector gives all zeros """
+
+    length = math.sqrt(sum(c * c for c in _vec))
+    if length == 0:
+        return tuple(0.0 for _ in _vec)
+    return tuple(c / length for c in _vec)
+
+
+def as_tuple(_pt):
+    """Point-like (Ladybug 2D / 3D point, or tuple) to a tuple, without converting the values """
+
+    if isinstance(_pt, tuple):
+        return _pt
+    try:
+        return (_pt.x, _pt.y, _pt.z)
+    except AttributeError:
+        try:
+            return (_pt.x, _pt.y)
+        except AttributeError:
+            return tuple(_pt)
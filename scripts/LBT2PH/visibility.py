@@ -0,0 +1,144 @@
+"""Which sky patches each of a window's analysis points can see, packed one bit per patch.
+
+Visibility only depends on the geometry and the dome, not the sky's radiation,
+so once stored any number of skies on the same dome (monthly, custom periods...)
+can be applied to it without casting the rays again. Each point is a row of
+bytes, least-significant bit first.
+"""
+
+import base64
+from array import array
+
+try:
+    from itertools import izip
+except ImportError:  # Python 3
+    izip = zip
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import LBT2PH.radiation
+from LBT2PH.vectors import xyz
+
+
+def pack_bits(_int_matrix, _patch_count):
+    """Packs the (points x patches) 1 / 0 matrix into a bytearray, one row of bytes per point """
+
+    row_bytes = (_patch_count + 7) // 8
+    bits = bytearray(row_bytes * len(_int_matrix))
+    for i, row in enumerate(_int_matrix):
+        offset = i * row_bytes
+        for j, val in enumerate(row):
+            if val:
+                bits[offset + (j >> 3)] |= 1 << (j & 7)
+    return bits
+
+
+def unpack_bits(_bits, _point_count, _patch_count):
+    """Inverse of pack_bits(). Returns a numpy 2D bool array, or a list of lists of 1 / 0 """
+
+    row_bytes = (_patch_count + 7) // 8
+    if np is not None:
+        packed = np.frombuffer(bytes(_bits), dtype=np.uint8).reshape(_point_count, row_bytes)
+        # unpackbits() is most-significant bit first. Flip each byte's bits, rather than
+        # use bitorder='little', which needs NumPy 1.17+
+        unpacked = np.unpackbits(packed, axis=1).reshape(_point_count, row_bytes, 8)[:, :, ::-1]
+        return unpacked.reshape(_point_count, row_bytes * 8)[:, :_patch_count].astype(bool)
+
+    rows = []
+    for i in range(_point_count):
+        offset = i * row_bytes
+        rows.append([(_bits[offset + (j >> 3)] >> (j & 7)) & 1 for j in range(_patch_count)])
+    return rows
+
+
+class VisibilityMatrix(object):
+    """Which sky patches each of a window's analysis points can see
+
+    Arguments:
+        _bits: (bytearray) The packed visibility, see pack_bits()
+        _patch_count: (int) The number of sky patches
+        _normals: (list) The normal of each analysis point (tuples, or vectors)
+        _face_areas: (list: float) The area of each analysis face (one per point)
+        _dome_key: (tuple) The (number of patches, north angle) of the dome the
+            rays were cast to. Only skies on this same dome can be applied.
+    """
+
+    def __init__(self, _bits, _patch_count, _normals, _face_areas, _dome_key):
+        self.bits = bytearray(_bits)
+        self.patch_count = int(_patch_count)
+        self.normals = [xyz(v) for v in _normals]
+        self.face_areas = [float(a) for a in _face_areas]
+        self.dome_key = tuple(_dome_key)
+
+    @classmethod
+    def from_int_matrix(cls, _int_matrix, _normals, _face_areas, _dome_key):
+        """From the 1 / 0 matrix returned by the ray-casting (intersect_mesh_rays) """
+
+        patch_count = len(_int_matrix[0]) if len(_int_matrix) else int(_dome_key[0])
+        bits = pack_bits(_int_matrix, patch_count)
+        return cls(bits, patch_count, _normals, _face_areas, _dome_key)
+
+    @property
+    def point_count(self):
+        return len(self.normals)
+
+    def matrix(self, _sky_vecs):
+        """The dense (points x patches) relative matrix: visibility * cos(angle) """
+
+        cos_matrix = LBT2PH.radiation.unshaded_matrix(self.normals, _sky_vecs)
+        visible = unpack_bits(self.bits, self.point_count, self.patch_count)
+
+        if np is not None:
+            return cos_matrix * visible
+
+        return [array('d', [c if v else 0.0 for c, v in izip(cos_row, vis_row)])
+                for cos_row, vis_row in izip(cos_matrix, visible)]
+
+    def radiation(self, _sky_vecs, _sky_rads):
+        """The shaded and unshaded radiation on the window, for each sky
+
+        Arguments:
+            _sky_vecs: (list) The patch vectors of the dome. Must match the dome_key.
+            _sky_rads: (list: list: float) The patch radiation for each sky
+        Returns:
+            (list: tuple) For each sky, in order: (shaded, unshaded) LBT2PH.radiation.WindowRadiation
+        """
+
+        shaded = LBT2PH.radiation.window_radiation_multi(self.matrix(_sky_vecs), _sky_rads, self.face_areas)
+        cos_matrix = LBT2PH.radiation.unshaded_matrix(self.normals, _sky_vecs)
+        unshaded = LBT2PH.radiation.window_radiation_multi(cos_matrix, _sky_rads, self.face_areas)
+        return list(izip(shaded, unshaded))
+
+    def shading_factors(self, _sky_vecs, _sky_rads):
+        """The window's shading factor (shaded / unshaded radiation) for each sky. 1.0 if unshaded is 0 """
+
+        factors = []
+        for shaded, unshaded in self.radiation(_sky_vecs, _sky_rads):
+            if unshaded.total_kWh:
+                factors.append(shaded.total_kWh / unshaded.total_kWh)
+            else:
+                factors.append(1.0)
+        return factors
+
+    def to_dict(self):
+        d = {}
+
+        d.update( {'bits': base64.b64encode(bytes(self.bits)).decode('ascii')} )
+        d.update( {'patch_count': self.patch_count} )
+        d.update( {'normals': [list(v) for v in self.normals]} )
+        d.update( {'face_areas': self.face_areas} )
+        d.update( {'dome_key': list(self.dome_key)} )
+
+        return d
+
+    @classmethod
+    def from_dict(cls, _dict):
+        bits = bytearray(base64.b64decode(_dict['bits']))
+        return cls(bits, _dict['patch_count'], _dict['normals'], _dict['face_areas'], _dict['dome_key'])
+
+    def __repr__(self):
+        return "{}(point_count={!r}, patch_count={!r}, dome_key={!r})".format(
+            self.__class__.__name__, self.point_count, self.patch_count, self.dome_key)
@@ -0,0 +1,92 @@
+"""Groups matching windows, so each kind is written to the PHPP 'Windows' worksheet once, with its quantity.
+
+Windows must match exactly on their 'exact' key (host surface, frame, install
+conditions...) and within a tolerance on their numbers (sizes, orientation,
+shading...). Groups keep the order they are first found in, so the same model
+always gives the same rows.
+"""
+
+try:
+    from itertools import izip
+except ImportError:  # Python 3
+    izip = zip
+
+
+class WindowGroup(object):
+    """A set of matching windows, written to the PHPP as one row
+
+    Arguments:
+        _index: (int) The index of the group's first window. This is the one written out.
+        _exact: The group's exact key
+        _numbers: (tuple: float) The first window's numbers, which the others are compared to
+        _quantity: (int) The first window's quantity
+    """
+
+    def __init__(self, _index, _exact, _numbers, _quantity=1):
+        self.index = _index
+        self.exact = _exact
+        self.numbers = _numbers
+        self.members = [_index]
+        self.quantity = _quantity
+
+    def matches(self, _numbers, _tolerance):
+        return all(abs(a - b) <= _tolerance for a, b in izip(self.numbers, _numbers))
+
+    def add(self, _index, _quantity=1):
+        self.members.append(_index)
+        self.quantity += _quantity
+
+    def __len__(self):
+        return len(self.members)
+
+    def __repr__(self):
+        return "{}(_index={!r}, quantity={!r}, members={!r})".format(
+            self.__class__.__name__, self.index, self.quantity, self.members)
+
+
+def group_windows(_items, _tolerance=0.001):
+    """Groups the matching windows
+
+    Arguments:
+        _items: (list: tuple) For each window: (exact_key, numbers, quantity). The
+            exact_key must be hashable.
+        _tolerance: (float) The most any of the numbers may differ by
+    Returns:
+        (list: WindowGroup) The groups, in the order they were first found
+    """
+
+    groups = []
+    candidates = {}
+    for i, (exact, numbers, quantity) in enumerate(_items):
+        numbers = tuple(float(n) for n in numbers)
+        bucket = candidates.setdefault((exact, len(numbers)), [])
+
+        for group in bucket:
+            if group.matches(numbers, _tolerance):
+                group.add(i, quantity)
+                break
+        else:
+            group = WindowGroup(i, exact, numbers, quantity)
+            bucket.append(group)
+            groups.append(group)
+
+    return groups
+
+
+def group_report(_groups, _names, _first_row=0):
+    """Which row each original window ended up in
+
+    Arguments:
+        _groups: (list: WindowGroup) From group_windows()
+        _names: (list: str) The name of each original window
+        _first_row: (int) The row number of the first group
+    Returns:
+        (list: tuple) For each original window, in the original order:
+            (name, row, the name written in that row, the row's quantity)
+    """
+
+    report = [None] * len(_names)
+    for row, group in enumerate(_groups, _first_row):
+        for i in group.members:
+            report[i] = (_names[i], row, _names[group.index], group.quantity)
+    return report
@@ -0,0 +1,117 @@
+"""Window areas and U-W-Installed for many windows at once, following the PHPP 'Windows' worksheet.
+
+Each window is a WindowSpec of plain numbers, with its sides always in the order
+Left, Right, Bottom, Top. Uses NumPy, when it is available, to work out all the
+windows together.
+"""
+
+from collections import namedtuple
+
+try:
+    from itertools import izip
+except ImportError:  # Python 3
+    izip = zip
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+WindowSpec = namedtuple('WindowSpec', ['edge_lengths', 'window_area', 'frame_widths', 'frame_u_values',
+                                       'psi_glazing', 'psi_install', 'installs', 'u_glazing',
+                                       'glazing_area', 'glazing_edge_lengths'])
+WindowSpec.__new__.__defaults__ = (None, None)
+
+WindowMetrics = namedtuple('WindowMetrics', ['width', 'height', 'window_area', 'glazing_area',
+                                             'frame_area', 'glazing_fraction', 'glazing_edge_lengths',
+                                             'u_w_installed'])
+
+L, R, B, T = 0, 1, 2, 3
+
+
+def window_metrics(_specs):
+    """The metrics of each window
+
+    Arguments:
+        _specs: (list: WindowSpec) The windows
+    Returns:
+        (list: WindowMetrics) For each window, in order. The glazing_fraction and
+            u_w_installed are None for any window with no area.
+    """
+
+    specs = list(_specs)
+    if not specs:
+        return []
+
+    if np is None:
+        return [_single_window_metrics(spec) for spec in specs]
+
+    edges = np.array([s.edge_lengths for s in specs], dtype=float)
+    widths = np.array([s.frame_widths for s in specs], dtype=float)
+    u_frames = np.array([s.frame_u_values for s in specs], dtype=float)
+    psi_g = np.array([s.psi_glazing for s in specs], dtype=float)
+    psi_i = np.array([s.psi_install for s in specs], dtype=float)
+    installs = np.array([s.installs for s in specs], dtype=float)
+    window_areas = np.array([s.window_area for s in specs], dtype=float)
+    u_glazing = np.array([s.u_glazing for s in specs], dtype=float)
+
+    fL, fR, fB, fT = widths[:, L], widths[:, R], widths[:, B], widths[:, T]
+    glazing_edges = edges - np.column_stack((fT + fB, fT + fB, fL + fR, fL + fR))
+    glazing_areas = glazing_edges[:, L] * glazing_edges[:, B]
+    for i, s in enumerate(specs):
+        if s.glazing_edge_lengths is not None:
+            glazing_edges[i] = s.glazing_edge_lengths
+        if s.glazing_area is not None:
+            glazing_areas[i] = s.glazing_area
+
+    corner_areas = np.column_stack((fL * (fT + fB), fR * (fT + fB), fB * (fL + fR), fT * (fL + fR)))
+    frame_areas = edges * widths - 0.5 * corner_areas
+
+    heat_loss = (glazing_areas * u_glazing
+                 + (frame_areas * u_frames).sum(axis=1)
+                 + (glazing_edges * psi_g).sum(axis=1)
+                 + (edges * psi_i * installs).sum(axis=1))
+
+    has_area = window_areas != 0
+    safe_areas = np.where(has_area, window_areas, 1.0)
+    u_w = heat_loss / safe_areas
+    fractions = glazing_areas / safe_areas
+
+    results = []
+    for i in range(len(specs)):
+        results.append( WindowMetrics(
+            float(edges[i, T]), float(edges[i, L]), float(window_areas[i]),
+            float(glazing_areas[i]), float(frame_areas[i].sum()),
+            float(fractions[i]) if has_area[i] else None,
+            tuple(float(v) for v in glazing_edges[i]),
+            float(u_w[i]) if has_area[i] else None) )
+    return results
+
+
+def _single_window_metrics(_spec):
+    edges = [float(v) for v in _spec.edge_lengths]
+    fL, fR, fB, fT = [float(v) for v in _spec.frame_widths]
+    window_area = float(_spec.window_area)
+
+    glazing_edges = (edges[L] - fT - fB, edges[R] - fT - fB, edges[B] - fL - fR, edges[T] - fL - fR)
+    glazing_area = glazing_edges[L] * glazing_edges[B]
+    if _spec.glazing_edge_lengths is not None:
+        glazing_edges = tuple(float(v) for v in _spec.glazing_edge_lengths)
+    if _spec.glazing_area is not None:
+        glazing_area = float(_spec.glazing_area)
+
+    corner_areas = (fL * (fT + fB), fR * (fT + fB), fB * (fL + fR), fT * (fL + fR))
+    frame_areas = [e * w - 0.5 * ca for e, w, ca in izip(edges, (fL, fR, fB, fT), corner_areas)]
+
+    heat_loss = glazing_area * float(_spec.u_glazing)
+    heat_loss += sum(a * float(u) for a, u in izip(frame_areas, _spec.frame_u_values))
+    heat_loss += sum(e * float(psi) for e, psi in izip(glazing_edges, _spec.psi_glazing))
+    heat_loss += sum(e * float(psi) * float(i) for e, psi, i in izip(edges, _spec.psi_install, _spec.installs))
+
+    if window_area:
+        fraction, u_w = glazing_area / window_area, heat_loss / window_area
+    else:
+        fraction, u_w = None, None
+
+    return WindowMetrics(edges[T], edges[L], window_area, glazing_area, sum(frame_areas),
+                         fraction, glazing_edges, u_w)
@@ -1,7 +1,7 @@
 import rhinoscriptsyntax as rs
+import scriptcontext as sc
 import Rhino
 import ghpythonlib.components as ghc
-import json
 import math
 from collections import namedtuple
 from itertools import izip
@@ -10,9 +10,17 @@ from System import Object
 import LBT2PH
 import LBT2PH.helpers
 import LBT2PH.shading
+import LBT2PH.shading_cache
+import LBT2PH.glazing_geometry
+import LBT2PH.doc_library
+import LBT2PH.window_metrics
 
 reload(LBT2PH.helpers)
 reload( LBT2PH.shading )
+reload( LBT2PH.shading_cache )
+reload( LBT2PH.glazing_geometry )
+reload( LBT2PH.doc_library )
+reload( LBT2PH.window_metrics )
 
 try:  # import the core honeybee dependencies
     from ladybug_geometry.geometry3d.line import LineSegment3D
@@ -25,6 +33,11 @@ try:  # import the core honeybee dependencies
 except ImportError as e:
     raise ImportError('\nFailed to import honeybee:\n\t{}'.format(e))
 
+# Part of the derived geometry fingerprint. Bump this whenever the way the derived
+# geometry (edges, glazing surface...) is built changes, so any stored with an
+# older version is re-built instead of being restored.
+DERIVED_GEOMETRY_VERSION = 2
+
 #-------------------------------------------------------------------------------
 #-------------------------------------------------------------------------------
 class PHPP_Window(Object):
@@ -39,8 +52,14 @@ class PHPP_Window(Object):
         * '_glazing_edge_lengths'
         * '_window_edges'
         * '_glazing_surface'
+        * '_glazing'
+        * '_derived_key'
+        * '_derived_dicts'
+        * '_metrics'
+        * '_metrics_key'
         * '_shading_factor_winter'
         * '_shading_factor_summer'
+        * '_shading_factors_monthly'
         * 'shading_dimensions'
         * 'name'
         * 'frame'
@@ -50,7 +69,8 @@ class PHPP_Window(Object):
     '''
     __slots__ = ('quantity', 'aperture',
         '_tolerance', '_glazing_edge_lengths', '_window_edges', '_glazing_surface',
-        '_shading_factor_winter', '_shading_factor_summer', 'shading_dimensions',
+        '_glazing', '_derived_key', '_derived_dicts', '_metrics', '_metrics_key',
+        '_shading_factor_winter', '_shading_factor_summer', '_shading_factors_monthly', 'shading_dimensions',
         'name', 'frame', 'glazing', 'installs', 'install_depth', 'UD_glass_Name',
         'UD_frame_Name', 'variant_type' )
     
@@ -63,12 +83,18 @@ class PHPP_Window(Object):
         self._glazing_edge_lengths = None
         self._window_edges = None
         self._glazing_surface = None
+        self._glazing = None
+        self._derived_key = None
+        self._derived_dicts = None
+        self._metrics = None
+        self._metrics_key = None
         self.UD_glass_Name = None
         self.UD_frame_Name = None
         self.variant_type = None
         
         self._shading_factor_winter = None
         self._shading_factor_summer = None
+        self._shading_factors_monthly = None
         self.shading_dimensions = None
         
         self.frame = None
@@ -80,33 +106,100 @@ class PHPP_Window(Object):
     def name(self):
         return self.aperture.display_name
 
+    def _derived_geometry_key(self):
+        """Fingerprint of everything the derived geometry (edges, glazing surface...) is built from """
+        
+        geom = [(v.x, v.y, v.z) for v in self.aperture.geometry.vertices] if self.aperture else None
+        frame_widths = list(self.frame.frameWidths) if self.frame else None
+        
+        return LBT2PH.shading_cache.fingerprint(DERIVED_GEOMETRY_VERSION, geom, frame_widths,
+                                                self.install_depth, self._tolerance)
+
+    def _check_derived_geometry(self):
+        """Drops any derived geometry which no longer matches the aperture / frame / install depth
+        
+        Returns:
+            key: (str) The current derived geometry fingerprint
+        """
+        
+        key = self._derived_geometry_key()
+        if key != self._derived_key:
+            self._window_edges = None
+            self._glazing_edge_lengths = None
+            self._glazing_surface = None
+            self._glazing = None
+            self._derived_dicts = None
+            self._derived_key = key
+        
+        return key
+
+    def _stored_derived(self, _name):
+        """The stored (dict) version of some derived geometry from from_dict(), or None """
+        
+        if self._derived_dicts:
+            return self._derived_dicts.get(_name)
+        return None
+
     @property
     def window_edges(self):
         
+        self._check_derived_geometry()
         if self._window_edges:
             return self._window_edges
+        
+        stored = self._stored_derived('_window_edges')
+        if stored:
+            edges = self.Output(*(LineSegment3D.from_dict(stored[k]) for k in self.Output._fields))
+            self._window_edges = edges
+            return edges
         else:
             # First, try and use the simple Ladubug Veritcal / Horizontal methods
             # If that doesn't work for any reason, those methods return 'None'
             # If any are None, use the slower 'edges in order' method
-            result_verticals = self.aperture.geometry.get_left_right_vertical_edges(self._tolerance)
-            result_horizontals = self.aperture.geometry.get_top_bottom_horizontal_edges(self._tolerance)
+            result = LBT2PH.glazing_geometry.window_edges(self.aperture.geometry, self._tolerance)
             
-            if result_verticals and result_horizontals:
-                window_left, window_right = result_verticals
-                window_top, window_bottom = result_horizontals
-                edges = self.Output(window_left, window_right, window_bottom, window_top)    
+            if result:
+                edges = self.Output(*result)
             else:
                 edges = self._get_edges_in_order()
 
             self._window_edges = edges
             return edges
 
+    def _glazing_geometry(self):
+        """The exact glazing (LBT2PH.glazing_geometry.Glazing): the window outline inset by the frame
+        
+        Returns None if the frame is too wide for the window (or it is an odd shape).
+        """
+        
+        self._check_derived_geometry()
+        if self._glazing is None:
+            frame = self.frame
+            frame_widths = {'Left':frame.fLeft, 'Right':frame.fRight, 'Bottom':frame.fBottom, 'Top':frame.fTop}
+            glazing = LBT2PH.glazing_geometry.glazing_geometry(self.aperture.geometry, frame_widths,
+                            float(self.install_depth or 0), self._tolerance or 0.01)
+            self._glazing = glazing or False
+        return self._glazing or None
+
     @property
     def glazing_edge_lengths(self):
+        self._check_derived_geometry()
         if self._glazing_edge_lengths:
             return self._glazing_edge_lengths
+        
+        stored = self._stored_derived('_glazing_edge_lengths')
+        if stored:
+            edge_lens = self.Output(*stored)
+            self._glazing_edge_lengths = edge_lens
+            return edge_lens
+        
+        glazing = self._glazing_geometry()
+        if glazing:
+            edge_lens = self.Output(*(glazing.edge_lengths[k] for k in self.Output._fields))
+            self._glazing_edge_lengths = edge_lens
+            return edge_lens
         else:
+            # No inset glazing: use the window edges, less the frame widths at each end
             edges = self.window_edges
             frame = self.frame
 
@@ -121,9 +214,24 @@ class PHPP_Window(Object):
 
     @property
     def glazing_surface(self):
+        self._check_derived_geometry()
         if self._glazing_surface:
             return self._glazing_surface
+        
+        stored = self._stored_derived('_glazing_surface')
+        if stored:
+            srfc = from_face3d( Face3D.from_dict(stored) )
+            self._glazing_surface = srfc
+            return srfc
+        
+        # Exact 2D inset of the window outline by each side's frame width
+        glazing = self._glazing_geometry()
+        if glazing:
+            srfc = from_face3d( glazing.face )
+            self._glazing_surface = srfc
+            return srfc
         else:
+            # The frame is too wide for the window (or it is an odd shape). Try the Rhino offset.
             geom = self.inset_window_surface
 
             # Create the frame and instet surfaces
@@ -152,32 +260,48 @@ class PHPP_Window(Object):
             self._glazing_surface = srfc
             return srfc
 
-    @property
-    def u_w_installed(self):
+    def _metrics_spec(self):
+        """The window's edges, frame, glazing and install values as a LBT2PH.window_metrics.WindowSpec
+        
+        The glazing area and edge lengths are from the inset glazing geometry. If the
+        inset can't be done, they are left out and window_metrics works them out from
+        the window edges less the frame widths instead.
+        """
         
         frame = self.frame
-        glazing_edge_lens = self.glazing_edge_lengths
-        window_edges = self.window_edges
-        window_area = self.aperture.area
-        glazing_area = glazing_edge_lens.Left * glazing_edge_lens.Bottom
-        
-        # Correct for the corner overlap
-        corner_areas = []
-        corner_areas.append(frame.fLeft * frame.fTop + frame.fLeft * frame.fBottom)
-        corner_areas.append(frame.fRight* frame.fTop + frame.fRight * frame.fBottom)
-        corner_areas.append(frame.fLeft * frame.fBottom + frame.fRight * frame.fBottom)
-        corner_areas.append(frame.fLeft* frame.fTop + frame.fRight * frame.fTop)
-        frame_areas = ((e.length*w)-(0.5*ca) for e, w, ca in izip(window_edges, frame.frameWidths, corner_areas))
-
-        # Calc the heat-loss values for all the elements
-        hl_glazing = glazing_area * self.glazing.uValue
-        hl_frames = sum(a*u for a, u in izip(frame_areas, frame.uValues))
-        hl_glazing_edge = sum(e_len*psi_g for e_len, psi_g in izip(glazing_edge_lens, frame.PsiGVals))
-        hl_install_edge = sum(e.length*psi_i*i for e, psi_i, i in izip(window_edges, frame.PsiInstalls, self.installs))
-
-        u_w_installed = (hl_glazing + hl_frames + hl_glazing_edge + hl_install_edge) / window_area
-
-        return u_w_installed
+        glazing = self._glazing_geometry()
+        glazing_area = glazing.area if glazing else None
+        glazing_edge_lengths = list(self.glazing_edge_lengths) if glazing else None
+        
+        return LBT2PH.window_metrics.WindowSpec(
+                [e.length for e in self.window_edges], self.aperture.area, frame.frameWidths,
+                frame.uValues, frame.PsiGVals, frame.PsiInstalls, self.installs.values_as_list,
+                self.glazing.uValue, glazing_area, glazing_edge_lengths)
+
+    def _metrics_fingerprint(self):
+        """Fingerprint of everything the metrics (areas, U-W-Installed) are worked out from """
+        
+        return LBT2PH.shading_cache.fingerprint(self._check_derived_geometry(), self.aperture.area,
+                list(self.frame.uValues), list(self.frame.PsiGVals), list(self.frame.PsiInstalls),
+                self.installs.values_as_list, self.glazing.uValue)
+
+    @property
+    def metrics(self):
+        """The window's areas and U-W-Installed (LBT2PH.window_metrics.WindowMetrics)
+        
+        Worked out once and kept, until the window's geometry, frame, glazing or
+        installs change. Use calc_window_metrics() to work them out for many windows at once.
+        """
+        
+        key = self._metrics_fingerprint()
+        if self._metrics is None or key != self._metrics_key:
+            self._metrics = LBT2PH.window_metrics.window_metrics( [self._metrics_spec()] )[0]
+            self._metrics_key = key
+        return self._metrics
+
+    @property
+    def u_w_installed(self):
+        return self.metrics.u_w_installed
     
     @property
     def host_surface(self):
@@ -185,18 +309,12 @@ class PHPP_Window(Object):
 
     @property
     def height(self):
-        if not self._window_edges:
-            self.window_edges()
-        
-        left = self._window_edges.Left
+        left = self.window_edges.Left
         return left.length
 
     @property
     def width(self):
-        if not self._window_edges:
-            self.window_edges()
-
-        top = self._window_edges.Top
+        top = self.window_edges.Top
         return top.length
 
     @property
@@ -229,6 +347,26 @@ class PHPP_Window(Object):
             print(e)
             print('Shading Factor must be a number.')
 
+    @property
+    def shading_factors_monthly(self):
+        """The shading factor for each analysis period (ie: month), or None if not set """
+        
+        if self._shading_factors_monthly is None:
+            return None
+        return [float(f) if f is not None else None for f in self._shading_factors_monthly]
+
+    @shading_factors_monthly.setter
+    def shading_factors_monthly(self, _in):
+        if _in is None:
+            self._shading_factors_monthly = None
+            return
+        
+        try:
+            self._shading_factors_monthly = [float(f) if f is not None else None for f in _in]
+        except (ValueError, TypeError) as e:
+            print(e)
+            print('Shading Factors must be a list of numbers.')
+
     @property
     def rh_surface(self):
         """Get the LBT Aperture 'Face3d' as a Rhino surface"""
@@ -430,6 +568,15 @@ class PHPP_Window(Object):
             rh_line = from_linesegment3d(_LB_line_segment)
             return ghc.Extrude( rh_line, ghc.Amplitude(_direction, _extrudeDepth) )
 
+    def duplicate(self):
+        """A shallow copy. The aperture, frame, glazing, etc. objects are shared """
+        
+        new_obj = self.__class__()
+        for attr in self.__slots__:
+            setattr(new_obj, attr, getattr(self, attr))
+        
+        return new_obj
+
     def to_dict(self):
         d = {}
 
@@ -438,18 +585,28 @@ class PHPP_Window(Object):
         d.update( {'aperture':self.aperture.to_dict()} )
         d.update( {'_shading_factor_winter':self._shading_factor_winter } )
         d.update( {'_shading_factor_summer':self._shading_factor_summer} )
+        d.update( {'_shading_factors_monthly':self._shading_factors_monthly} )
         d.update( {'install_depth':self.install_depth} )
         d.update( {'variant_type':self.variant_type} )
 
-        _edges = {}
-        for k, v in self.window_edges._asdict().iteritems():
-            _edges.update( {k:v.to_dict()} )
+        # Derived geometry. Anything restored by from_dict() and still valid (same
+        # fingerprint) is written straight back out, without re-building it.
+        d.update( {'_derived_key':self._check_derived_geometry()} )
+        
+        _edges = self._stored_derived('_window_edges')
+        if self._window_edges or not _edges:
+            _edges = {}
+            for k, v in self.window_edges._asdict().iteritems():
+                _edges.update( {k:v.to_dict()} )
         d.update( {'_window_edges':_edges} )
-        d.update( {'_glazing_edge_lengths':self.glazing_edge_lengths})
+        d.update( {'_glazing_edge_lengths':list(self.glazing_edge_lengths)})
         
-        _glazing_srfc = to_face3d(self.glazing_surface)
+        _glazing_srfc = self._stored_derived('_glazing_surface')
+        if self._glazing_surface or not _glazing_srfc:
+            _glazing_srfc = to_face3d(self.glazing_surface)
+            _glazing_srfc = _glazing_srfc[0].to_dict() if _glazing_srfc else None
         if _glazing_srfc:
-            d.update( {'_glazing_surface':_glazing_srfc[0].to_dict()} )
+            d.update( {'_glazing_surface':_glazing_srfc} )
         
         if self.frame:
             d.update( {'_frame':self.frame.to_dict()} )
@@ -474,31 +631,19 @@ class PHPP_Window(Object):
         new_obj.aperture = Aperture.from_dict( _dict.get('aperture') )
         new_obj._shading_factor_winter =_dict.get('_shading_factor_winter')
         new_obj._shading_factor_summer =_dict.get('_shading_factor_summer')
-        new_obj._glazing_edge_lengths = _dict.get('_glazing_edge_lengths')
+        new_obj._shading_factors_monthly =_dict.get('_shading_factors_monthly')
         new_obj.variant_type = _dict.get('variant_type')
         new_obj.install_depth = _dict.get('install_depth')
 
         #----
-        _edges = _dict.get('_window_edges', {})
-        _left = _edges.get('Left')
-        _left = LineSegment3D.from_dict( _left )
-
-        _right = _edges.get('Right')
-        _right = LineSegment3D.from_dict( _right )
-
-        _bottom = _edges.get('Bottom')
-        _bottom = LineSegment3D.from_dict( _bottom )
-
-        _top = _edges.get('Top')
-        _top = LineSegment3D.from_dict( _top )      
-        
-        new_obj._window_edges = cls.Output(_left, _right, _bottom, _top)
-
-        #----
-        _glazing_surface = _dict.get('_glazing_surface')
-        _glazing_surface = Face3D.from_dict(_glazing_surface)
-        _glazing_surface = from_face3d(_glazing_surface)
-        new_obj._glazing_surface = _glazing_surface
+        # The derived geometry is only re-built (lazily) when first needed, and
+        # only if the aperture / frame / install depth no longer match its fingerprint
+        new_obj._derived_key = _dict.get('_derived_key')
+        new_obj._derived_dicts = {
+            '_window_edges': _dict.get('_window_edges'),
+            '_glazing_edge_lengths': _dict.get('_glazing_edge_lengths'),
+            '_glazing_surface': _dict.get('_glazing_surface'),
+            }
 
         new_obj.frame = LBT2PH.windows.PHPP_Frame.from_dict( _dict.get('_frame') )
         new_obj.glazing = LBT2PH.windows.PHPP_Glazing.from_dict( _dict.get('_glazing') )
@@ -918,6 +1063,33 @@ class PHPP_Installs(Object):
         return str(self)
 
 
+#-------------------------------------------------------------------------------
+#-------------------------------------------------------------------------------
+def calc_window_metrics(_window_objs):
+    """ Works out the areas and U-W-Installed of all the windows in a single pass
+
+    The results are kept on each window (its 'metrics'), so later calls to
+    'u_w_installed' and the like use them without working anything out again.
+    Windows whose metrics are already up to date are not included in the pass.
+
+    Args:
+        _window_objs (list: PHPP_Window): The PHPP-Style window objects
+    Returns:
+        metrics (list: LBT2PH.window_metrics.WindowMetrics): The metrics for each window, in order
+    """
+
+    window_objs = list(_window_objs)
+    keys = [win._metrics_fingerprint() for win in window_objs]
+    
+    stale = [(win, key) for win, key in izip(window_objs, keys)
+                if win._metrics is None or win._metrics_key != key]
+    new_metrics = LBT2PH.window_metrics.window_metrics( [win._metrics_spec() for win, _ in stale] )
+    for (win, key), metrics in izip(stale, new_metrics):
+        win._metrics = metrics
+        win._metrics_key = key
+    
+    return [win._metrics for win in window_objs]
+
 #-------------------------------------------------------------------------------
 #-------------------------------------------------------------------------------
 def create_EP_window_mat(_win_obj):
@@ -933,6 +1105,8 @@ def create_EP_window_mat(_win_obj):
     # Material properties
     name = 'PHPP_MAT_{}'.format(_win_obj.name)
     u_factor = _win_obj.u_w_installed
+    if u_factor is None:
+        raise ValueError('Window "{}" has no area, so no U-W-Installed to use for its E+ Material.'.format(_win_obj.name))
     shgc = _win_obj.glazing.gValue
     t_vis = 0.6
 
@@ -982,11 +1156,73 @@ def create_EP_const(_win_EP_material):
 
 #-------------------------------------------------------------------------------
 #-------------------------------------------------------------------------------
+def _glazing_from_lib_entry(_dict):
+    new_obj = PHPP_Glazing( _dict['Name'], _dict['gValue'], _dict['uValue'] )
+    return _dict['Name'], new_obj
+
+def _psi_install_from_lib_entry(_dict):
+    new_obj = PHPP_Installs( [ _dict['Left'], _dict['Right'], _dict['Bottom'], _dict['Top'] ] )
+    return _dict['Typename'], new_obj
+
+def _frame_from_lib_entry(_dict):
+    new_obj = PHPP_Frame()
+    new_obj.name = _dict.get('Name', 'Unnamed Frame')
+    new_obj.uValues = [
+                    _dict.get('uFrame_L', 1.0), _dict.get('uFrame_R', 1.0),
+                    _dict.get('uFrame_B', 1.0), _dict.get('uFrame_T', 1.0) ]
+    new_obj.frameWidths =[
+                    _dict.get('wFrame_L', 0.12), _dict.get('wFrame_R', 0.12),
+                    _dict.get('wFrame_B', 0.12), _dict.get('wFrame_T', 0.12) ]
+    new_obj.PsiGVals = [
+                    _dict.get('psiG_L', 0.04), _dict.get('psiG_R', 0.04),
+                    _dict.get('psiG_B', 0.04), _dict.get('psiG_T', 0.04) ]
+    new_obj.Installs = [
+                    _dict.get('psiInst_L', 0.04), _dict.get('psiInst_R', 0.04),
+                    _dict.get('psiInst_B', 0.04), _dict.get('psiInst_T', 0.04) ]
+    return new_obj.name, new_obj
+
+WINDOW_LIBRARY_CATEGORIES = [
+    LBT2PH.doc_library.Category('lib_GlazingTypes', 'PHPP_lib_Glazing', _glazing_from_lib_entry),
+    LBT2PH.doc_library.Category('lib_PsiInstalls', '_PsiInstall_', _psi_install_from_lib_entry),
+    LBT2PH.doc_library.Category('lib_FrameTypes', 'PHPP_lib_Frame', _frame_from_lib_entry),
+    ]
+
+def window_library_index(_ghdoc):
+    """The shared (sc.sticky) index of the window-type entries in the Active Rhino doc's DocumentUserText
+    
+    The entries are only parsed again if they have changed since the last time
+    any component asked for them, and then only the ones which changed.
+    
+    Args:
+        _ghdoc (ghdoc): The 'ghdoc' object from the Grasshopper document.
+    Returns:
+        index (LBT2PH.doc_library.LibraryIndex): The index, up to date with the doc
+    """
+    
+    with LBT2PH.helpers.context_rh_doc(_ghdoc):
+        sticky_key = 'LBT2PH_window_library_{}'.format(Rhino.RhinoDoc.ActiveDoc.RuntimeSerialNumber)
+        index = sc.sticky.get(sticky_key)
+        if index is None:
+            index = LBT2PH.doc_library.LibraryIndex(WINDOW_LIBRARY_CATEGORIES)
+            sc.sticky[sticky_key] = index
+        
+        entries = []
+        if rs.IsDocumentUserText():
+            entries = [(key, rs.GetDocumentUserText(key)) for key in rs.GetDocumentUserText() if index.wants(key)]
+    
+    if index.refresh(entries):
+        for key, error in index.errors.items():
+            print('Could not read the library entry "{}" from the DocumentUserText: {}'.format(key, error))
+    
+    return index
+
 def build_frame_and_glass_objs_from_RH_doc(_ghdoc):
     """ Loads window-type entries from DocumentUseText library of the Active Rhino doc.
 
         Note, it determines if its a 'window-type' entry by looking for the 
-        string "PHPP_lib_Glazing", "PHPP_lib_Frame" or "_PsiInstall_" in the key
+        string "PHPP_lib_Glazing", "PHPP_lib_Frame" or "_PsiInstall_" in the key.
+        The entries are read (and only re-parsed when changed) through the
+        shared window_library_index().
          
     Args:
         _ghdoc (ghdoc): The 'ghdoc' object from the Grasshopper document.
@@ -995,58 +1231,4 @@ def build_frame_and_glass_objs_from_RH_doc(_ghdoc):
             found with their parameters.
     """
     
-    PHPPLibrary_ = {'lib_GlazingTypes':{}, 'lib_FrameTypes':{}, 'lib_PsiInstalls':{}}
-    lib_GlazingTypes = {}
-    lib_FrameTypes = {}
-    lib_PsiInstalls = {}
-
-    with LBT2PH.helpers.context_rh_doc(_ghdoc):
-        # First, try and pull in the Rhino Document's PHPP Library
-        # And make new Frame and Glass Objects. Add all of em' to new dictionaries
-        if not rs.IsDocumentUserText():
-            return PHPPLibrary_
-        
-        for eachKey in rs.GetDocumentUserText():
-            if 'PHPP_lib_Glazing' in eachKey:
-                tempDict = json.loads(rs.GetDocumentUserText(eachKey))
-                newGlazingObject = PHPP_Glazing(
-                                tempDict['Name'],
-                                tempDict['gValue'],
-                                tempDict['uValue']
-                                )
-                lib_GlazingTypes[tempDict['Name']] = newGlazingObject
-            elif '_PsiInstall_' in eachKey:
-                tempDict = json.loads(rs.GetDocumentUserText(eachKey))
-                newPsiInstallObject = PHPP_Installs(
-                                [
-                                tempDict['Left'],
-                                tempDict['Right'],
-                                tempDict['Bottom'],
-                                tempDict['Top']
-                                ]
-                                )
-                lib_PsiInstalls[tempDict['Typename']] = newPsiInstallObject
-            elif 'PHPP_lib_Frame' in eachKey:
-                tempDict = json.loads(rs.GetDocumentUserText(eachKey))
-                newFrameObject = PHPP_Frame()
-                newFrameObject.name = tempDict.get('Name', 'Unnamed Frame')
-                newFrameObject.uValues = [
-                                tempDict.get('uFrame_L', 1.0), tempDict.get('uFrame_R', 1.0),
-                                tempDict.get('uFrame_B', 1.0), tempDict.get('uFrame_T', 1.0) ]
-                newFrameObject.frameWidths =[
-                                tempDict.get('wFrame_L', 0.12), tempDict.get('wFrame_R', 0.12),
-                                tempDict.get('wFrame_B', 0.12), tempDict.get('wFrame_T', 0.12) ]
-                newFrameObject.PsiGVals = [
-                                tempDict.get('psiG_L', 0.04), tempDict.get('psiG_R', 0.04),
-                                tempDict.get('psiG_B', 0.04), tempDict.get('psiG_T', 0.04) ]
-                newFrameObject.Installs = [
-                                tempDict.get('psiInst_L', 0.04), tempDict.get('psiInst_R', 0.04),
-                                tempDict.get('psiInst_B', 0.04), tempDict.get('psiInst_T', 0.04) ]
-                   
-                lib_FrameTypes[ newFrameObject.name ] = newFrameObject
-        
-        PHPPLibrary_['lib_GlazingTypes'] = lib_GlazingTypes
-        PHPPLibrary_['lib_FrameTypes'] = lib_FrameTypes
-        PHPPLibrary_['lib_PsiInstalls'] = lib_PsiInstalls
-    
-    return PHPPLibrary_
+    return window_library_index(_ghdoc).to_library_dict()